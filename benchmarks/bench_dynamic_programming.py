@@ -0,0 +1,49 @@
+"""
+Time the wavefront engines of dtw and frechet_dist against the reference
+Python loops, and the binary search engine of frechet_dist against the
+wavefront on similar curves.
+
+Run from the repository root with
+
+    python benchmarks/bench_dynamic_programming.py
+"""
+from timeit import default_timer as timer
+import numpy as np
+import similaritymeasures
+
+
+def best_of(fun, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t0 = timer()
+        fun()
+        times.append(timer() - t0)
+    return min(times)
+
+
+if __name__ == '__main__':
+    np.random.seed(1212121)
+    print('{:>6} {:>14} {:>12} {:>12} {:>9}'.format(
+        'n', 'function', 'loop (s)', 'wavefront', 'speedup'))
+    for n in [100, 500, 1000, 2000]:
+        exp_data = np.random.random((n, 2))
+        num_data = np.random.random((n, 2))
+        for name in ['dtw', 'frechet_dist']:
+            fun = getattr(similaritymeasures, name)
+            t_loop = best_of(lambda: fun(exp_data, num_data, engine='loop'),
+                             repeat=1)
+            t_wave = best_of(lambda: fun(exp_data, num_data))
+            print('{:>6} {:>14} {:>12.4f} {:>12.4f} {:>9.1f}'.format(
+                n, name, t_loop, t_wave, t_loop / t_wave))
+
+    print()
+    print('{:>6} {:>14} {:>12} {:>12} {:>9}'.format(
+        'n', 'function', 'wavefront', 'search', 'speedup'))
+    for n in [1000, 2000, 5000]:
+        exp_data = np.cumsum(np.random.normal(size=(n, 2)), axis=0)
+        num_data = exp_data + np.random.normal(scale=0.5, size=(n, 2))
+        fun = similaritymeasures.frechet_dist
+        t_wave = best_of(lambda: fun(exp_data, num_data))
+        t_search = best_of(lambda: fun(exp_data, num_data, engine='search'))
+        print('{:>6} {:>14} {:>12.4f} {:>12.4f} {:>9.1f}'.format(
+            n, 'frechet_dist', t_wave, t_search, t_wave / t_search))
@@ -0,0 +1,43 @@
+"""
+Time the measures that compare one experimental curve against many
+candidates, with the experimental curve as an array and as a
+PreparedCurve.
+
+Run from the repository root with
+
+    python benchmarks/bench_prepared_curve.py
+"""
+from timeit import default_timer as timer
+import numpy as np
+import similaritymeasures
+
+
+def per_candidate(fun, exp_data, candidates):
+    t0 = timer()
+    for num_data in candidates:
+        fun(exp_data, num_data)
+    return (timer() - t0) / len(candidates)
+
+
+if __name__ == '__main__':
+    np.random.seed(1212121)
+    measures = ['pcm', 'curve_length_measure', 'area_between_two_curves']
+    print('{:>6} {:>24} {:>12} {:>12} {:>9}'.format(
+        'n', 'function', 'array (ms)', 'prepared', 'speedup'))
+    for n in [1000, 5000, 20000]:
+        x = np.linspace(1.0, 10.0, n)
+        exp_data = np.array((x, np.sin(x) + 2.0)).T
+        candidates = []
+        for _ in range(20):
+            m = n // 10
+            xc = np.linspace(1.0, 10.0, m)
+            candidates.append(np.array((xc, np.sin(xc) + 2.0 +
+                                        0.1 * np.random.random(m))).T)
+        prepared = similaritymeasures.PreparedCurve(exp_data)
+        for name in measures:
+            fun = getattr(similaritymeasures, name)
+            t_array = per_candidate(fun, exp_data, candidates)
+            t_prepared = per_candidate(fun, prepared, candidates)
+            print('{:>6} {:>24} {:>12.3f} {:>12.3f} {:>9.1f}'.format(
+                n, name, 1e3 * t_array, 1e3 * t_prepared,
+                t_array / t_prepared))
@@ -1,2 +1,10 @@
 from .similaritymeasures import *  # noqa F403
 from .version import __version__  # noqa F401
+from .search import DTWLibrary, dtw_knn, FrechetIndex  # noqa F401
+from .pairwise import cdist_curves, pdist_curves  # noqa F401
+from .batch import CurveBatch  # noqa F401
+from .store import CurveStore, CurveStoreWriter, score_store  # noqa F401
+from .streaming import (StreamingDTW, IncrementalDTW,  # noqa F401
+                        IncrementalFrechet)
+from .backends import (set_backend, get_backend, available_backends,  # noqa F401
+                       register_backend)
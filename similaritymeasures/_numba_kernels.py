@@ -0,0 +1,150 @@
+from __future__ import division
+import numba
+import numpy as np
+# MIT License
+#
+# Copyright (c) 2018,2019 Charles Jekel
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# Kernels of the 'numba' backend, see backends.py. Each one performs the
+# same floating point operations, in the same order, as the NumPy kernel it
+# replaces, and Numba doesn't reorder them without fastmath, so both
+# backends give identical results. The fills release the GIL, so that the
+# tiles of dtw and frechet_dist with n_jobs run in parallel.
+
+
+@numba.njit(cache=True, nogil=True)
+def _fill_dtw(D, c):
+    n, m = c.shape
+    for a in range(1, n + 1):
+        for b in range(1, m + 1):
+            t = min(D[a - 1, b], D[a, b - 1], D[a - 1, b - 1])
+            D[a, b] = c[a - 1, b - 1] + t
+
+
+@numba.njit(cache=True, nogil=True)
+def _fill_frechet(D, c):
+    n, m = c.shape
+    for a in range(1, n + 1):
+        for b in range(1, m + 1):
+            t = min(D[a - 1, b], D[a, b - 1], D[a - 1, b - 1])
+            D[a, b] = max(t, c[a - 1, b - 1])
+
+
+def fill(D, c, kind='dtw'):
+    r"""
+    Compiled _wavefront_fill, one cell at a time.
+    """
+    c = np.ascontiguousarray(c, dtype=D.dtype)
+    if kind == 'frechet':
+        _fill_frechet(D, c)
+    else:
+        _fill_dtw(D, c)
+
+
+@numba.njit(cache=True)
+def _path(d):
+    n, m = d.shape
+    i = n - 1
+    j = m - 1
+    path = np.empty((n + m - 1, 2), dtype=np.int64)
+    k = n + m - 2
+    path[k, 0] = i
+    path[k, 1] = j
+    while i > 0 or j > 0:
+        if i == 0:
+            j = j - 1
+        elif j == 0:
+            i = i - 1
+        else:
+            temp_step = min(d[i - 1, j], d[i, j - 1], d[i - 1, j - 1])
+            if d[i - 1, j] == temp_step:
+                i = i - 1
+            elif d[i, j - 1] == temp_step:
+                j = j - 1
+            else:
+                i = i - 1
+                j = j - 1
+        k = k - 1
+        path[k, 0] = i
+        path[k, 1] = j
+    return path[k:]
+
+
+def path(d):
+    r"""
+    Compiled dtw_path of a dense cumulative distance matrix.
+    """
+    if not isinstance(d, np.ndarray):
+        from .similaritymeasures import _dtw_path_loop
+        return _dtw_path_loop(d)
+    return _path(np.asarray(d, dtype=np.float64))
+
+
+@numba.njit(cache=True, nogil=True)
+def _fill_steps(D, S, c):
+    n, m = c.shape
+    for a in range(1, n + 1):
+        for b in range(1, m + 1):
+            up = D[a - 1, b]
+            left = D[a, b - 1]
+            t = min(up, left, D[a - 1, b - 1])
+            if up == t:
+                S[a - 1, b - 1] = 0
+            elif left == t:
+                S[a - 1, b - 1] = 1
+            else:
+                S[a - 1, b - 1] = 2
+            D[a, b] = c[a - 1, b - 1] + t
+
+
+def fill_steps(D, S, c):
+    r"""
+    Compiled _wavefront_fill_steps, one cell at a time.
+    """
+    _fill_steps(D, S, np.ascontiguousarray(c, dtype=D.dtype))
+
+
+@numba.njit(cache=True)
+def _step_path(S):
+    n, m = S.shape
+    i = n - 1
+    j = m - 1
+    path = np.empty((n + m - 1, 2), dtype=np.int64)
+    k = n + m - 2
+    path[k, 0] = i
+    path[k, 1] = j
+    while i > 0 or j > 0:
+        code = S[i, j]
+        if code != 1:
+            i = i - 1
+        if code != 0:
+            j = j - 1
+        k = k - 1
+        path[k, 0] = i
+        path[k, 1] = j
+    return path[k:]
+
+
+def step_path(S):
+    r"""
+    Compiled _step_path.
+    """
+    return _step_path(np.ascontiguousarray(S, dtype=np.uint8))
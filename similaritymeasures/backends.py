@@ -0,0 +1,156 @@
+from __future__ import division
+import importlib.util
+import os
+# MIT License
+#
+# Copyright (c) 2018,2019 Charles Jekel
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# environment variable with the name of the backend to use by default
+ENV_VAR = 'SIMILARITYMEASURES_BACKEND'
+
+# the kernels that every backend implements
+_KERNELS = ('fill', 'path', 'segment_lengths', 'fill_steps', 'step_path')
+
+
+def _numpy_kernels():
+    from . import similaritymeasures as sm
+    return {'fill': sm._wavefront_fill, 'path': sm._dtw_path_loop,
+            'segment_lengths': sm._segment_lengths,
+            'fill_steps': sm._wavefront_fill_steps,
+            'step_path': sm._step_path}
+
+
+def _numba_kernels():
+    from . import _numba_kernels
+    # the arc lengths are already vectorized, and Numba would compute the
+    # squares with a multiplication instead of pow
+    return dict(_numpy_kernels(), fill=_numba_kernels.fill,
+                path=_numba_kernels.path,
+                fill_steps=_numba_kernels.fill_steps,
+                step_path=_numba_kernels.step_path)
+
+
+# loaders of the kernels of each backend, in order of preference for 'auto'
+_loaders = {'numba': _numba_kernels, 'numpy': _numpy_kernels}
+_requires = {'numba': 'numba'}
+_kernels = {}
+_active = None
+
+
+def register_backend(name, loader, requires=None):
+    r"""
+    Register a backend of compiled kernels.
+
+    Parameters
+    ----------
+    name : str
+        Name of the backend, used by set_backend.
+    loader : callable
+        Function without arguments that imports the backend and returns a
+        dict with the kernels 'fill', 'path', 'segment_lengths',
+        'fill_steps' and 'step_path', see the NumPy backend in
+        similaritymeasures.py for their signatures. It is only called when
+        the backend is first used.
+        The 'fill' kernel is called from several threads at once by dtw and
+        frechet_dist with n_jobs, and should release the GIL to run them in
+        parallel.
+    requires : str, optional
+        Module the backend needs. The backend is only available when the
+        module can be imported. Default is None.
+    """
+    _loaders[name] = loader
+    if requires is None:
+        _requires.pop(name, None)
+    else:
+        _requires[name] = requires
+    _kernels.pop(name, None)
+
+
+def available_backends():
+    r"""
+    Names of the backends that can be used on this system.
+
+    Returns
+    -------
+    names : list of str
+        The backends whose required module can be imported, in order of
+        preference.
+    """
+    return [name for name in _loaders
+            if name not in _requires or
+            importlib.util.find_spec(_requires[name]) is not None]
+
+
+def set_backend(name='auto'):
+    r"""
+    Select the kernels used by the dynamic programs and arc lengths.
+
+    The backends give identical results. 'numpy' uses vectorized NumPy and
+    is always available, and 'numba' uses kernels compiled by Numba, when
+    it is installed. The default backend is read from the environment
+    variable SIMILARITYMEASURES_BACKEND, and is 'auto' if it isn't set.
+
+    Parameters
+    ----------
+    name : str, optional
+        Name of a backend from available_backends, or 'auto' for the first
+        available one, which is 'numba' when it is installed and 'numpy'
+        otherwise. Default is 'auto'.
+
+    Examples
+    --------
+    >>> set_backend('numpy')
+    >>> get_backend()
+    'numpy'
+    """
+    global _active
+    if name == 'auto':
+        name = available_backends()[0]
+    if name not in _loaders:
+        raise ValueError('backend must be auto or one of '
+                         + ', '.join(_loaders) + ', not ' + repr(name))
+    if name not in available_backends():
+        raise ImportError('the ' + name + ' backend needs '
+                          + _requires[name] + ', which is not installed')
+    if name not in _kernels:
+        kernels = _loaders[name]()
+        missing = set(_KERNELS) - set(kernels)
+        if missing:
+            raise ValueError('the ' + name + ' backend has no '
+                             + ', '.join(sorted(missing)) + ' kernel')
+        _kernels[name] = kernels
+    _active = name
+
+
+def get_backend():
+    r"""
+    Name of the backend in use, see set_backend.
+    """
+    if _active is None:
+        set_backend(os.environ.get(ENV_VAR, 'auto'))
+    return _active
+
+
+def kernel(name):
+    r"""
+    Kernel of the backend in use.
+    """
+    return _kernels[get_backend()][name]
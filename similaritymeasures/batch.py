@@ -0,0 +1,226 @@
+from __future__ import division
+import operator
+import numpy as np
+# MIT License
+#
+# Copyright (c) 2018,2019 Charles Jekel
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+
+class CurveBatch(object):
+    r"""
+    Collection of curves of different lengths in one contiguous array.
+
+    The points of all curves are stored one after another in a single
+    (sum of M_i, N) array, and curve i is the rows offsets[i] to
+    offsets[i + 1]. Indexing a batch returns a view of the array, without
+    copying the points, so a batch is used like a list of curves with one
+    object instead of one per curve. It is cheap to send to worker
+    processes and to save.
+
+    Parameters
+    ----------
+    curves : list of array_like, array_like (3-D) or CurveBatch
+        Curves of (M_i, N) shape, where M_i is the number of data points of
+        each curve and may differ between curves, and N is the number of
+        dimmensions, which must be the same for all curves. A (K, M, N)
+        array holds K curves of M points.
+    dtype : data-type, optional
+        Data type of the points. Default is float, and None keeps the data
+        type of the curves.
+
+    Attributes
+    ----------
+    data : ndarray (2-D)
+        The points of all curves.
+    offsets : ndarray (1-D)
+        Index of the first point of each curve in data, followed by the
+        number of points.
+
+    Examples
+    --------
+    >>> curves = [np.random.random((n, 2)) for n in range(10, 110)]
+    >>> batch = CurveBatch(curves)
+    >>> r = frechet_dist(batch[0], batch[1])
+    >>> batch.save('curves.npz')
+    >>> batch = CurveBatch.load('curves.npz')
+    >>> Y = pdist_curves(batch)
+    """
+
+    def __init__(self, curves, dtype=float):
+        if isinstance(curves, CurveBatch):
+            data = curves.data
+            offsets = curves.offsets
+        elif isinstance(curves, np.ndarray) and curves.ndim == 3:
+            k, m, n = curves.shape
+            data = curves.reshape(k * m, n)
+            offsets = np.arange(k + 1) * m
+        else:
+            curves = [np.asarray(c) for c in curves]
+            if any(c.ndim != 2 for c in curves):
+                raise ValueError('curves must have shape (M, N)')
+            if len(set(c.shape[1] for c in curves)) > 1:
+                raise ValueError('all curves must have the same number of '
+                                 'dimensions')
+            lengths = [len(c) for c in curves]
+            offsets = np.concatenate([[0], np.cumsum(lengths)])
+            if curves:
+                data = np.concatenate(curves)
+            else:
+                data = np.empty((0, 0))
+        self._set(np.ascontiguousarray(data, dtype=dtype),
+                  np.asarray(offsets, dtype=np.intp))
+
+    def _set(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+
+    @classmethod
+    def from_buffer(cls, data, offsets):
+        r"""
+        Batch of the curves data[offsets[i]:offsets[i + 1]], without
+        copying data.
+
+        Parameters
+        ----------
+        data : ndarray (2-D)
+            The points of all curves.
+        offsets : array_like (1-D)
+            Index of the first point of each curve, followed by the index
+            after the last point of the last curve.
+
+        Returns
+        -------
+        batch : CurveBatch
+        """
+        data = np.asarray(data)
+        offsets = np.asarray(offsets)
+        if data.ndim != 2:
+            raise ValueError('data must have shape (M, N)')
+        if offsets.ndim != 1 or len(offsets) == 0 or \
+                not np.issubdtype(offsets.dtype, np.integer) or \
+                np.any(np.diff(offsets) < 0) or offsets[0] < 0 or \
+                offsets[-1] > len(data):
+            raise ValueError('offsets must be non-decreasing indices of '
+                             'data')
+        batch = cls.__new__(cls)
+        batch._set(data, offsets)
+        return batch
+
+    @classmethod
+    def load(cls, file):
+        r"""
+        Load curves from a .npy or .npz file.
+
+        A .npz file saved with save, or with FrechetIndex.save, holds the
+        arrays 'data' and 'offsets'. Any other .npz file holds one curve per
+        array, in the order they were saved with np.savez(file, *curves). A
+        .npy file holds a (K, M, N) array of K curves of M points.
+
+        Parameters
+        ----------
+        file : str or file
+            File name or open file, see np.load.
+
+        Returns
+        -------
+        batch : CurveBatch
+        """
+        loaded = np.load(file)
+        if isinstance(loaded, np.ndarray):
+            if loaded.ndim != 3:
+                raise ValueError('a .npy file must hold a (K, M, N) array '
+                                 'of curves')
+            return cls(loaded, dtype=loaded.dtype)
+        with loaded as f:
+            if {'data', 'offsets'} <= set(f.files):
+                return cls.from_buffer(f['data'], f['offsets'])
+            return cls([f[name] for name in f.files])
+
+    def save(self, file):
+        r"""
+        Save the batch to a .npz file, see load.
+
+        Parameters
+        ----------
+        file : str or file
+            File name or open file, see np.savez.
+        """
+        np.savez(file, data=self.data, offsets=self.offsets)
+
+    @property
+    def lengths(self):
+        r"""
+        Number of points of each curve.
+        """
+        return np.diff(self.offsets)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step == 1:
+                stop = max(start, stop)
+                return CurveBatch.from_buffer(self.data,
+                                              self.offsets[start:stop + 1])
+            return CurveBatch([self[i] for i in range(start, stop, step)],
+                              dtype=self.data.dtype)
+        i = operator.index(index)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('curve index out of range')
+        return self.data[self.offsets[i]:self.offsets[i + 1]]
+
+    def chunks(self, max_points=2**20):
+        r"""
+        Split the batch into consecutive batches of at most max_points
+        points, without copying the points.
+
+        A curve with more than max_points points is a chunk of its own.
+
+        Parameters
+        ----------
+        max_points : int, optional
+            Largest number of points of a chunk. Default is 2**20.
+
+        Yields
+        ------
+        start : int
+            Index of the first curve of the chunk.
+        chunk : CurveBatch
+            The curves start to start + len(chunk).
+        """
+        if max_points < 1:
+            raise ValueError('max_points must be at least 1')
+        n = len(self)
+        start = 0
+        while start < n:
+            limit = self.offsets[start] + max_points
+            stop = int(np.searchsorted(self.offsets, limit, side='right')) - 1
+            stop = min(max(stop, start + 1), n)
+            yield start, self[start:stop]
+            start = stop
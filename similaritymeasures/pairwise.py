@@ -0,0 +1,316 @@
+from __future__ import division
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import numpy as np
+from . import similaritymeasures as _sm
+from .similaritymeasures import _prepare, _n_workers
+from .batch import CurveBatch
+# MIT License
+#
+# Copyright (c) 2018,2019 Charles Jekel
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# measures that can be named with a string, their curves are prepared once
+# with PreparedCurve
+_MEASURES = ('area_between_two_curves', 'curve_length_measure', 'dtw',
+             'dtw_align', 'fastdtw', 'frechet_dist', 'mae', 'mse', 'pcm')
+
+# number of chunks per worker, more chunks balance the load better when the
+# cost estimate is off
+_CHUNKS_PER_JOB = 4
+
+# state of a worker process, set once by _init_worker: the measure and
+# curves from _setup, the pairs, and the attached shared memory segments
+_worker_state = None
+_worker_pairs = None
+_worker_segments = []
+
+
+def cdist_curves(A, B, measure='frechet_dist', n_jobs=None, **kwargs):
+    r"""
+    Compute the distance between each pair of curves of two collections.
+
+    Parameters
+    ----------
+    A : list of array_like or CurveBatch
+        Curves of shape (M_i, N), compared as exp_data.
+    B : list of array_like or CurveBatch
+        Curves of shape (P_j, N), compared as num_data.
+    measure : str or callable, optional
+        Name of a measure of similaritymeasures: 'area_between_two_curves',
+        'curve_length_measure', 'dtw', 'dtw_align', 'fastdtw',
+        'frechet_dist', 'mae', 'mse' or 'pcm', or a function
+        measure(exp_data, num_data, **kwargs). When the measure returns a
+        tuple, the first item is the distance. Default is 'frechet_dist'.
+    n_jobs : int, optional
+        Number of worker processes. None or 1 computes the distances in
+        this process, and -1 uses all of the CPUs. Default is None.
+    **kwargs : dict, optional
+        Extra arguments to the measure, for example window=10 for dtw.
+
+    Returns
+    -------
+    Y : ndarray (2-D)
+        Y[i, j] is the distance from A[i] to B[j], of shape (len(A),
+        len(B)).
+
+    Notes
+    -----
+    The pairs are split into chunks of about the same cost, assuming that
+    the cost of a pair grows with the product of the curve lengths, and the
+    chunks are computed in a process pool. The curves are copied once into
+    shared memory, which the workers attach to by name, so a task only
+    sends the range of its pairs. The shared memory is released when the
+    computation ends, also after an error or an interrupt. Every pair is
+    computed exactly like a direct call of the measure, so the result does
+    not depend on n_jobs.
+
+    dtw is called with return_matrix=False unless it is given. With
+    n_jobs, a measure function must be picklable, for example a function
+    defined at the top level of a module.
+
+    Examples
+    --------
+    >>> A = [np.random.random((100, 2)) for i in range(20)]
+    >>> B = [np.random.random((80, 2)) for i in range(30)]
+    >>> Y = cdist_curves(A, B, measure='dtw', n_jobs=4)
+    """
+    A = _curves(A)
+    B = _curves(B)
+    rows, cols = np.indices((len(A), len(B))).reshape(2, -1)
+    Y = _evaluate(A, B, rows, cols, measure, n_jobs, kwargs)
+    return Y.reshape(len(A), len(B))
+
+
+def pdist_curves(A, measure='frechet_dist', n_jobs=None, **kwargs):
+    r"""
+    Compute the distance between each pair of curves of a collection.
+
+    Only the pairs i < j are computed, like scipy.spatial.distance.pdist.
+
+    Parameters
+    ----------
+    A : list of array_like or CurveBatch
+        Curves of shape (M_i, N).
+    measure : str or callable, optional
+        The measure, see cdist_curves. Default is 'frechet_dist'.
+    n_jobs : int, optional
+        Number of worker processes, see cdist_curves. Default is None.
+    **kwargs : dict, optional
+        Extra arguments to the measure.
+
+    Returns
+    -------
+    Y : ndarray (1-D)
+        Condensed distance matrix of length len(A) * (len(A) - 1) / 2, the
+        distance from A[i] to A[j] for each i < j in the order of pdist. Use
+        scipy.spatial.distance.squareform to get the square matrix.
+
+    Notes
+    -----
+    The square matrix is only symmetric for symmetric measures such as dtw
+    and frechet_dist. For pcm, area_between_two_curves and
+    curve_length_measure, Y holds the distance from the earlier curve to
+    the later one.
+
+    Examples
+    --------
+    >>> A = [np.random.random((100, 2)) for i in range(20)]
+    >>> Y = pdist_curves(A, measure='dtw', n_jobs=4)
+    >>> D = squareform(Y)
+    """
+    A = _curves(A)
+    rows, cols = np.triu_indices(len(A), k=1)
+    return _evaluate(A, None, rows, cols, measure, n_jobs, kwargs)
+
+
+def _curves(curves):
+    r"""
+    The curves as a CurveBatch, keeping the data type of the points, which
+    is shared with the workers as two arrays.
+    """
+    if isinstance(curves, CurveBatch):
+        return curves
+    return CurveBatch(curves, dtype=None)
+
+
+def _balanced_chunks(costs, n_chunks):
+    r"""
+    Split consecutive items into at most n_chunks ranges of about the same
+    total cost.
+
+    Returns
+    -------
+    edges : ndarray (1-D)
+        The chunk k holds the items edges[k] to edges[k + 1].
+    """
+    cum = np.cumsum(costs, dtype=float)
+    targets = cum[-1] * np.arange(1, n_chunks) / n_chunks
+    edges = np.minimum(np.searchsorted(cum, targets) + 1, len(costs))
+    return np.unique(np.concatenate([[0], edges, [len(costs)]]))
+
+
+def _evaluate(A, B, rows, cols, measure, n_jobs, kwargs):
+    r"""
+    Distances from A[rows[k]] to B[cols[k]], with B = A when B is None.
+    """
+    if not callable(measure) and measure not in _MEASURES:
+        raise ValueError('measure must be a function or one of '
+                         + ', '.join(_MEASURES) + ', not ' + repr(measure))
+    n_workers = _n_workers(n_jobs)
+    if n_workers == 0 or len(rows) == 0:
+        return _evaluate_pairs(_setup(A, B, measure, kwargs), rows, cols)
+    len_a = A.lengths
+    len_b = len_a if B is None else B.lengths
+    costs = len_a[rows] * len_b[cols]
+    edges = _balanced_chunks(costs, _CHUNKS_PER_JOB * n_workers)
+    arrays = {'a_data': A.data, 'a_offsets': A.offsets, 'rows': rows,
+              'cols': cols}
+    if B is not None:
+        arrays.update(b_data=B.data, b_offsets=B.offsets)
+    Y = np.empty(len(rows))
+    # the segments are unlinked as soon as the pool is done, whatever
+    # happens, and the workers keep their mappings until they exit
+    with _SharedArrays(arrays) as shared, \
+            ProcessPoolExecutor(max_workers=n_workers,
+                                initializer=_init_worker,
+                                initargs=(shared.spec, measure,
+                                          kwargs)) as pool:
+        futures = []
+        try:
+            for k0, k1 in zip(edges[:-1].tolist(), edges[1:].tolist()):
+                futures.append((k0, k1, pool.submit(_evaluate_range, k0,
+                                                    k1)))
+            for k0, k1, future in futures:
+                Y[k0:k1] = future.result()
+        except BaseException:
+            # shutdown only takes cancel_futures from Python 3.9 on
+            for _, _, future in futures:
+                future.cancel()
+            pool.shutdown(wait=False)
+            raise
+    return Y
+
+
+class _SharedArrays(object):
+    r"""
+    Copies of named arrays in shared memory segments, which are unlinked by
+    close. spec holds the name, shape and dtype of the segment of each
+    array, which is all a worker needs to attach to it with _attach.
+    """
+
+    def __init__(self, arrays):
+        self._segments = []
+        self.spec = {}
+        try:
+            for key, array in arrays.items():
+                array = np.ascontiguousarray(array)
+                shm = shared_memory.SharedMemory(create=True,
+                                                 size=max(array.nbytes, 1))
+                self._segments.append(shm)
+                view = np.ndarray(array.shape, array.dtype, buffer=shm.buf)
+                view[...] = array
+                del view
+                self.spec[key] = (shm.name, array.shape, array.dtype.str)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        while self._segments:
+            shm = self._segments.pop()
+            shm.close()
+            shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _attach(spec):
+    r"""
+    Arrays of the shared memory segments of a _SharedArrays spec, without
+    copying them.
+    """
+    arrays = {}
+    for key, (name, shape, dtype) in spec.items():
+        shm = shared_memory.SharedMemory(name=name)
+        # keep the segment mapped as long as the worker lives
+        _worker_segments.append(shm)
+        arrays[key] = np.ndarray(shape, dtype, buffer=shm.buf)
+    return arrays
+
+
+def _setup(A, B, measure, kwargs):
+    r"""
+    The function, curves and arguments used to compute the distances,
+    preparing the curves for the measures of similaritymeasures.
+    """
+    if callable(measure):
+        fun = measure
+    else:
+        fun = getattr(_sm, measure)
+        A = [_prepare(a, kwargs.get('dtype')) for a in A]
+        if B is not None:
+            B = [_prepare(b, kwargs.get('dtype')) for b in B]
+        if measure == 'dtw' and 'return_matrix' not in kwargs:
+            kwargs = dict(kwargs, return_matrix=False)
+    if B is None:
+        B = A
+    return fun, A, B, kwargs
+
+
+def _evaluate_pairs(state, rows, cols):
+    r"""
+    Distances from A[rows[k]] to B[cols[k]] for the state from _setup.
+    """
+    fun, A, B, kwargs = state
+    Y = np.empty(len(rows))
+    for k, (i, j) in enumerate(zip(rows.tolist(), cols.tolist())):
+        r = fun(A[i], B[j], **kwargs)
+        if isinstance(r, tuple):
+            r = r[0]
+        Y[k] = r
+    return Y
+
+
+def _init_worker(spec, measure, kwargs):
+    r"""
+    Set up a worker process once: attach to the shared curves and pairs, so
+    every task only sends a range of pairs.
+    """
+    global _worker_state, _worker_pairs
+    arrays = _attach(spec)
+    A = CurveBatch.from_buffer(arrays['a_data'], arrays['a_offsets'])
+    B = None
+    if 'b_data' in arrays:
+        B = CurveBatch.from_buffer(arrays['b_data'], arrays['b_offsets'])
+    _worker_state = _setup(A, B, measure, kwargs)
+    _worker_pairs = arrays['rows'], arrays['cols']
+
+
+def _evaluate_range(k0, k1):
+    r"""
+    Distances of the pairs k0 to k1 in a worker process.
+    """
+    rows, cols = _worker_pairs
+    return _evaluate_pairs(_worker_state, rows[k0:k1], cols[k0:k1])
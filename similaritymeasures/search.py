@@ -0,0 +1,720 @@
+from __future__ import division
+import heapq
+import numpy as np
+from scipy.spatial import distance
+from scipy.spatial.distance import directed_hausdorff
+from .similaritymeasures import dtw, frechet_dist, frechet_leq, _band_limits
+from .batch import CurveBatch
+# MIT License
+#
+# Copyright (c) 2018,2019 Charles Jekel
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# metrics of the form f(x - y) that never decrease when a point moves away
+# from a box, which is what the envelope based lower bounds rely on
+_LB_METRICS = ('euclidean', 'sqeuclidean', 'cityblock', 'chebyshev',
+               'minkowski')
+
+# lower bounds are summed in a different order than the DTW recursion, so a
+# candidate is only pruned when its bound is above the threshold by more
+# than this relative tolerance
+_LB_RTOL = 1e-9
+
+# number of candidates whose LB_Keogh is computed at once
+_CHUNK_SIZE = 256
+
+
+def _paired_distance(diff, metric='euclidean', p=2):
+    r"""
+    Distance between pairs of points, given their difference along the last
+    axis, for one of the _LB_METRICS.
+    """
+    if metric == 'euclidean' or (metric == 'minkowski' and p == 2):
+        return np.sqrt(np.sum(diff ** 2, axis=-1))
+    if metric == 'sqeuclidean':
+        return np.sum(diff ** 2, axis=-1)
+    if metric == 'cityblock' or (metric == 'minkowski' and p == 1):
+        return np.sum(np.abs(diff), axis=-1)
+    if metric == 'chebyshev' or (metric == 'minkowski' and np.isinf(p)):
+        return np.max(np.abs(diff), axis=-1)
+    return np.sum(np.abs(diff) ** p, axis=-1) ** (1.0 / p)
+
+
+def _range_envelope(x, lo, hi):
+    r"""
+    Minimum and maximum of x over the row ranges [lo[i], hi[i]).
+
+    A sparse table of minimums and maximums over 2**k rows answers every
+    range with two overlapping look ups, so all ranges are evaluated with a
+    few vectorized operations.
+
+    Parameters
+    ----------
+    x : ndarray (2-D)
+        Data of shape (m, N).
+    lo, hi : ndarray (1-D)
+        Limits of the ranges, with lo < hi.
+
+    Returns
+    -------
+    lower, upper : ndarray (2-D)
+        Minimum and maximum of every range, of shape (len(lo), N).
+    """
+    size = hi - lo
+    # floor(log2(size)), exact for integers
+    level = np.frexp(size)[1] - 1
+    mins = [x]
+    maxs = [x]
+    for k in range(1, level.max() + 1):
+        h = 1 << (k - 1)
+        mins.append(np.minimum(mins[-1][:-h], mins[-1][h:]))
+        maxs.append(np.maximum(maxs[-1][:-h], maxs[-1][h:]))
+    lower = np.empty((len(lo), x.shape[1]))
+    upper = np.empty((len(lo), x.shape[1]))
+    for k in np.unique(level):
+        rows = np.flatnonzero(level == k)
+        a = lo[rows]
+        b = hi[rows] - (1 << k)
+        lower[rows] = np.minimum(mins[k][a], mins[k][b])
+        upper[rows] = np.maximum(maxs[k][a], maxs[k][b])
+    return lower, upper
+
+
+def _column_limits(lo, hi, m):
+    r"""
+    Row limits of every column of a band given by the column limits of
+    every row, see _band_limits.
+    """
+    columns = np.arange(m)
+    return (np.searchsorted(hi, columns, side='right'),
+            np.searchsorted(lo, columns, side='right'))
+
+
+class DTWLibrary(object):
+    r"""
+    Library of curves prepared for DTW nearest neighbor searches.
+
+    The first and last points, and the envelopes used by the lower bounds of
+    dtw_knn, are computed once for every curve in the library and reused by
+    every query. Envelopes depend on the number of points of the query, and
+    are cached for every query length that has been searched.
+
+    Parameters
+    ----------
+    library : list of array_like or CurveBatch
+        Curves of (P, N) shape, where P is the number of data points of each
+        curve and may differ between curves, and N is the number of
+        dimmensions, which must be the same for all curves.
+    window : int, optional
+        Sakoe-Chiba radius of the warping constraint, see dtw. Default is
+        None, which means no constraint.
+    slope : float, optional
+        Itakura parallelogram slope of the warping constraint, see dtw.
+        Default is None.
+    metric : str or callable, optional
+        The distance metric to use. Default='euclidean'. Refer to the
+        documentation for scipy.spatial.distance.cdist.
+    **kwargs : dict, optional
+        Extra arguments to `metric`: refer to each metric documentation in
+        scipy.spatial.distance.
+
+    Attributes
+    ----------
+    curves : CurveBatch
+        The curves of the library.
+
+    Notes
+    -----
+    The lower bounds are only available for the metrics 'euclidean',
+    'sqeuclidean', 'cityblock', 'chebyshev' and 'minkowski' (with p as the
+    only extra argument). Other metrics are supported, but every candidate
+    is then compared with the exact DTW.
+
+    The cached envelopes of one query length take twice the memory of a
+    library where every curve has the length of the query.
+
+    Examples
+    --------
+    >>> library = [np.random.random((100, 2)) for i in range(1000)]
+    >>> lib = DTWLibrary(library, window=10)
+    >>> query = np.random.random((100, 2))
+    >>> indices, distances, pruned = lib.knn(query, k=5)
+    """
+
+    def __init__(self, library, window=None, slope=None, metric='euclidean',
+                 **kwargs):
+        self.curves = CurveBatch(library)
+        if len(self.curves) == 0:
+            raise ValueError('library must contain at least one curve')
+        self.window = window
+        self.slope = slope
+        self.metric = metric
+        self.kwargs = kwargs
+        self._dim = self.curves.data.shape[1]
+        self._lengths = self.curves.lengths
+        self._first = self.curves.data[self.curves.offsets[:-1]]
+        self._last = self.curves.data[self.curves.offsets[1:] - 1]
+        self._envelopes = {}
+        self._bounded = (metric in _LB_METRICS and
+                         set(kwargs) <= {'p'} and
+                         (metric == 'minkowski' or not kwargs))
+        self._p = kwargs.get('p', 2)
+        # LB_Improved splits the local distance into a part on each side of
+        # the envelope, which requires a separable metric
+        self._improved = self._bounded and (
+            metric in ('cityblock', 'sqeuclidean') or
+            (metric == 'minkowski' and self._p == 1) or self._dim == 1)
+
+    def __len__(self):
+        return len(self.curves)
+
+    def _band(self, n, m):
+        return _band_limits(n, m, window=self.window, slope=self.slope)
+
+    def _envelope(self, n):
+        r"""
+        Envelopes of all curves for a query of n points, of shape
+        (len(self), n, N).
+        """
+        if n not in self._envelopes:
+            lower = np.empty((len(self), n, self._dim))
+            upper = np.empty((len(self), n, self._dim))
+            for i, c in enumerate(self.curves):
+                lo, hi = self._band(n, len(c))
+                lower[i], upper[i] = _range_envelope(c, lo, hi)
+            self._envelopes[n] = lower, upper
+        return self._envelopes[n]
+
+    def _distance(self, diff):
+        return _paired_distance(diff, metric=self.metric, p=self._p)
+
+    def _lb_kim(self, query):
+        r"""
+        LB_Kim of every curve, the distance of the first and last points,
+        which are matched by every warping path.
+        """
+        lb = self._distance(query[0] - self._first)
+        both = (len(query) > 1) | (self._lengths > 1)
+        lb[both] += self._distance(query[-1] - self._last[both])
+        return lb
+
+    def _lb_keogh(self, query, index):
+        r"""
+        LB_Keogh [1]_ of the curves in index, the sum of the distances from
+        every query point to the bounding box of the points it may be
+        matched to.
+        """
+        lower, upper = self._envelope(len(query))
+        diff = query - np.clip(query, lower[index], upper[index])
+        return np.sum(self._distance(diff), axis=-1)
+
+    def _lb_improved(self, query, index, keogh):
+        r"""
+        LB_Improved [2]_ of curve index, which adds the distance from the
+        curve to the envelope of the projection of the query onto the
+        envelope of the curve to LB_Keogh.
+        """
+        lower, upper = self._envelope(len(query))
+        h = np.clip(query, lower[index], upper[index])
+        c = self.curves[index]
+        lo, hi = _column_limits(*self._band(len(query), len(c)), len(c))
+        h_lower, h_upper = _range_envelope(h, lo, hi)
+        diff = c - np.clip(c, h_lower, h_upper)
+        if self.metric == 'sqeuclidean':
+            return keogh + np.sum(diff ** 2)
+        return keogh + np.sum(np.abs(diff))
+
+    def knn(self, query, k=1):
+        r"""
+        Find the k curves of the library with the smallest DTW distance.
+
+        See dtw_knn.
+        """
+        query = np.asarray(query, dtype=float)
+        if k < 1:
+            raise ValueError('k must be at least 1')
+        if query.ndim != 2 or query.shape[1] != self._dim:
+            raise ValueError('query must have shape (M, {})'.format(
+                             self._dim))
+        count = len(self)
+        k = min(k, count)
+        pruned = {'lb_kim': 0, 'lb_keogh': 0, 'lb_improved': 0,
+                  'dtw': 0, 'abandoned': 0}
+        if self._bounded:
+            kim = self._lb_kim(query)
+        else:
+            kim = np.zeros(count)
+        # candidates with small bounds first, so that good matches are found
+        # early and prune the rest
+        order = np.argsort(kim, kind='stable')
+        best = []
+        threshold = np.inf
+
+        def prune(lb):
+            return lb * (1.0 - _LB_RTOL) > threshold
+
+        for start in range(0, count, _CHUNK_SIZE):
+            chunk = order[start:start + _CHUNK_SIZE]
+            if prune(kim[chunk[0]]):
+                # kim is sorted, so every remaining candidate is pruned
+                pruned['lb_kim'] += count - start
+                break
+            if self._bounded:
+                keogh = np.zeros(len(chunk))
+                alive = ~prune(kim[chunk])
+                keogh[alive] = self._lb_keogh(query, chunk[alive])
+            for index, lb in zip(chunk.tolist(), keogh.tolist()
+                                 if self._bounded else [0.0] * len(chunk)):
+                if prune(kim[index]):
+                    pruned['lb_kim'] += 1
+                    continue
+                if prune(lb):
+                    pruned['lb_keogh'] += 1
+                    continue
+                if self._improved and prune(self._lb_improved(query, index,
+                                                              lb)):
+                    pruned['lb_improved'] += 1
+                    continue
+                pruned['dtw'] += 1
+                r = dtw(query, self.curves[index], metric=self.metric,
+                        window=self.window, slope=self.slope,
+                        return_matrix=False,
+                        abandon_above=threshold if len(best) == k else None,
+                        **self.kwargs)
+                if r == np.inf:
+                    pruned['abandoned'] += 1
+                    continue
+                if len(best) < k or (r, index) < best[-1]:
+                    best.append((r, index))
+                    best.sort()
+                    del best[k:]
+                    if len(best) == k:
+                        threshold = best[-1][0]
+        distances = np.array([b[0] for b in best])
+        indices = np.array([b[1] for b in best], dtype=np.intp)
+        return indices, distances, pruned
+
+
+def dtw_knn(query, library, k=1, window=None, slope=None, metric='euclidean',
+            **kwargs):
+    r"""
+    Find the k curves of a library with the smallest DTW distance to a query.
+
+    Candidates are first compared with lower bounds of increasing cost, in
+    the cascade of [3]_: LB_Kim (the first and last points), LB_Keogh [1]_
+    (the distance from the query to the envelope of the candidate) and
+    LB_Improved [2]_. A candidate is pruned as soon as one of its lower
+    bounds exceeds the k-th best distance found so far. The exact DTW is
+    only computed for the survivors, and abandoned early, see the
+    abandon_above argument of dtw, once it exceeds the k-th best distance.
+
+    Parameters
+    ----------
+    query : array_like
+        Curve from your experimental data. query is of (M, N) shape, where
+        M is the number of data points, and N is the number of dimmensions
+    library : list of array_like, CurveBatch or DTWLibrary
+        Curves to search. Build a DTWLibrary once to reuse the precomputed
+        envelopes for many queries.
+    k : int, optional
+        Number of nearest neighbors. Default is 1.
+    window : int, optional
+        Sakoe-Chiba radius of the warping constraint, see dtw. Default is
+        None, which means no constraint.
+    slope : float, optional
+        Itakura parallelogram slope of the warping constraint, see dtw.
+        Default is None.
+    metric : str or callable, optional
+        The distance metric to use. Default='euclidean'. Refer to the
+        documentation for scipy.spatial.distance.cdist.
+    **kwargs : dict, optional
+        Extra arguments to `metric`: refer to each metric documentation in
+        scipy.spatial.distance.
+
+    Returns
+    -------
+    indices : ndarray (1-D)
+        Indices of the k nearest curves in the library, sorted by distance.
+        Ties are broken by the smaller index.
+    distances : ndarray (1-D)
+        DTW distances of the k nearest curves, identical to dtw.
+    pruned : dict
+        Number of candidates pruned by each stage: 'lb_kim', 'lb_keogh' and
+        'lb_improved'. 'dtw' is the number of candidates compared with the
+        exact DTW, and 'abandoned' how many of those were abandoned early.
+        lb_kim + lb_keogh + lb_improved + dtw is the size of the library.
+
+    Notes
+    -----
+    The result is the same as computing dtw for every curve of the library.
+    The lower bounds are only available for the metrics 'euclidean',
+    'sqeuclidean', 'cityblock', 'chebyshev' and 'minkowski', and
+    LB_Improved additionally requires 'cityblock', 'sqeuclidean' or curves
+    with one dimension. Other metrics compare every candidate with the
+    exact DTW.
+
+    A window tightens the envelopes, so most of the candidates are pruned
+    by the lower bounds. Without a constraint, the envelope of every point
+    is the bounding box of the whole candidate.
+
+    Examples
+    --------
+    >>> library = [np.random.random((100, 2)) for i in range(1000)]
+    >>> query = np.random.random((100, 2))
+    >>> indices, distances, pruned = dtw_knn(query, library, k=5, window=10)
+
+    Prepare the library once to search it with many queries.
+
+    >>> lib = DTWLibrary(library, window=10)
+    >>> indices, distances, pruned = dtw_knn(query, lib, k=5)
+
+    .. [1] Keogh, E. and Ratanamahatana, C. A., 2005. Exact indexing of
+        dynamic time warping. Knowledge and Information Systems, 7(3),
+        pp.358-386. https://doi.org/10.1007/s10115-004-0154-9
+    .. [2] Lemire, D., 2009. Faster retrieval with a two-pass
+        dynamic-time-warping lower bound. Pattern Recognition, 42(9),
+        pp.2169-2180. https://doi.org/10.1016/j.patcog.2008.11.030
+    .. [3] Rakthanmanon, T., Campana, B., Mueen, A., Batista, G., Westover,
+        B., Zhu, Q., Zakaria, J. and Keogh, E., 2012. Searching and mining
+        trillions of time series subsequences under dynamic time warping.
+        In Proceedings of the 18th ACM SIGKDD International Conference on
+        Knowledge Discovery and Data Mining, pp.262-270.
+        https://doi.org/10.1145/2339530.2339576
+    """
+    if isinstance(library, DTWLibrary):
+        if window is not None or slope is not None or \
+                metric != 'euclidean' or kwargs:
+            raise ValueError('window, slope and metric are set when the '
+                             'DTWLibrary is created')
+    else:
+        library = DTWLibrary(library, window=window, slope=slope,
+                             metric=metric, **kwargs)
+    return library.knn(query, k=k)
+
+
+def _hausdorff(exp_data, num_data, p=2):
+    r"""
+    Discrete Hausdorff distance with a Minkowski p-norm, a lower bound of
+    the discrete Frechet distance.
+    """
+    if p == 2:
+        return max(directed_hausdorff(exp_data, num_data)[0],
+                   directed_hausdorff(num_data, exp_data)[0])
+    c = distance.cdist(exp_data, num_data, metric='minkowski', p=p)
+    return max(np.min(c, axis=0).max(), np.min(c, axis=1).max())
+
+
+class FrechetIndex(object):
+    r"""
+    Vantage point tree [4]_ for discrete Frechet distance searches.
+
+    The discrete Frechet distance is a metric, so the distance of a query to
+    every curve of a subtree is bounded with the triangle inequality from the
+    distance of the query to the vantage point of the subtree, and whole
+    subtrees are skipped without computing a single distance. The curves
+    that are not skipped are compared with cheap lower bounds first (the
+    distance of the end points, and the discrete Hausdorff distance), then
+    with frechet_leq, and only the remaining ones with frechet_dist.
+
+    Parameters
+    ----------
+    curves : list of array_like or CurveBatch
+        Curves of (P, N) shape, where P is the number of data points of each
+        curve and may differ between curves, and N is the number of
+        dimmensions, which must be the same for all curves.
+    p : float, 1 <= p <= infinity
+        Which Minkowski p-norm to use. Default is p=2 (Eculidean).
+        The manhattan distance is p=1.
+    leaf_size : int, optional
+        Largest number of curves in a leaf of the tree. Default is 8.
+    seed : int, optional
+        Seed of the random choice of the vantage points. Default is 0.
+
+    Attributes
+    ----------
+    curves : CurveBatch
+        The indexed curves.
+
+    Notes
+    -----
+    Building the tree takes about N log(N) discrete Frechet distances for N
+    curves. Save the index with save, and load it with FrechetIndex.load,
+    to build it once.
+
+    Every query returns the number of distances it computed, which is
+    usually a small fraction of the number of curves when the query is
+    close to the indexed curves.
+
+    Examples
+    --------
+    >>> curves = [np.random.random((50, 2)) for i in range(500)]
+    >>> index = FrechetIndex(curves)
+    >>> query = np.random.random((50, 2))
+    >>> indices, distances, counts = index.knn(query, k=3)
+    >>> indices, distances, counts = index.range_query(query, 0.8)
+    >>> index.save('index.npz')
+    >>> index = FrechetIndex.load('index.npz')
+
+    .. [4] Yianilos, P. N., 1993. Data structures and algorithms for nearest
+        neighbor search in general metric spaces. In Proceedings of the
+        Fourth Annual ACM-SIAM Symposium on Discrete Algorithms,
+        pp.311-321.
+    """
+
+    def __init__(self, curves, p=2, leaf_size=8, seed=0):
+        self.curves = CurveBatch(curves)
+        if len(self.curves) == 0:
+            raise ValueError('curves must contain at least one curve')
+        if leaf_size < 1:
+            raise ValueError('leaf_size must be at least 1')
+        self.p = p
+        self.leaf_size = leaf_size
+        self._build(np.random.RandomState(seed))
+
+    def __len__(self):
+        return len(self.curves)
+
+    def _distance(self, i, j):
+        return frechet_dist(self.curves[i], self.curves[j], p=self.p)
+
+    def _build(self, random):
+        r"""
+        Build the tree in flat arrays. Node k is either a leaf, with the
+        curves leaf_items[leaf_start[k]:leaf_stop[k]], or has a vantage
+        point vantage[k], the curves within mu[k] of it in the subtree
+        inner[k], the others in outer[k], and the smallest and largest
+        distance to the vantage point of each child in bounds[k].
+        """
+        vantage, inner, outer, bounds, size = [], [], [], [], []
+        leaf_start, leaf_stop, leaf_items, leaf_dist = [], [], [], []
+
+        def build(items, dist):
+            node = len(vantage)
+            vantage.append(-1)
+            inner.append(-1)
+            outer.append(-1)
+            bounds.append([np.inf, -np.inf, np.inf, -np.inf])
+            size.append(len(items))
+            leaf_start.append(len(leaf_items))
+            if len(items) <= self.leaf_size:
+                leaf_items.extend(items)
+                # distance of each curve to the vantage point of the parent
+                leaf_dist.extend(dist)
+                leaf_stop.append(len(leaf_items))
+                return node
+            leaf_stop.append(len(leaf_items))
+            k = random.randint(len(items))
+            vp = items[k]
+            rest = items[:k] + items[k + 1:]
+            d = np.array([self._distance(vp, i) for i in rest])
+            mu = np.median(d)
+            near = d <= mu
+            if near.all():
+                # all distances equal, split the curves evenly
+                near = np.arange(len(rest)) < len(rest) // 2
+            vantage[node] = vp
+            for child, mask, lo in ((inner, near, 0), (outer, ~near, 2)):
+                part = [rest[i] for i in np.flatnonzero(mask)]
+                if len(part) > 0:
+                    bounds[node][lo:lo + 2] = d[mask].min(), d[mask].max()
+                    child[node] = build(part, d[mask].tolist())
+            return node
+
+        build(list(range(len(self))), [np.nan] * len(self))
+        self._vantage = np.array(vantage, dtype=np.intp)
+        self._inner = np.array(inner, dtype=np.intp)
+        self._outer = np.array(outer, dtype=np.intp)
+        self._bounds = np.array(bounds, dtype=float).reshape(-1, 4)
+        self._size = np.array(size, dtype=np.intp)
+        self._leaf_start = np.array(leaf_start, dtype=np.intp)
+        self._leaf_stop = np.array(leaf_stop, dtype=np.intp)
+        self._leaf_items = np.array(leaf_items, dtype=np.intp)
+        self._leaf_dist = np.array(leaf_dist, dtype=float)
+
+    def save(self, file):
+        r"""
+        Save the index, including the curves, to a .npz file.
+
+        Parameters
+        ----------
+        file : str or file
+            File name or open file, see np.savez.
+        """
+        np.savez(file, data=self.curves.data, offsets=self.curves.offsets,
+                 p=self.p, leaf_size=self.leaf_size, vantage=self._vantage,
+                 inner=self._inner, outer=self._outer, bounds=self._bounds,
+                 size=self._size, leaf_start=self._leaf_start,
+                 leaf_stop=self._leaf_stop, leaf_items=self._leaf_items,
+                 leaf_dist=self._leaf_dist)
+
+    @classmethod
+    def load(cls, file):
+        r"""
+        Load an index saved with save.
+
+        Parameters
+        ----------
+        file : str or file
+            File name or open file, see np.load.
+
+        Returns
+        -------
+        index : FrechetIndex
+        """
+        with np.load(file) as f:
+            index = cls.__new__(cls)
+            index.curves = CurveBatch.from_buffer(f['data'], f['offsets'])
+            index.p = float(f['p'])
+            index.leaf_size = int(f['leaf_size'])
+            for name in ['vantage', 'inner', 'outer', 'bounds', 'size',
+                         'leaf_start', 'leaf_stop', 'leaf_items',
+                         'leaf_dist']:
+                setattr(index, '_' + name, f[name])
+        return index
+
+    def _search(self, query, k=None, radius=np.inf):
+        r"""
+        Best first traversal shared by knn and range_query. With k, the
+        search radius shrinks to the k-th best distance found so far.
+        """
+        query = np.asarray(query, dtype=float)
+        if query.ndim != 2 or query.shape[1] != self.curves[0].shape[1]:
+            raise ValueError('query must have shape (M, {})'.format(
+                             self.curves[0].shape[1]))
+        counts = {'distance': 0, 'decision': 0, 'triangle': 0,
+                  'lb_endpoint': 0, 'lb_hausdorff': 0}
+        found = []
+        state = {'radius': radius}
+
+        def prune(lb):
+            return lb * (1.0 - _LB_RTOL) > state['radius']
+
+        def accept(i, d):
+            if d > state['radius'] or (k is not None and len(found) == k and
+                                       (d, i) > found[-1]):
+                return
+            found.append((d, i))
+            found.sort()
+            if k is not None:
+                del found[k:]
+                if len(found) == k:
+                    state['radius'] = found[-1][0]
+
+        def compare(i, lb):
+            r"""Lower bounds first, the exact distance last."""
+            curve = self.curves[i]
+            ends = _paired_distance(query[[0, -1]] - curve[[0, -1]],
+                                    metric='minkowski', p=self.p).max()
+            if prune(max(lb, ends)):
+                counts['lb_endpoint'] += 1
+                return
+            if prune(_hausdorff(query, curve, p=self.p)):
+                counts['lb_hausdorff'] += 1
+                return
+            if np.isfinite(state['radius']):
+                counts['decision'] += 1
+                if not frechet_leq(query, curve, state['radius'], p=self.p):
+                    return
+            counts['distance'] += 1
+            accept(i, frechet_dist(query, curve, p=self.p))
+
+        # nodes ordered by the lower bound of the distance to their curves
+        heap = [(0.0, 0, np.nan)]
+        while heap:
+            lb, node, d_parent = heapq.heappop(heap)
+            if prune(lb):
+                counts['triangle'] += int(self._size[node])
+                continue
+            vp = self._vantage[node]
+            if vp < 0:
+                for s in range(self._leaf_start[node], self._leaf_stop[node]):
+                    # triangle inequality with the vantage point of the parent
+                    bound = max(lb, abs(d_parent - self._leaf_dist[s])
+                                if np.isfinite(d_parent) else 0.0)
+                    if prune(bound):
+                        counts['triangle'] += 1
+                    else:
+                        compare(self._leaf_items[s], bound)
+                continue
+            counts['distance'] += 1
+            d = frechet_dist(query, self.curves[vp], p=self.p)
+            accept(vp, d)
+            b = self._bounds[node]
+            for child, lo, hi in ((self._inner[node], b[0], b[1]),
+                                  (self._outer[node], b[2], b[3])):
+                if child >= 0:
+                    heapq.heappush(heap, (max(lb, lo - d, d - hi, 0.0),
+                                          child, d))
+        distances = np.array([f[0] for f in found])
+        indices = np.array([f[1] for f in found], dtype=np.intp)
+        return indices, distances, counts
+
+    def knn(self, query, k=1):
+        r"""
+        Find the k curves with the smallest discrete Frechet distance.
+
+        Parameters
+        ----------
+        query : array_like
+            Curve of (M, N) shape.
+        k : int, optional
+            Number of nearest neighbors. Default is 1.
+
+        Returns
+        -------
+        indices : ndarray (1-D)
+            Indices of the k nearest curves, sorted by distance. Ties are
+            broken by the smaller index.
+        distances : ndarray (1-D)
+            Discrete Frechet distances of the k nearest curves, identical to
+            frechet_dist.
+        counts : dict
+            'distance' is the number of frechet_dist evaluations of the
+            query, and 'decision' the number of frechet_leq evaluations.
+            'triangle', 'lb_endpoint' and 'lb_hausdorff' are the number of
+            curves skipped by the triangle inequality and by each lower
+            bound.
+        """
+        if k < 1:
+            raise ValueError('k must be at least 1')
+        return self._search(query, k=min(k, len(self)))
+
+    def range_query(self, query, radius):
+        r"""
+        Find all curves within a discrete Frechet distance of radius.
+
+        Parameters
+        ----------
+        query : array_like
+            Curve of (M, N) shape.
+        radius : float
+            Largest distance.
+
+        Returns
+        -------
+        indices : ndarray (1-D)
+            Indices of the curves with frechet_dist(query, curve) <= radius,
+            sorted by distance, and by index for equal distances.
+        distances : ndarray (1-D)
+            Discrete Frechet distances of those curves.
+        counts : dict
+            Number of distance evaluations and skipped curves, see knn.
+        """
+        return self._search(query, radius=radius)
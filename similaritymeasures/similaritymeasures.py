@@ -1,6 +1,11 @@
 from __future__ import division
+import heapq
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fractions import Fraction
 import numpy as np
 from scipy.spatial import distance
+from . import backends as _backends
 # MIT License
 #
 # Copyright (c) 2018,2019 Charles Jekel
@@ -23,6 +28,30 @@ from scipy.spatial import distance
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+__all__ = ['poly_area', 'is_simple_quad', 'makeQuad', 'get_arc_length',
+           'PreparedCurve', 'area_between_two_curves', 'get_length',
+           'curve_length_measure', 'frechet_dist', 'frechet_leq',
+           'normalizeTwoCurves', 'pcm', 'dtw', 'BandedMatrix', 'dtw_align',
+           'fastdtw', 'dtw_path', 'mae', 'mse']
+
+# number of rows and columns in the blocks of the tiled dynamic programs
+_TILE_SIZE = 512
+# smallest tiles used to fit a tiled dynamic program in a memory budget
+_MIN_TILE_SIZE = 16
+# most refinements of the adaptive offset search of pcm, each of which at
+# least halves the spacing of the offsets
+_PCM_MAX_REFINEMENTS = 64
+# memory in bytes up to which the dynamic programs without a budget compute
+# all local distances at once when the matrix is not returned
+_FULL_MEMORY = 2**30
+
+# bit j of a byte, and the bytes with their bits in reverse order, used to
+# pack boolean rows into integers
+_BITS = (1 << np.arange(8)).astype(np.uint8)
+_BIT_REVERSE = np.packbits(np.unpackbits(np.arange(256, dtype=np.uint8)
+                                         [:, None], axis=1)[:, ::-1], axis=1
+                           ).ravel()
+
 
 def poly_area(x, y):
     r"""
@@ -165,6 +194,37 @@ def makeQuad(x, y):
     return area
 
 
+def _quad_areas(x, y):
+    r"""
+    makeQuad for many quadrilaterals at once.
+
+    makeQuad only reorders the vertices when is_simple_quad returns False,
+    but is_simple_quad returns a NumPy bool, which is never the False
+    singleton, so makeQuad always takes the shoelace area of the vertices in
+    the given order. This does the same for all quadrilaterals, using
+    np.matmul for the dot products of poly_area, which sums in the same
+    order as np.dot, so the areas are identical to makeQuad.
+
+    Parameters
+    ----------
+    x, y : ndarray (2-D)
+        Vertices of the quadrilaterals, of shape (n, 4).
+
+    Returns
+    -------
+    area : ndarray (1-D)
+        Area of every quadrilateral.
+    """
+    x = np.asarray(x)
+    y = np.asarray(y)
+    if x.dtype.kind != 'f':
+        x = x.astype(float)
+        y = y.astype(float)
+    xy = np.matmul(x[:, None, :], np.roll(y, 1, axis=1)[:, :, None])
+    yx = np.matmul(y[:, None, :], np.roll(x, 1, axis=1)[:, :, None])
+    return 0.5*np.abs(xy[:, 0, 0] - yx[:, 0, 0])
+
+
 def get_arc_length(dataset):
     r"""
     Obtain arc length distances between every point in 2-D space
@@ -203,7 +263,155 @@ def get_arc_length(dataset):
     return arcLength, arcLengths
 
 
-def area_between_two_curves(exp_data, num_data):
+class PreparedCurve(object):
+    r"""
+    A curve with the computations that only depend on itself cached.
+
+    Comparing one experimental curve against many numerical curves repeats
+    the work that only depends on the experimental curve for every
+    candidate: the bounds used to normalize both curves and the arc lengths
+    of the normalized curve in pcm, the arc lengths and means in
+    curve_length_measure, and the arc lengths in area_between_two_curves.
+    A PreparedCurve computes each of these once, the first time a measure
+    needs it. Every measure accepts a PreparedCurve in place of exp_data or
+    num_data and gives exactly the same result as with the array.
+
+    Parameters
+    ----------
+    exp_data : array_like
+        Curve from your experimental data. exp_data is of (M, N) shape,
+        where M is the number of data points, and N is the number of
+        dimensions
+    dtype : data-type, optional
+        Data type of the curve. Measures called with a different dtype
+        convert the curve, and then can't use the cache. Default is None,
+        which keeps the data type of exp_data.
+
+    Attributes
+    ----------
+    data : ndarray (2-D)
+        The curve.
+
+    Notes
+    -----
+    The data must not be modified after the curve is prepared.
+
+    Examples
+    --------
+    >>> exp = PreparedCurve(exp_data)
+    >>> p = [pcm(exp, num_data) for num_data in candidates]
+    """
+
+    def __init__(self, exp_data, dtype=None):
+        self.data = np.asarray(exp_data, dtype=dtype)
+        self._cache = {}
+
+    def __len__(self):
+        return len(self.data)
+
+    def __array__(self, dtype=None, copy=None):
+        if copy:
+            return np.array(self.data, dtype=dtype)
+        return np.asarray(self.data, dtype=dtype)
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    def _cached(self, key, fun, *args):
+        if key not in self._cache:
+            self._cache[key] = fun(*args)
+        return self._cache[key]
+
+    def bounds(self):
+        r"""
+        Minimum and maximum x and y of the curve, (minX, maxX, minY, maxY).
+        """
+        def fun():
+            x = self.data[:, 0]
+            y = self.data[:, 1]
+            return np.min(x), np.max(x), np.min(y), np.max(y)
+        return self._cached('bounds', fun)
+
+    def normalize(self, num_data):
+        r"""
+        x and y of a curve normalized to the bounds of this curve, like
+        normalizeTwoCurves.
+        """
+        minX, maxX, minY, maxY = self.bounds()
+        xi = (num_data[:, 0] - minX) / (maxX - minX)
+        eta = (num_data[:, 1] - minY) / (maxY - minY)
+        return xi, eta
+
+    def normalized(self):
+        r"""
+        x and y of this curve normalized to its own bounds.
+        """
+        return self._cached('normalized', self.normalize, self.data)
+
+    def length(self, norm_seg_length=True):
+        r"""
+        get_length of the curve.
+        """
+        return self._cached(('length', bool(norm_seg_length)), get_length,
+                            self.data[:, 0], self.data[:, 1],
+                            norm_seg_length)
+
+    def normalized_length(self, norm_seg_length=True):
+        r"""
+        get_length of the normalized curve.
+        """
+        return self._cached(('normalized_length', bool(norm_seg_length)),
+                            get_length, *self.normalized(),
+                            norm_seg_length)
+
+    def arc_length(self):
+        r"""
+        get_arc_length of the curve.
+        """
+        return self._cached('arc_length', get_arc_length, self.data)
+
+    def mean(self):
+        r"""
+        Mean x and y of the curve.
+        """
+        return self._cached('mean', lambda: (np.mean(self.data[:, 0]),
+                                             np.mean(self.data[:, 1])))
+
+
+def _prepare(curve, dtype=None):
+    r"""
+    The curve as a PreparedCurve, without copying one that already is and
+    has the data type dtype (any data type if dtype is None).
+    """
+    if isinstance(curve, PreparedCurve) and \
+            (dtype is None or curve.data.dtype == dtype):
+        return curve
+    return PreparedCurve(_curve_data(curve), dtype=dtype)
+
+
+def _curve_data(curve):
+    r"""
+    The array of a curve that may be a PreparedCurve.
+    """
+    if isinstance(curve, PreparedCurve):
+        return curve.data
+    return curve
+
+
+def _float_dtype(dtype):
+    r"""
+    Check the dtype option of the measures.
+    """
+    dtype = np.dtype(dtype)
+    if dtype.kind != 'f':
+        raise ValueError('dtype must be a floating point type, not '
+                         + repr(dtype.name))
+    return dtype
+
+
+def area_between_two_curves(exp_data, num_data, engine='heap',
+                            dtype=np.float64):
     r"""
     Calculates the area between two curves.
 
@@ -217,6 +425,21 @@ def area_between_two_curves(exp_data, num_data):
         Curve from your experimental data.
     num_data : ndarray (2-D)
         Curve from your numerical data.
+    engine : str, optional
+        How the shorter curve is refined to the length of the longer curve,
+        by repeatedly adding a point in the middle of its longest segment.
+        The default engine='heap' keeps the segment lengths in a heap and
+        splits segments in place. engine='loop' uses the original loop, which
+        inserts one point at a time into a copy of the curve and recomputes
+        all segment lengths, and is kept as a reference implementation. The
+        heap engine also computes the areas of all quadrilaterals at once,
+        while the loop calls makeQuad for each quadrilateral. Both engines
+        give identical results.
+    dtype : data-type, optional
+        Floating point type of the points and the areas, e.g. np.float32 for
+        data that is only single precision accurate. The segment lengths
+        that decide where points are added are always computed in double
+        precision. Default is np.float64.
 
     Returns
     -------
@@ -228,6 +451,10 @@ def area_between_two_curves(exp_data, num_data):
     Your x locations of data points should be exp_data[:, 0], and the y
     locations of the data points should be exp_data[:, 1]. Same for num_data.
 
+    With engine='heap', refining a curve by k points takes O(k log(k + P))
+    time instead of the O(k P) of the original loop, where P is the number
+    of points of the shorter curve.
+
     .. [1] Jekel, C. F., Venter, G., Venter, M. P., Stander, N., & Haftka, R.
         T. (2018). Similarity measures for identifying material parameters from
         hysteresis loops using inverse analysis. International Journal of
@@ -251,17 +478,65 @@ def area_between_two_curves(exp_data, num_data):
     # then you can calculate the area as
     # area = area_between_two_curves(exp_data, num_data)
 
-    n_exp = len(exp_data)
-    n_num = len(num_data)
+    if engine not in ('heap', 'loop'):
+        raise ValueError("engine must be 'heap' or 'loop', not "
+                         + repr(engine))
+    dtype = _float_dtype(dtype)
+    exp = _prepare(exp_data, dtype)
+    num = _prepare(num_data, dtype)
+    n_exp = len(exp)
+    n_num = len(num)
 
     # the length of exp_data must be larger than the length of num_data
     if n_exp < n_num:
-        temp = num_data.copy()
-        num_data = exp_data.copy()
-        exp_data = temp.copy()
-        n_exp = len(exp_data)
-        n_num = len(num_data)
+        exp, num = num, exp
+        n_exp = len(exp)
+        n_num = len(num)
+    exp_data = exp.data
+    num_data = num.data
+
+    if engine == 'heap':
+        if n_num < n_exp:
+            num_data = _refine_heap(num_data, n_exp, num.arc_length()[1])
+        # the quadrilaterals between consecutive points of both curves
+        x = np.column_stack([exp_data[:-1, 0], exp_data[1:, 0],
+                             num_data[1:, 0], num_data[:-1, 0]])
+        y = np.column_stack([exp_data[:-1, 1], exp_data[1:, 1],
+                             num_data[1:, 1], num_data[:-1, 1]])
+        return np.sum(_quad_areas(x, y))
+    num_data = _refine_loop(num_data, n_exp)
+
+    # Calculate the quadrilateral area, by looping through all of the quads
+    area = []
+    for i in range(1, n_exp):
+        tempX = [exp_data[i-1, 0], exp_data[i, 0], num_data[i, 0],
+                 num_data[i-1, 0]]
+        tempY = [exp_data[i-1, 1], exp_data[i, 1], num_data[i, 1],
+                 num_data[i-1, 1]]
+        area.append(makeQuad(tempX, tempY))
+    return np.sum(area)
+
+
+def _split_segment(ax, ay, bx, by):
+    r"""
+    Point in the middle of the x range of the segment from (ax, ay) to
+    (bx, by), on the segment.
+    """
+    newX = (bx + ax)/2.0
+    #   the interpolation model messes up if x2 < x1 so we do a quick check
+    if ax < bx:
+        newY = np.interp(newX, [ax, bx], [ay, by])
+    else:
+        newY = np.interp(newX, [bx, ax], [by, ay])
+    return newX, newY
+
 
+def _refine_loop(num_data, n_exp):
+    r"""
+    Reference refinement of num_data to n_exp points, see
+    area_between_two_curves.
+    """
+    n_num = len(num_data)
     # get the arc length data of the curves
     # arcexp_data, _ = get_arc_length(exp_data)
     _, arcsnum_data = get_arc_length(num_data)
@@ -273,29 +548,82 @@ def area_between_two_curves(exp_data, num_data):
         a = num_data[0:n_num-1, 0]
         b = num_data[1:n_num, 0]
         nIndex = np.argmax(arcsnum_data)
-        newX = (b[nIndex] + a[nIndex])/2.0
-        #   the interpolation model messes up if x2 < x1 so we do a quick check
-        if a[nIndex] < b[nIndex]:
-            newY = np.interp(newX, [a[nIndex], b[nIndex]],
-                             [num_data[nIndex, 1], num_data[nIndex+1, 1]])
-        else:
-            newY = np.interp(newX, [b[nIndex], a[nIndex]],
-                             [num_data[nIndex+1, 1], num_data[nIndex, 1]])
+        newX, newY = _split_segment(a[nIndex], num_data[nIndex, 1],
+                                    b[nIndex], num_data[nIndex+1, 1])
         num_data = np.insert(num_data, nIndex+1, newX, axis=0)
         num_data[nIndex+1, 1] = newY
 
         _, arcsnum_data = get_arc_length(num_data)
         n_num = len(num_data)
+    return num_data
 
-    # Calculate the quadrilateral area, by looping through all of the quads
-    area = []
-    for i in range(1, n_exp):
-        tempX = [exp_data[i-1, 0], exp_data[i, 0], num_data[i, 0],
-                 num_data[i-1, 0]]
-        tempY = [exp_data[i-1, 1], exp_data[i, 1], num_data[i, 1],
-                 num_data[i-1, 1]]
-        area.append(makeQuad(tempX, tempY))
-    return np.sum(area)
+
+def _refine_heap(num_data, n_exp, arcs=None):
+    r"""
+    Refine num_data to n_exp points with a heap of segment lengths.
+
+    This inserts the same points as _refine_loop. The points are kept in a
+    linked list, so a segment is split in place, and the longest segment is
+    popped from a heap. Ties are broken by the position of the segment along
+    the curve like np.argmax, using the start of the segment as a fraction
+    of the original segment it is part of.
+
+    Parameters
+    ----------
+    num_data : ndarray (2-D)
+        The curve to refine.
+    n_exp : int
+        Number of points of the refined curve.
+    arcs : array_like, optional
+        The arc lengths of num_data from get_arc_length, when they are
+        already known.
+
+    Returns
+    -------
+    refined : ndarray (2-D)
+        num_data with n_exp points.
+    """
+    n_num = len(num_data)
+    dtype = num_data.dtype
+    if dtype == np.float64:
+        x = num_data[:, 0].tolist() + [0.0] * (n_exp - n_num)
+        y = num_data[:, 1].tolist() + [0.0] * (n_exp - n_num)
+    else:
+        # NumPy scalars, so that the new points are computed in the
+        # precision of the curve like in _refine_loop
+        x = list(num_data[:, 0]) + [dtype.type(0)] * (n_exp - n_num)
+        y = list(num_data[:, 1]) + [dtype.type(0)] * (n_exp - n_num)
+    following = list(range(1, n_num)) + [-1] * (n_exp - n_num + 1)
+    if arcs is None:
+        _, arcs = get_arc_length(num_data)
+    # (-length, position, depth, first point) of every segment
+    heap = [(-length, i, 0, i) for i, length in
+            enumerate(arcs.tolist())]
+    heapq.heapify(heap)
+    for k in range(n_num, n_exp):
+        _, position, depth, i = heapq.heappop(heap)
+        j = following[i]
+        newX, newY = _split_segment(x[i], y[i], x[j], y[j])
+        # np.interp computes newY in double precision
+        newY = dtype.type(newY)
+        x[k] = newX
+        y[k] = newY
+        following[i] = k
+        following[k] = j
+        # the same lengths that get_arc_length gives for the whole curve
+        _, (left, right) = get_arc_length(np.array([[x[i], y[i]],
+                                                    [newX, newY],
+                                                    [x[j], y[j]]]))
+        heapq.heappush(heap, (-left, position, depth + 1, i))
+        heapq.heappush(heap, (-right, position + Fraction(1, 2**(depth + 1)),
+                              depth + 1, k))
+    order = [0] * n_exp
+    for k in range(1, n_exp):
+        order[k] = following[order[k - 1]]
+    refined = np.empty((n_exp, 2), dtype=dtype)
+    refined[:, 0] = np.take(x, order)
+    refined[:, 1] = np.take(y, order)
+    return refined
 
 
 def get_length(x, y, norm_seg_length=True):
@@ -329,8 +657,6 @@ def get_length(x, y, norm_seg_length=True):
     >>> le, le_total, le_cum = get_length(x, y)
 
     """
-    n = len(x)
-
     if norm_seg_length:
         xmax = np.max(np.abs(x))
         ymax = np.max(np.abs(y))
@@ -345,17 +671,34 @@ def get_length(x, y, norm_seg_length=True):
         ymax = 1.0
         xmax = 1.0
 
-    le = np.zeros(n)
-    le[0] = 0.0
-    l_sum = np.zeros(n)
-    l_sum[0] = 0.0
-    for i in range(0, n-1):
-        le[i+1] = np.sqrt((((x[i+1]-x[i])/xmax)**2)+(((y[i+1]-y[i])/ymax)**2))
-        l_sum[i+1] = l_sum[i]+le[i+1]
+    le, l_sum = _backends.kernel('segment_lengths')(x, y, xmax, ymax)
     return le, np.sum(le), l_sum
 
 
-def curve_length_measure(exp_data, num_data):
+def _segment_lengths(x, y, xmax, ymax):
+    r"""
+    Scaled length of each segment of a curve, after a zero for the first
+    point, and their cumulative sum, see get_length.
+
+    This gives the same result as the loop le[i+1] = sqrt(((x[i+1]-x[i]) /
+    xmax)**2 + ((y[i+1]-y[i])/ymax)**2), l_sum[i+1] = l_sum[i] + le[i+1].
+    The squares use np.float_power, which calls pow like the ** of a
+    scalar, while ** of an array multiplies, which can differ in the last
+    bit. np.cumsum adds the lengths one after another. Single precision
+    curves keep their precision, but np.float_power only computes in double
+    precision, so their squares are multiplications.
+    """
+    dx = np.diff(x) / xmax
+    dy = np.diff(y) / ymax
+    le = np.zeros(len(x), dtype=np.result_type(dx, dy))
+    if le.dtype == np.float64:
+        le[1:] = np.sqrt(np.float_power(dx, 2) + np.float_power(dy, 2))
+    else:
+        le[1:] = np.sqrt(np.square(dx) + np.square(dy))
+    return le, np.cumsum(le)
+
+
+def curve_length_measure(exp_data, num_data, dtype=np.float64):
     r"""
     Compute the curve length based distance between two curves.
 
@@ -369,6 +712,11 @@ def curve_length_measure(exp_data, num_data):
         Curve from your experimental data.
     num_data : ndarray (2-D)
         Curve from your numerical data.
+    dtype : data-type, optional
+        Floating point type of the computation, e.g. np.float32 for data
+        that is only single precision accurate. np.interp always computes in
+        double precision, and the interpolated points are rounded to dtype.
+        Default is np.float64.
 
     Returns
     -------
@@ -403,30 +751,34 @@ def curve_length_measure(exp_data, num_data):
         http://www.sciencedirect.com/science/article/pii/S0020740311002451
 
     """
-    x_e = exp_data[:, 0]
-    y_e = exp_data[:, 1]
-    x_c = num_data[:, 0]
-    y_c = num_data[:, 1]
+    dtype = _float_dtype(dtype)
+    exp = _prepare(exp_data, dtype)
+    num = _prepare(num_data, dtype)
+    x_e = exp.data[:, 0]
+    y_e = exp.data[:, 1]
+    x_c = num.data[:, 0]
+    y_c = num.data[:, 1]
 
-    _, le_nj, le_sum = get_length(x_e, y_e)
-    _, lc_nj, lc_sum = get_length(x_c, y_c)
+    _, le_nj, le_sum = exp.length()
+    _, lc_nj, lc_sum = num.length()
 
-    xmean = np.mean(x_e)
-    ymean = np.mean(y_e)
+    xmean, ymean = exp.mean()
 
     factor = lc_nj/le_nj
 
     lieq = le_sum * factor
 
-    xinterp = np.interp(lieq, lc_sum, x_c)
-    yinterp = np.interp(lieq, lc_sum, y_c)
+    xinterp = np.interp(lieq, lc_sum, x_c).astype(dtype, copy=False)
+    yinterp = np.interp(lieq, lc_sum, y_c).astype(dtype, copy=False)
 
     r_sq = np.log(1.0 + (np.abs(xinterp-x_e)/xmean))**2
     r_sq += np.log(1.0 + (np.abs(yinterp-y_e)/ymean))**2
     return np.sqrt(np.sum(r_sq))
 
 
-def frechet_dist(exp_data, num_data, p=2):
+def frechet_dist(exp_data, num_data, p=2, window=None, slope=None,
+                 return_matrix=False, engine='wavefront', n_jobs=None,
+                 max_memory=None, dtype=np.float64):
     r"""
     Compute the discrete Frechet distance
 
@@ -448,11 +800,62 @@ def frechet_dist(exp_data, num_data, p=2):
     p : float, 1 <= p <= infinity
         Which Minkowski p-norm to use. Default is p=2 (Eculidean).
         The manhattan distance is p=1.
+    window : int, optional
+        Sakoe-Chiba band radius, see dtw. Restricting the coupling to a band
+        around the diagonal gives an upper bound of the discrete Frechet
+        distance that is computed in linear time and memory. Default is None.
+    slope : float, optional
+        Itakura parallelogram slope (>= 1), see dtw. The coupling matrix of
+        the parallelogram is stored in about (1 - 1 / slope) * M * P values,
+        which grows with the square of the length of the curves unless
+        window is also given. Default is None.
+    return_matrix : boolean, optional
+        Whether to also return the coupling matrix. Default is False, see
+        max_memory for how much memory is used without it.
+    engine : str, optional
+        How the coupling matrix is filled. The default engine='wavefront'
+        updates one anti-diagonal at a time with vectorized np.minimum and
+        np.maximum calls. engine='loop' uses the original element by element
+        Python loop, which is kept as a reference implementation.
+        engine='search' never fills the coupling matrix, and instead finds
+        the smallest local distance eps for which frechet_leq is True with a
+        binary search. It stores the local distances, and is usually faster
+        than the wavefront on long curves that are similar to each other.
+        All engines give identical results.
+    n_jobs : int, optional
+        Number of threads that fill the coupling matrix with the wavefront
+        engine, -1 for one per CPU. The matrix is split into tiles whose
+        local distances are computed on demand, and the tiles on each
+        anti-diagonal of tiles are filled concurrently. This speeds up a
+        single pair of very long curves, and gives exactly the same result
+        as a single thread. Default is None, which uses one thread. Ignored
+        with window or slope.
+    max_memory : int, optional
+        Memory budget in bytes of the wavefront engine. If the local
+        distances and the coupling matrix both fit in the budget, they are
+        computed at once, which is the fastest. Otherwise the local distances
+        are computed on demand in tiles, and only the coupling matrix is
+        stored if return_matrix=True, or only two rows of it if
+        return_matrix=False, so memory grows with the length of the shorter
+        curve. A ValueError is raised if the coupling matrix doesn't fit in
+        the budget with return_matrix=True. All strategies give identical
+        results. Default is None, which has no budget: the coupling matrix
+        is always returned, and without it the local distances are only
+        computed at once if they take at most 1 GiB.
+    dtype : data-type, optional
+        Floating point type of the local distances and the coupling matrix.
+        np.float32 halves their memory, which also doubles the size of the
+        curves that fit in max_memory. cdist always computes in double
+        precision, and its distances are rounded to dtype tile by tile.
+        Default is np.float64.
 
     Returns
     -------
     df : float
         discrete Frechet distance
+    ca : ndarray (2-D) or BandedMatrix
+        Coupling matrix, where df is ca[-1, -1]. Only returned if
+        return_matrix=True.
 
     Notes
     -----
@@ -462,6 +865,9 @@ def frechet_dist(exp_data, num_data, p=2):
     Thanks to Arbel Amir for the issue, and Sen ZHANG for the iterative code
     https://github.com/cjekel/similarity_measures/issues/6
 
+    The coupling matrix is filled one anti-diagonal at a time, using
+    vectorized np.minimum and np.maximum calls on each anti-diagonal.
+
     Examples
     --------
     >>> # Generate random experimental data
@@ -478,15 +884,64 @@ def frechet_dist(exp_data, num_data, p=2):
     >>> num_data[:, 1] = y
     >>> df = frechet_dist(exp_data, num_data)
 
+    The binary search engine gives the same result without a coupling
+    matrix.
+
+    >>> df = frechet_dist(exp_data, num_data, engine='search')
+
     .. [3] Thomas Eiter and Heikki Mannila. Computing discrete Frechet
         distance. Technical report, 1994.
         http://www.kr.tuwien.ac.at/staff/eiter/et-archive/cdtr9464.pdf
         http://citeseerx.ist.psu.edu/viewdoc/download?doi=10.1.1.90.937&rep=rep1&type=pdf
     """
-    n = len(exp_data)
-    m = len(num_data)
-    c = distance.cdist(exp_data, num_data, metric='minkowski', p=p)
-    ca = np.ones((n, m))
+    if engine not in ('wavefront', 'loop', 'search'):
+        raise ValueError("engine must be 'wavefront', 'loop' or 'search', "
+                         "not " + repr(engine))
+    dtype = _float_dtype(dtype)
+    exp_data = _curve_data(exp_data)
+    num_data = _curve_data(num_data)
+    if engine == 'search':
+        if return_matrix:
+            raise ValueError("engine='search' does not compute the coupling "
+                             "matrix, use return_matrix=False")
+        return _frechet_search(exp_data, num_data, p=p, window=window,
+                               slope=slope, dtype=dtype)
+    if window is not None or slope is not None:
+        lo, hi = _band_limits(len(exp_data), len(num_data), window=window,
+                              slope=slope)
+        ca = _banded_dp(exp_data, num_data, lo, hi, kind='frechet',
+                        metric='minkowski', dtype=dtype, p=p)
+    elif engine == 'wavefront':
+        df, ca = _solve_dp(exp_data, num_data, kind='frechet',
+                           metric='minkowski', return_matrix=return_matrix,
+                           max_memory=max_memory, n_jobs=n_jobs, dtype=dtype,
+                           p=p)
+        if not return_matrix:
+            return df
+    else:
+        c = distance.cdist(exp_data, num_data, metric='minkowski', p=p)
+        ca = _frechet_loop(c.astype(dtype, copy=False))
+    if return_matrix:
+        return ca[-1, -1], ca
+    return ca[-1, -1]
+
+
+def _frechet_loop(c):
+    r"""
+    Reference discrete Frechet distance using a Python double loop.
+
+    Parameters
+    ----------
+    c : ndarray (2-D)
+        Local cost matrix between the two curves.
+
+    Returns
+    -------
+    ca : ndarray (2-D)
+        Coupling matrix, the discrete Frechet distance is ca[-1, -1].
+    """
+    n, m = c.shape
+    ca = np.ones((n, m), dtype=c.dtype)
     ca = np.multiply(ca, -1)
     ca[0, 0] = c[0, 0]
     for i in range(1, n):
@@ -497,7 +952,219 @@ def frechet_dist(exp_data, num_data, p=2):
         for j in range(1, m):
             ca[i, j] = max(min(ca[i-1, j], ca[i, j-1], ca[i-1, j-1]),
                            c[i, j])
-    return ca[n-1, m-1]
+    return ca
+
+
+def frechet_leq(exp_data, num_data, eps, p=2, window=None, slope=None):
+    r"""
+    Decide whether the discrete Frechet distance is at most eps.
+
+    This answers frechet_dist(exp_data, num_data) <= eps without computing
+    the coupling matrix. A pair of points is free when their distance is at
+    most eps, and the distance is at most eps exactly when (M - 1, P - 1) is
+    reachable from (0, 0) through free pairs with steps that advance along
+    one or both curves [4]_. The reachable pairs are swept one row at a time,
+    with the row stored as the bits of an integer, so a whole row is updated
+    with a handful of integer operations. The sweep stops as soon as a row
+    has no reachable pair.
+
+    Parameters
+    ----------
+    exp_data : array_like
+        Curve from your experimental data. exp_data is of (M, N) shape, where
+        M is the number of data points, and N is the number of dimmensions
+    num_data : array_like
+        Curve from your numerical data. num_data is of (P, N) shape, where P
+        is the number of data points, and N is the number of dimmensions
+    eps : float
+        Distance threshold.
+    p : float, 1 <= p <= infinity
+        Which Minkowski p-norm to use. Default is p=2 (Eculidean).
+        The manhattan distance is p=1.
+    window : int, optional
+        Sakoe-Chiba band radius, see frechet_dist. Default is None.
+    slope : float, optional
+        Itakura parallelogram slope (>= 1), see frechet_dist. Default is
+        None.
+
+    Returns
+    -------
+    leq : boolean
+        True if frechet_dist(exp_data, num_data, p, window, slope) <= eps.
+
+    Notes
+    -----
+    The local distances are computed in blocks of rows, so memory grows with
+    the length of the curves. When the distance is larger than eps, the
+    sweep usually stops long before the last row.
+
+    Examples
+    --------
+    >>> # Generate random experimental data
+    >>> x = np.random.random(100)
+    >>> y = np.random.random(100)
+    >>> exp_data = np.zeros((100, 2))
+    >>> exp_data[:, 0] = x
+    >>> exp_data[:, 1] = y
+    >>> # Generate random numerical data
+    >>> x = np.random.random(100)
+    >>> y = np.random.random(100)
+    >>> num_data = np.zeros((100, 2))
+    >>> num_data[:, 0] = x
+    >>> num_data[:, 1] = y
+    >>> close = frechet_leq(exp_data, num_data, 0.5)
+
+    .. [4] Alt, H. and Godau, M., 1995. Computing the Frechet distance
+        between two polygonal curves. International Journal of Computational
+        Geometry & Applications, 5(1-2), pp.75-91.
+        https://doi.org/10.1142/S0218195995000064
+    """
+    exp_data = np.asarray(exp_data, dtype=float)
+    num_data = np.asarray(num_data, dtype=float)
+    n = len(exp_data)
+    m = len(num_data)
+    # every coupling contains both pairs of end points
+    ends = distance.cdist(exp_data[[0, -1]], num_data[[0, -1]],
+                          metric='minkowski', p=p)
+    if ends[0, 0] > eps or ends[1, 1] > eps:
+        return False
+    lo, hi = _band_limits(n, m, window=window, slope=slope)
+    band = window is not None or slope is not None
+
+    def rows():
+        for r0, j0, cost in _cost_blocks(exp_data, num_data, lo, hi,
+                                         metric='minkowski', p=p):
+            for i, f in enumerate(_row_bits(_pack_rows(cost <= eps), j0)):
+                if band:
+                    f &= (1 << int(hi[r0 + i])) - (1 << int(lo[r0 + i]))
+                yield f
+
+    return _frechet_reachable(rows(), m)
+
+
+def _pack_rows(free):
+    r"""
+    Pack the rows of a boolean matrix into bytes, with column j in bit
+    j % 8 of byte j // 8 of its row.
+    """
+    return _BIT_REVERSE[np.packbits(free, axis=1)]
+
+
+def _row_bits(packed, offsets=0):
+    r"""
+    Rows of a matrix packed with _pack_rows as integers, where bit j is
+    column j + offset of the row.
+    """
+    offsets = np.broadcast_to(offsets, len(packed)).tolist()
+    for row, offset in zip(packed, offsets):
+        yield int.from_bytes(row.tobytes(), 'little') << offset
+
+
+def _frechet_reachable(rows, m):
+    r"""
+    Reachability sweep of the free pairs, see frechet_leq.
+
+    Row i of the reachable pairs is stored in the bits of an integer. A free
+    pair is entered from above or from the upper left, which gives the seeds
+    x of the row, and then propagates to the right through its run of free
+    pairs. Adding x to the free bits f carries a one through each run that
+    contains a seed, so the reachable bits are f & (((f + x) ^ f) | x).
+
+    Parameters
+    ----------
+    rows : iterable of int
+        Free pairs of every row, where bit j is column j.
+    m : int
+        Number of columns.
+
+    Returns
+    -------
+    leq : boolean
+        True if the last pair is reachable.
+    """
+    reach = 0
+    for i, f in enumerate(rows):
+        if i == 0:
+            x = f & 1
+        else:
+            x = f & (reach | (reach << 1))
+        reach = f & (((f + x) ^ f) | x)
+        if not reach:
+            return False
+    return bool(reach >> (m - 1) & 1)
+
+
+def _frechet_search(exp_data, num_data, p=2, window=None, slope=None,
+                    dtype=np.float64):
+    r"""
+    Exact discrete Frechet distance from a binary search over the local
+    distances with _frechet_reachable.
+
+    The distance is one of the local distances. It is at least the distance
+    of both pairs of end points, and at least the smallest distance of every
+    row, because every point is coupled to some point, and at most the
+    distance with a narrow band. After testing the lower bound, which is
+    often the distance itself, the search repeatedly tests the median of
+    the remaining candidates, which needs the same number of decisions as a
+    binary search over the sorted unique distances, without sorting them.
+
+    Once few candidates remain, the pairs that are free for every remaining
+    candidate are packed once, and each decision only adds the free pairs
+    among the candidates, instead of comparing the whole cost matrix.
+    """
+    exp_data = np.asarray(exp_data, dtype=float)
+    num_data = np.asarray(num_data, dtype=float)
+    n = len(exp_data)
+    m = len(num_data)
+    if window is not None or slope is not None:
+        lo, hi = _band_limits(n, m, window=window, slope=slope)
+        c = _banded_cost(exp_data, num_data, lo, hi, metric='minkowski',
+                         dtype=dtype, p=p)
+        last = c[-1, hi[-1] - lo[-1] - 1]
+        upper = c[np.isfinite(c)].max()
+        offsets = lo
+    else:
+        c = distance.cdist(exp_data, num_data, metric='minkowski', p=p)
+        c = c.astype(dtype, copy=False)
+        last = c[-1, -1]
+        upper = frechet_dist(exp_data, num_data, p=p, window=1, dtype=dtype)
+        offsets = 0
+    lower = max(c[0, 0], last, np.min(c, axis=1).max())
+    values = c[(c >= lower) & (c <= upper)]
+    best = upper
+    cells = None
+    # the lower bound is often the distance, so it is tested first
+    pivot = lower
+    while len(values) > 0:
+        if pivot is None:
+            k = len(values) // 2
+            pivot = np.partition(values, k)[k]
+        if cells is None and 32 * len(values) > c.size:
+            packed = _pack_rows(c <= pivot)
+        else:
+            if cells is None:
+                known = _pack_rows(c < values.min())
+                cells = np.nonzero((c >= values.min()) &
+                                   (c <= values.max()))
+                values = c[cells]
+                cells = cells[0], cells[1] >> 3, _BITS[cells[1] & 7]
+            packed = known.copy()
+            free = values <= pivot
+            np.bitwise_or.at(packed, tuple(x[free] for x in cells[:2]),
+                             cells[2][free])
+        if _frechet_reachable(_row_bits(packed, offsets), m):
+            best = pivot
+            keep = values < pivot
+        else:
+            keep = values > pivot
+            if cells is not None:
+                # pairs up to the pivot are free for the remaining candidates
+                known = packed
+        values = values[keep]
+        if cells is not None:
+            cells = tuple(x[keep] for x in cells)
+        pivot = None
+    return best
 
 
 def normalizeTwoCurves(x, y, w, z):
@@ -552,7 +1219,8 @@ def normalizeTwoCurves(x, y, w, z):
     return xi, eta, xiP, etaP
 
 
-def pcm(exp_data, num_data, norm_seg_length=False):
+def pcm(exp_data, num_data, norm_seg_length=False, n_offsets=None, tol=None,
+        engine='batched', dtype=np.float64):
     """
     Compute the Partial Curve Mapping area.
 
@@ -569,6 +1237,27 @@ def pcm(exp_data, num_data, norm_seg_length=False):
         Whether to divide the segment length of each curve by the maximum. The
         default value is false, which more closely follows the algorithm
         proposed in [1]_. Versions prior to 0.6.0 used `norm_seg_length=True`.
+    n_offsets : int, optional
+        Number of evenly spaced offsets of the shorter curve along the longer
+        curve that are evaluated. Default is 200, or 16 for each refinement
+        of the adaptive search.
+    tol : float, optional
+        Turns on the adaptive offset search. The offsets are first evaluated
+        on a coarse grid of n_offsets points, and then n_offsets points
+        strictly between the neighbors of the best offset are evaluated,
+        until their spacing is below tol times the range of the offsets.
+        Default is None, which evaluates a single grid.
+    engine : str, optional
+        How the offsets are evaluated. The default engine='batched' evaluates
+        many offsets at once with a single np.interp call per coordinate, in
+        chunks that keep the memory use small. engine='loop' calls
+        np.interp for each offset, and is kept as a reference implementation.
+        Both engines give identical results.
+    dtype : data-type, optional
+        Floating point type of the computation, e.g. np.float32 for data
+        that is only single precision accurate. np.interp always computes in
+        double precision, and the interpolated points are rounded to dtype.
+        Default is np.float64.
 
     Returns
     -------
@@ -583,6 +1272,11 @@ def pcm(exp_data, num_data, norm_seg_length=False):
     PCM distance was changed in version 0.6.0. To get the same results from
     previous versions, set `norm_seg_length=True`.
 
+    The adaptive search assumes that the best offset is close to the best
+    offset of the coarse grid. It needs far fewer evaluations than a fine
+    grid, e.g. tol=1e-3 with 16 offsets takes four refinements, instead of
+    the 1000 offsets of a grid with the same spacing.
+
     Examples
     --------
     >>> # Generate random experimental data
@@ -599,6 +1293,10 @@ def pcm(exp_data, num_data, norm_seg_length=False):
     >>> num_data[:, 1] = y
     >>> p = pcm(exp_data, num_data)
 
+    Search the offsets adaptively
+
+    >>> p = pcm(exp_data, num_data, tol=1e-3)
+
     .. [5] Katharina Witowski and Nielen Stander. "Parameter Identification of
         Hysteretic Models Using Partial Curve Mapping", 12th AIAA Aviation
         Technology, Integration, and Operations (ATIO) Conference and 14th
@@ -607,36 +1305,35 @@ def pcm(exp_data, num_data, norm_seg_length=False):
         doi: doi:10.2514/6.2012-5580.
     """
     # normalize the curves to the experimental data
-    xi1, eta1, xi2, eta2 = normalizeTwoCurves(exp_data[:, 0], exp_data[:, 1],
-                                              num_data[:, 0], num_data[:, 1])
+    dtype = _float_dtype(dtype)
+    exp = _prepare(exp_data, dtype)
+    xi1, eta1 = exp.normalized()
+    xi2, eta2 = exp.normalize(np.asarray(_curve_data(num_data), dtype=dtype))
     # compute the arc lengths of each curve
-    le, le_nj, le_sum = get_length(xi1, eta1, norm_seg_length)
+    le, le_nj, le_sum = exp.normalized_length(norm_seg_length)
     lc, lc_nj, lc_sum = get_length(xi2, eta2, norm_seg_length)
+    # right now exp_data is curve a, and num_data is curve b
+    # make sure a is shorter than a', if not swap the defintion
+    if lc_nj > le_nj:
+        le, lc = lc, le
+        le_nj, lc_nj = lc_nj, le_nj
+        le_sum, lc_sum = lc_sum, le_sum
+        # swap xi1, eta1 with xi2, eta2
+        xi1, eta1, xi2, eta2 = xi2, eta2, xi1, eta1
     # scale each segment to the total polygon length
     le = le / le_nj
     le_sum = le_sum / le_nj
     lc = lc / lc_nj
     lc_sum = lc_sum / lc_nj
-    # right now exp_data is curve a, and num_data is curve b
-    # make sure a is shorter than a', if not swap the defintion
-    if lc_nj > le_nj:
-        # compute the arc lengths of each curve
-        le, le_nj, le_sum = get_length(xi2, eta2, norm_seg_length)
-        lc, lc_nj, lc_sum = get_length(xi1, eta1, norm_seg_length)
-        # scale each segment to the total polygon length
-        le = le / le_nj
-        le_sum = le_sum / le_nj
-        lc = lc / lc_nj
-        lc_sum = lc_sum / lc_nj
-        # swap xi1, eta1 with xi2, eta2
-        xi1OLD = xi1.copy()
-        eta1OLD = eta1.copy()
-        xi1 = xi2.copy()
-        eta1 = eta2.copy()
-        xi2 = xi1OLD.copy()
-        eta2 = eta1OLD.copy()
 
-    n_sum = len(le_sum)
+    if engine not in ('batched', 'loop'):
+        raise ValueError("engine must be 'batched' or 'loop', not "
+                         + repr(engine))
+    if engine == 'batched':
+        evaluate = _pcm_batched
+    else:
+        evaluate = _pcm_loop
+    curves = (xi1, eta1, xi2, eta2, le_sum, lc_sum)
 
     min_offset = 0.0
     max_offset = le_nj - lc_nj
@@ -644,17 +1341,53 @@ def pcm(exp_data, num_data, norm_seg_length=False):
     # make sure the curves aren't the same length
     # if they are the same length, don't loop 200 times
     if min_offset == max_offset:
-        offsets = [min_offset]
-        pcm_dists = np.zeros(1)
-    else:
-        offsets = np.linspace(min_offset, max_offset, 200)
-        pcm_dists = np.zeros(200)
-
+        return np.min(evaluate(np.zeros(1, dtype=dtype), *curves))
+    if tol is None:
+        if n_offsets is None:
+            n_offsets = 200
+        offsets = np.linspace(min_offset, max_offset, n_offsets, dtype=dtype)
+        return np.min(evaluate(offsets, *curves))
+    if n_offsets is None:
+        n_offsets = 16
+    if n_offsets < 3:
+        raise ValueError('n_offsets must be at least 3 for the adaptive '
+                         'search')
+    best = np.inf
+    step = np.inf
+    offsets = np.linspace(min_offset, max_offset, n_offsets, dtype=dtype)
+    for _ in range(_PCM_MAX_REFINEMENTS):
+        pcm_dists = evaluate(offsets, *curves)
+        i = np.argmin(pcm_dists)
+        best = np.minimum(best, pcm_dists[i])
+        new_step = offsets[1] - offsets[0]
+        # also stops for curves whose lengths are NaN, and when rounding
+        # keeps the offsets from getting any closer
+        if not (new_step > tol * (max_offset - min_offset)
+                and new_step < step):
+            return best
+        step = new_step
+        # refine strictly between the neighbors of the best offset, which
+        # are already evaluated, so the spacing at least halves
+        lo = max(min_offset, offsets[i] - step)
+        hi = min(max_offset, offsets[i] + step)
+        offsets = np.linspace(lo, hi, n_offsets + 2, dtype=dtype)[1:-1]
+    return best
+
+
+def _pcm_loop(offsets, xi1, eta1, xi2, eta2, le_sum, lc_sum):
+    r"""
+    Reference PCM area of every offset, see pcm.
+    """
+    n_sum = len(le_sum)
+    dtype = le_sum.dtype
+    pcm_dists = np.zeros(len(offsets), dtype=dtype)
     for i, offset in enumerate(offsets):
         # create linear interpolation model for num_data based on arc length
         # evaluate linear interpolation model based on xi and eta of exp data
-        xitemp = np.interp(le_sum+offset, lc_sum, xi2)
-        etatemp = np.interp(le_sum+offset, lc_sum, eta2)
+        xitemp = np.interp(le_sum+offset, lc_sum, xi2).astype(dtype,
+                                                              copy=False)
+        etatemp = np.interp(le_sum+offset, lc_sum, eta2).astype(dtype,
+                                                                copy=False)
 
         d = np.sqrt((eta1-etatemp)**2 + (xi1-xitemp)**2)
         d1 = d[:-1]
@@ -663,10 +1396,40 @@ def pcm(exp_data, num_data, norm_seg_length=False):
 
         v = 0.5*(d1+d2)*le_sum[1:n_sum]
         pcm_dists[i] = np.sum(v)
-    return np.min(pcm_dists)
+    return pcm_dists
+
+
+def _pcm_batched(offsets, xi1, eta1, xi2, eta2, le_sum, lc_sum,
+                 max_cells=2**14):
+    r"""
+    PCM area of every offset, evaluated for many offsets at once.
+
+    The arc length positions of all offsets of a chunk form one 2-D array,
+    which is interpolated with a single np.interp call for each coordinate.
+    np.interp starts the search for the interval of each position from the
+    interval of the previous position, so the sorted positions of each
+    offset are located in linear time. Chunks hold at most max_cells
+    positions, small enough for the temporary arrays to stay in the cache.
+    The results are identical to _pcm_loop.
+    """
+    n_sum = len(le_sum)
+    dtype = le_sum.dtype
+    pcm_dists = np.zeros(len(offsets), dtype=dtype)
+    step = max(1, max_cells // n_sum)
+    for k in range(0, len(offsets), step):
+        positions = le_sum + offsets[k:k + step, None]
+        xitemp = np.interp(positions, lc_sum, xi2).astype(dtype, copy=False)
+        etatemp = np.interp(positions, lc_sum, eta2).astype(dtype,
+                                                            copy=False)
+        d = np.sqrt((eta1-etatemp)**2 + (xi1-xitemp)**2)
+        v = 0.5*(d[:, :-1]+d[:, 1:n_sum])*le_sum[1:n_sum]
+        pcm_dists[k:k + step] = np.sum(v, axis=1)
+    return pcm_dists
 
 
-def dtw(exp_data, num_data, metric='euclidean', **kwargs):
+def dtw(exp_data, num_data, metric='euclidean', window=None, slope=None,
+        return_matrix=True, abandon_above=None, engine='wavefront',
+        n_jobs=None, max_memory=None, dtype=np.float64, **kwargs):
     r"""
     Compute the Dynamic Time Warping distance.
 
@@ -690,6 +1453,60 @@ def dtw(exp_data, num_data, metric='euclidean', **kwargs):
         'mahalanobis', 'matching', 'minkowski', 'rogerstanimoto', 'russellrao',
         'seuclidean', 'sokalmichener', 'sokalsneath', 'sqeuclidean',
         'wminkowski', 'yule'.
+    window : int, optional
+        Sakoe-Chiba band radius. If given, exp_data[i] may only be matched
+        to the num_data points that are at most window indices away from the
+        diagonal of the cumulative distance matrix. The diagonal is scaled to
+        run from (0, 0) to (M-1, P-1) when the curves have different lengths.
+        Default is None, which doesn't constrain the warping path.
+    slope : float, optional
+        Itakura parallelogram slope (>= 1). If given, the warping path may
+        not be steeper than slope, or flatter than 1/slope, with respect to
+        the scaled diagonal. Can be combined with window. Default is None.
+    return_matrix : boolean, optional
+        Whether to return the cumulative distance matrix. Default is True.
+        With return_matrix=False only the DTW distance is returned, see
+        max_memory for how much memory is used.
+    abandon_above : float, optional
+        Upper bound for early abandoning, e.g. the best distance found so far
+        in a nearest neighbor search. Cells of the cumulative distance matrix
+        that exceed the bound are skipped (set to np.inf), and the
+        computation stops as soon as no warping path can stay below the
+        bound, in which case r is np.inf. Distances <= abandon_above are
+        identical to the result without a bound. Default is None.
+    engine : str, optional
+        How the cumulative distance matrix is filled. The default
+        engine='wavefront' updates one anti-diagonal of the matrix at a time
+        with vectorized NumPy operations. engine='loop' uses the original
+        element by element Python loop, which is much slower and only kept as
+        a reference implementation. Both engines give identical results.
+    n_jobs : int, optional
+        Number of threads that fill the cumulative distance matrix with the
+        wavefront engine, -1 for one per CPU. The matrix is split into tiles
+        whose local distances are computed on demand, and the tiles on each
+        anti-diagonal of tiles are filled concurrently. This speeds up a
+        single pair of very long curves, and gives exactly the same result
+        as a single thread. Default is None, which uses one thread. Ignored
+        with window or slope.
+    max_memory : int, optional
+        Memory budget in bytes of the wavefront engine. If the local
+        distances and the cumulative distance matrix both fit in the budget,
+        they are computed at once, which is the fastest. Otherwise the local
+        distances are computed on demand in tiles, and only the cumulative
+        distance matrix is stored if return_matrix=True, or only two rows of
+        it if return_matrix=False, so memory grows with the length of the
+        shorter curve. A ValueError is raised if the cumulative distance
+        matrix doesn't fit in the budget with return_matrix=True. All
+        strategies give identical results. Default is None, which has no
+        budget: the cumulative distance matrix is always returned, and
+        without it the local distances are only computed at once if they
+        take at most 1 GiB.
+    dtype : data-type, optional
+        Floating point type of the local distances and the cumulative
+        distance matrix. np.float32 halves their memory, which also doubles
+        the size of the curves that fit in max_memory. cdist always computes
+        in double precision, and its distances are rounded to dtype tile by
+        tile. Default is np.float64.
     **kwargs : dict, optional
         Extra arguments to `metric`: refer to each metric documentation in
         scipy.spatial.distance.
@@ -719,14 +1536,30 @@ def dtw(exp_data, num_data, metric='euclidean', **kwargs):
     -------
     r : float
         DTW distance.
-    d : ndarray (2-D)
-        Cumulative distance matrix
+    d : ndarray (2-D) or BandedMatrix
+        Cumulative distance matrix. A BandedMatrix is returned if window or
+        slope are used. Only returned if return_matrix=True.
 
     Notes
     -----
     The DTW distance is d[-1, -1].
 
-    This has O(M, P) computational cost.
+    With window or slope, only the local distances inside the band are
+    computed and the cumulative distance matrix is stored in a
+    (M, band width) array, where the band width is the widest row of the
+    band. Cells outside of the band are np.inf. With a Sakoe-Chiba window
+    the band width is at most 2 * window + 1, so memory and run time grow
+    linearly with the length of the curves. The widest row of an Itakura
+    parallelogram is about (1 - 1 / slope) * P, so with slope alone about
+    (1 - 1 / slope) * M * P values are stored, which still grows with the
+    square of the length of the curves. Combine slope with window to keep
+    memory linear.
+
+    This has O(M, P) computational cost. The default wavefront engine
+    exploits that every cell on an anti-diagonal (i + j = constant) only
+    depends on the two previous anti-diagonals, so the M + P - 1
+    anti-diagonals are computed one vectorized operation at a time instead of
+    M * P Python iterations.
 
     The latest scipy.spatial.distance.cdist information can be found at
     https://docs.scipy.org/doc/scipy/reference/generated/scipy.spatial.distance.cdist.html
@@ -763,14 +1596,103 @@ def dtw(exp_data, num_data, metric='euclidean', **kwargs):
 
     >>> r, d = dtw(exp_data, num_data, metric='cityblock')
 
+    Curves that are roughly aligned in time can use a Sakoe-Chiba band, which
+    only evaluates the cells within 10 indices of the diagonal.
+
+    >>> r, d = dtw(exp_data, num_data, window=10)
+    >>> path = dtw_path(d)
+
+    Long curves whose cumulative distance matrix wouldn't fit in memory can
+    compute the distance alone, here in less than 1 MiB.
+
+    >>> r = dtw(exp_data, num_data, return_matrix=False, max_memory=2**20)
+
+    The tiles of the matrix can also be filled on several threads.
+
+    >>> r = dtw(exp_data, num_data, return_matrix=False, n_jobs=4)
+
+    When searching for the closest curve, candidates that can't beat the
+    best distance found so far are abandoned early and return np.inf.
+
+    >>> r = dtw(exp_data, num_data, return_matrix=False, abandon_above=10.0)
+
     .. [6] Senin, P., 2008. Dynamic time warping algorithm review. Information
         and Computer Science Department University of Hawaii at Manoa Honolulu,
         USA, 855, pp.1-23.
         http://seninp.github.io/assets/pubs/senin_dtw_litreview_2008.pdf
     """
-    c = distance.cdist(exp_data, num_data, metric=metric, **kwargs)
+    if engine not in ('wavefront', 'loop'):
+        raise ValueError("engine must be 'wavefront' or 'loop', not "
+                         + repr(engine))
+    dtype = _float_dtype(dtype)
+    exp_data = _curve_data(exp_data)
+    num_data = _curve_data(num_data)
+    bound = abandon_above
+    if window is not None or slope is not None:
+        lo, hi = _band_limits(len(exp_data), len(num_data), window=window,
+                              slope=slope)
+        d = _banded_dp(exp_data, num_data, lo, hi, kind='dtw', metric=metric,
+                       bound=bound, dtype=dtype, **kwargs)
+    elif engine == 'wavefront':
+        r, d = _solve_dp(exp_data, num_data, kind='dtw', metric=metric,
+                         return_matrix=return_matrix, max_memory=max_memory,
+                         n_jobs=n_jobs, bound=bound, dtype=dtype, **kwargs)
+        if not return_matrix:
+            return r
+    else:
+        c = distance.cdist(exp_data, num_data, metric=metric, **kwargs)
+        d = _dtw_loop(c.astype(dtype, copy=False))
+    r = d[-1, -1]
+    if bound is not None and r > bound:
+        r = np.inf
+    if return_matrix:
+        return r, d
+    return r
+
+
+def _init_accumulator(n, m, kind='dtw', dtype=np.float64):
+    r"""
+    Allocate the padded accumulator used by the wavefront engines.
+
+    Parameters
+    ----------
+    n : int
+        Number of data points in exp_data.
+    m : int
+        Number of data points in num_data.
+    kind : str
+        'dtw' or 'frechet'.
+    dtype : data-type
+        Floating point type of the accumulator.
+
+    Returns
+    -------
+    D : ndarray (2-D)
+        Array of shape (n + 1, m + 1) with np.inf in the first row and the
+        first column. D[0, 0] holds the identity of the recurrence (0.0 for
+        DTW, -np.inf for Frechet), so that D[1, 1] becomes c[0, 0] and the
+        first row and column of the cumulative matrix need no special cases.
+    """
+    D = np.full((n + 1, m + 1), np.inf, dtype=dtype)
+    D[0, 0] = -np.inf if kind == 'frechet' else 0.0
+    return D
+
 
-    d = np.zeros(c.shape)
+def _dtw_loop(c):
+    r"""
+    Reference DTW cumulative distance matrix using a Python double loop.
+
+    Parameters
+    ----------
+    c : ndarray (2-D)
+        Local cost matrix between the two curves.
+
+    Returns
+    -------
+    d : ndarray (2-D)
+        Cumulative distance matrix
+    """
+    d = np.zeros(c.shape, dtype=c.dtype)
     d[0, 0] = c[0, 0]
     n, m = c.shape
     for i in range(1, n):
@@ -780,35 +1702,1295 @@ def dtw(exp_data, num_data, metric='euclidean', **kwargs):
     for i in range(1, n):
         for j in range(1, m):
             d[i, j] = c[i, j] + min((d[i-1, j], d[i, j-1], d[i-1, j-1]))
-    return d[-1, -1], d
+    return d
 
 
-def dtw_path(d):
+def _fill(D, c, kind='dtw'):
     r"""
-    Calculates the optimal DTW path from a given DTW cumulative distance
-    matrix.
+    _wavefront_fill with the kernel of the backend in use, see set_backend.
+    """
+    _backends.kernel('fill')(D, c, kind)
 
-    This function returns the optimal DTW path using the back propagation
-    algorithm that is defined in [7]_. This path details the index from each
-    curve that is being compared.
+
+def _wavefront_fill(D, c, kind='dtw'):
+    r"""
+    Fill a padded accumulator one anti-diagonal at a time.
 
     Parameters
     ----------
-    d : ndarray (2-D)
-        Cumulative distance matrix.
-
-    Returns
-    -------
-    path : ndarray (2-D)
-        The optimal DTW path.
+    D : ndarray (2-D)
+        C-contiguous accumulator of shape (n + 1, m + 1). The first row and
+        the first column hold the boundary values, see _init_accumulator.
+        D[1:, 1:] is overwritten.
+    c : ndarray (2-D)
+        Local cost matrix of shape (n, m).
+    kind : str
+        'dtw' for D[a, b] = c + min(up, left, diag), or 'frechet' for
+        D[a, b] = max(min(up, left, diag), c).
 
     Notes
     -----
-    Note that path[:, 0] represents the indices from exp_data, while
-    path[:, 1] represents the indices from the num_data.
+    D[a, b] is stored at the flat index a * (m + 1) + b, so every
+    anti-diagonal a + b = s of D, and of c, is a strided slice of the
+    flattened array. The three predecessors of an anti-diagonal are the same
+    slice shifted by one row, one column, or both. Each anti-diagonal is then
+    computed with a few vectorized operations that perform exactly the same
+    floating point operations as the element by element recurrence.
+    """
+    n, m = c.shape
+    w = m + 1
+    Df = D.reshape(-1)
+    cf = np.ascontiguousarray(c).reshape(-1)
+    # c has one less column than D, so its anti-diagonals use a stride of
+    # m - 1, which collapses to a single element per anti-diagonal if m == 1
+    cstep = max(m - 1, 1)
+    frechet = kind == 'frechet'
+    for s in range(2, n + m + 1):
+        a0 = max(1, s - m)
+        a1 = min(n, s - 1)
+        f0 = a0 * m + s
+        f1 = a1 * m + s + 1
+        c0 = (a0 - 1) * m + s - a0 - 1
+        c1 = c0 + (a1 - a0) * cstep + 1
+        t = np.minimum(Df[f0 - w:f1 - w:m], Df[f0 - 1:f1 - 1:m])
+        np.minimum(t, Df[f0 - w - 1:f1 - w - 1:m], out=t)
+        if frechet:
+            np.maximum(t, cf[c0:c1:cstep], out=Df[f0:f1:m])
+        else:
+            Df[f0:f1:m] = cf[c0:c1:cstep] + t
 
-    .. [7] Senin, P., 2008. Dynamic time warping algorithm review. Information
-        and Computer Science Department University of Hawaii at Manoa Honolulu,
+
+def _pruned_wavefront_fill(D, c, bound, kind='dtw'):
+    r"""
+    Wavefront fill that skips cells which can't lead below an upper bound.
+
+    This follows the idea of PrunedDTW [19]_. Because the local costs are
+    non-negative, the accumulator never decreases along a warping path, so
+    cells larger than bound are replaced with np.inf, and only the range of
+    an anti-diagonal that has a finite predecessor on one of the two previous
+    anti-diagonals is computed. Every warping path visits at least one of
+    two consecutive anti-diagonals, so the fill is abandoned once two
+    consecutive anti-diagonals exceed the bound.
+
+    Parameters
+    ----------
+    D : ndarray (2-D)
+        Padded accumulator from _init_accumulator (np.inf everywhere except
+        D[0, 0]).
+    c : ndarray (2-D)
+        Local cost matrix of shape (n, m).
+    bound : float
+        Upper bound. Cells with values <= bound are exact.
+    kind : str
+        'dtw' or 'frechet'.
+
+    Returns
+    -------
+    finished : boolean
+        False if the fill was abandoned, in which case D[-1, -1] is np.inf.
+
+    .. [19] Silva, D. F. and Batista, G. E., 2016. Speeding up all-pairwise
+        dynamic time warping matrix calculation. In Proceedings of the 2016
+        SIAM International Conference on Data Mining, pp.837-845.
+        https://doi.org/10.1137/1.9781611974348.94
+    """
+    n, m = c.shape
+    w = m + 1
+    Df = D.reshape(-1)
+    cf = np.ascontiguousarray(c).reshape(-1)
+    cstep = max(m - 1, 1)
+    frechet = kind == 'frechet'
+    empty = (n + m + 2, -1)
+    # range of rows with finite values on the previous two anti-diagonals,
+    # the anti-diagonal s = 0 only holds the corner D[0, 0]
+    lo1, hi1 = empty
+    lo2, hi2 = 0, 0
+    for s in range(2, n + m + 1):
+        a0 = max(1, s - m, min(lo1, lo2 + 1))
+        a1 = min(n, s - 1, max(hi1, hi2) + 1)
+        if a0 > a1:
+            if lo1 > hi1:
+                return False
+            lo1, hi1, lo2, hi2 = empty[0], empty[1], lo1, hi1
+            continue
+        f0 = a0 * m + s
+        f1 = a1 * m + s + 1
+        c0 = (a0 - 1) * m + s - a0 - 1
+        c1 = c0 + (a1 - a0) * cstep + 1
+        t = np.minimum(Df[f0 - w:f1 - w:m], Df[f0 - 1:f1 - 1:m])
+        np.minimum(t, Df[f0 - w - 1:f1 - w - 1:m], out=t)
+        if frechet:
+            np.maximum(t, cf[c0:c1:cstep], out=t)
+        else:
+            t += cf[c0:c1:cstep]
+        keep = t <= bound
+        t[~keep] = np.inf
+        Df[f0:f1:m] = t
+        keep = np.flatnonzero(keep)
+        lo2, hi2 = lo1, hi1
+        if len(keep) > 0:
+            lo1, hi1 = a0 + keep[0], a0 + keep[-1]
+        elif lo2 > hi2:
+            return False
+        else:
+            lo1, hi1 = empty
+    return True
+
+
+class BandedMatrix(object):
+    r"""
+    Cumulative distance matrix that is only stored inside a band.
+
+    Row i of the (M, P) matrix is stored for the columns lo[i] <= j < hi[i]
+    in data[i, :hi[i] - lo[i]]. Every cell outside of the band is np.inf.
+    This is what dtw returns as the cumulative distance matrix when window
+    or slope constraints are used, and it can be passed to dtw_path.
+
+    Parameters
+    ----------
+    data : ndarray (2-D)
+        Banded values of shape (M, W), where W is the widest row of the band.
+    lo : ndarray (1-D)
+        First column of the band in each row.
+    hi : ndarray (1-D)
+        One past the last column of the band in each row.
+    shape : tuple
+        The (M, P) shape of the full matrix.
+
+    Examples
+    --------
+    >>> r, d = dtw(exp_data, num_data, window=10)
+    >>> path = dtw_path(d)
+    >>> full = d.toarray()
+    """
+
+    def __init__(self, data, lo, hi, shape):
+        self.data = data
+        self.lo = lo
+        self.hi = hi
+        self.shape = shape
+
+    def __getitem__(self, index):
+        i, j = index
+        n, m = self.shape
+        if i < 0:
+            i += n
+        if j < 0:
+            j += m
+        if self.lo[i] <= j < self.hi[i]:
+            return self.data[i, j - self.lo[i]]
+        return np.inf
+
+    def toarray(self):
+        r"""
+        Expand the band into a full (M, P) ndarray with np.inf outside.
+        """
+        n, m = self.shape
+        out = np.full((n, m), np.inf, dtype=self.data.dtype)
+        for i in range(n):
+            out[i, self.lo[i]:self.hi[i]] = \
+                self.data[i, :self.hi[i] - self.lo[i]]
+        return out
+
+
+def _band_limits(n, m, window=None, slope=None):
+    r"""
+    Column limits of a global warping constraint.
+
+    Parameters
+    ----------
+    n : int
+        Number of data points in exp_data.
+    m : int
+        Number of data points in num_data.
+    window : int, optional
+        Sakoe-Chiba radius. Row i may only be matched to the columns within
+        window of the diagonal, which is scaled to go from (0, 0) to
+        (n - 1, m - 1) when the curves have different lengths.
+    slope : float, optional
+        Itakura parallelogram slope. The warping path may not be steeper than
+        slope, or flatter than 1 / slope, relative to the scaled diagonal,
+        measured from either end of the curves. Must be >= 1.
+
+    Returns
+    -------
+    lo : ndarray (1-D)
+        First allowed column of each row.
+    hi : ndarray (1-D)
+        One past the last allowed column of each row.
+
+    Notes
+    -----
+    The limits are widened where necessary so that the band is monotone and
+    always contains at least one path from (0, 0) to (n - 1, m - 1).
+    """
+    lo = np.zeros(n, dtype=np.intp)
+    hi = np.full(n, m, dtype=np.intp)
+    if n > 1:
+        u = np.arange(n) / (n - 1)
+    else:
+        u = np.zeros(n)
+    # small tolerance so that rounding does not drop cells on the boundary
+    eps = 1e-9
+    if window is not None:
+        if window < 0:
+            raise ValueError('window must be non-negative')
+        center = u * (m - 1)
+        lo = np.maximum(lo, np.ceil(center - window - eps).astype(np.intp))
+        hi = np.minimum(hi, np.floor(center + window + eps).astype(np.intp)
+                        + 1)
+    if slope is not None:
+        if slope < 1:
+            raise ValueError('slope must be >= 1')
+        vlo = np.maximum(u / slope, 1.0 - slope * (1.0 - u))
+        vhi = np.minimum(u * slope, 1.0 - (1.0 - u) / slope)
+        lo = np.maximum(lo, np.ceil(vlo * (m - 1) - eps).astype(np.intp))
+        hi = np.minimum(hi, np.floor(vhi * (m - 1) + eps).astype(np.intp)
+                        + 1)
+    return _fix_band(lo, hi, m)
+
+
+def _fix_band(lo, hi, m):
+    r"""
+    Widen band limits so that they are monotone and contain a warping path.
+
+    Every row becomes non-empty, the first row starts in column 0, the last
+    row ends in column m - 1, and the band of each row starts at or before
+    one past the end of the band of the previous row, so that a path can
+    step from one row to the next.
+    """
+    lo = np.clip(lo, 0, m - 1)
+    hi = np.clip(hi, 1, m)
+    lo[0] = 0
+    hi[-1] = m
+    lo = np.minimum.accumulate(lo[::-1])[::-1]
+    hi = np.maximum.accumulate(hi)
+    hi = np.maximum(hi, lo + 1)
+    lo[1:] = np.minimum(lo[1:], hi[:-1])
+    return lo, hi
+
+
+def _banded_cost(exp_data, num_data, lo, hi, metric='euclidean',
+                 max_cells=2**20, dtype=np.float64, **kwargs):
+    r"""
+    Evaluate the local cost matrix only inside a band.
+
+    The rows are processed in blocks. Each block computes the distances of
+    the smallest rectangle enclosing its part of the band with cdist, so any
+    cdist metric can be used, and only the banded cells are kept.
+
+    Returns
+    -------
+    C : ndarray (2-D)
+        Banded cost of shape (M, W) and data type dtype, with np.inf outside
+        of the band.
+    """
+    n = len(exp_data)
+    width = hi - lo
+    W = int(width.max())
+    C = np.full((n, W), np.inf, dtype=dtype)
+    cols = np.arange(W)
+    for r0, j0, rect in _cost_blocks(exp_data, num_data, lo, hi,
+                                     metric=metric, max_cells=max_cells,
+                                     **kwargs):
+        r1 = r0 + len(rect)
+        k = lo[r0:r1, None] - j0 + cols
+        inside = cols < width[r0:r1, None]
+        k[~inside] = 0
+        block = np.take_along_axis(rect, k, axis=1)
+        block[~inside] = np.inf
+        C[r0:r1] = block
+    return C
+
+
+def _cost_blocks(exp_data, num_data, lo, hi, metric='euclidean',
+                 max_cells=2**20, **kwargs):
+    r"""
+    Local costs of a band, one block of rows at a time.
+
+    Each block is the smallest rectangle of the cost matrix that encloses
+    its part of the band, computed with cdist, so any cdist metric can be
+    used.
+
+    Yields
+    ------
+    r0 : int
+        First row of the block.
+    j0 : int
+        First column of the rectangle.
+    rect : ndarray (2-D)
+        Local costs of the rows r0 to r0 + len(rect) and the columns j0 to
+        j0 + rect.shape[1].
+    """
+    n = len(exp_data)
+    W = int((hi - lo).max())
+    # a block of k rows spans about W + k * m / n columns, pick k such that
+    # the enclosing rectangle has at most max_cells cells
+    ratio = max(len(num_data) / n, 1e-12)
+    step = (np.sqrt(W * W + 4.0 * ratio * max_cells) - W) / (2.0 * ratio)
+    step = max(1, int(step))
+    for r0 in range(0, n, step):
+        r1 = min(n, r0 + step)
+        j0 = lo[r0]
+        yield r0, j0, distance.cdist(exp_data[r0:r1],
+                                     num_data[j0:hi[r1 - 1]],
+                                     metric=metric, **kwargs)
+
+
+def _banded_fill(C, lo, hi, kind='dtw', bound=None):
+    r"""
+    Fill a banded accumulator one anti-diagonal at a time.
+
+    Parameters
+    ----------
+    C : ndarray (2-D)
+        Banded local cost of shape (M, W) from _banded_cost.
+    lo, hi : ndarray (1-D)
+        Band limits from _band_limits.
+    kind : str
+        'dtw' or 'frechet'.
+    bound : float, optional
+        Upper bound for early abandoning, see _pruned_wavefront_fill. Cells
+        above the bound are set to np.inf, and the fill stops when two
+        consecutive anti-diagonals are above the bound.
+
+    Returns
+    -------
+    B : ndarray (2-D)
+        Banded accumulator of shape (M, W) with np.inf outside of the band.
+
+    Notes
+    -----
+    The accumulator is padded by one row on top, which holds the identity of
+    the recurrence for the cell (0, 0), and by one column of np.inf on each
+    side. The rows of an anti-diagonal that intersect the band are a
+    contiguous range because the band is monotone, and the predecessors of
+    each cell are gathered with fancy indexing. Predecessors that fall
+    outside of the band of the previous row are redirected to a padding
+    column of np.inf.
+    """
+    n, W = C.shape
+    m = hi[-1]
+    W2 = W + 2
+    Bp = np.full((n + 1, W2), np.inf, dtype=C.dtype)
+    Bp[0, 0] = -np.inf if kind == 'frechet' else 0.0
+    Bf = Bp.reshape(-1)
+    Cf = C.reshape(-1)
+    rows = np.arange(n)
+    g = lo + rows
+    h = hi + rows
+    delta = np.empty_like(lo)
+    delta[0] = 0
+    delta[1:] = lo[1:] - lo[:-1]
+    prev_base = rows * W2
+    base = prev_base + W2 + 1
+    cbase = rows * W
+    frechet = kind == 'frechet'
+    diagonals = np.arange(n + m - 1)
+    first = np.searchsorted(h, diagonals, side='right').tolist()
+    last = np.searchsorted(g, diagonals, side='right').tolist()
+    alive_prev = True
+    for s, ia, ib in zip(range(n + m - 1), first, last):
+        k = s - g[ia:ib]
+        kd = k + delta[ia:ib]
+        f = base[ia:ib] + k
+        up = prev_base[ia:ib] + np.minimum(kd + 1, W + 1)
+        diag = prev_base[ia:ib] + np.minimum(kd, W + 1)
+        t = np.minimum(Bf[up], Bf[f - 1])
+        np.minimum(t, Bf[diag], out=t)
+        cost = Cf[cbase[ia:ib] + k]
+        if frechet:
+            np.maximum(t, cost, out=t)
+        else:
+            t += cost
+        if bound is not None:
+            above = t > bound
+            t[above] = np.inf
+            alive = not above.all()
+            if not alive and not alive_prev:
+                break
+            alive_prev = alive
+        Bf[f] = t
+    return Bp[1:, 1:W + 1]
+
+
+def _banded_dp(exp_data, num_data, lo, hi, kind='dtw', metric='euclidean',
+               bound=None, dtype=np.float64, **kwargs):
+    r"""
+    Solve DTW or discrete Frechet restricted to the band lo <= j < hi.
+
+    Returns
+    -------
+    d : BandedMatrix
+        The banded cumulative matrix.
+    """
+    n = len(exp_data)
+    m = len(num_data)
+    kwargs = _cdist_kwargs(exp_data, num_data, metric, kwargs)
+    C = _banded_cost(exp_data, num_data, lo, hi, metric=metric, dtype=dtype,
+                     **kwargs)
+    B = _banded_fill(C, lo, hi, kind=kind, bound=bound)
+    return BandedMatrix(B, lo, hi, (n, m))
+
+
+def _cdist_kwargs(exp_data, num_data, metric, kwargs):
+    r"""
+    Fix the data dependent defaults of cdist before splitting into blocks.
+
+    cdist derives the default variance of 'seuclidean' and the default
+    inverse covariance of 'mahalanobis' from all of the points it is given.
+    When the distances are computed block by block, these defaults are
+    computed once from the complete curves so that every block uses the same
+    metric as a single cdist call would.
+    """
+    if metric == 'seuclidean' and kwargs.get('V') is None:
+        kwargs = dict(kwargs)
+        kwargs['V'] = np.var(np.vstack([exp_data, num_data]), axis=0,
+                             ddof=1)
+    elif metric == 'mahalanobis' and kwargs.get('VI') is None:
+        kwargs = dict(kwargs)
+        X = np.vstack([exp_data, num_data])
+        kwargs['VI'] = np.linalg.inv(np.cov(X.T)).T
+    return kwargs
+
+
+def _tile_costs(exp_data, num_data, metric='euclidean', dtype=np.float64,
+                **kwargs):
+    r"""
+    Block cost generator of the tiled dynamic programs.
+
+    Returns
+    -------
+    cost : callable
+        cost(r0, r1, c0, c1) returns the local costs of exp_data[r0:r1] and
+        num_data[c0:c1], computed on demand with cdist and rounded to dtype.
+        The data dependent defaults of metric are fixed once with
+        _cdist_kwargs, so every block uses the same metric and **kwargs
+        (e.g. the Minkowski p) as a single cdist call of the complete curves.
+    """
+    kwargs = _cdist_kwargs(exp_data, num_data, metric, kwargs)
+
+    def cost(r0, r1, c0, c1):
+        return distance.cdist(exp_data[r0:r1], num_data[c0:c1],
+                              metric=metric, **kwargs).astype(dtype,
+                                                              copy=False)
+    return cost
+
+
+def _cost_matrix(cost, n, m, dtype=np.float64):
+    r"""
+    All local costs of a (n, m) grid from a block cost generator.
+
+    Costs of a smaller dtype than the float64 of cdist are computed in
+    blocks of rows, so that cdist's output is never stored for all of them.
+    """
+    if dtype == np.float64:
+        return cost(0, n, 0, m)
+    c = np.empty((n, m), dtype=dtype)
+    step = max(1, _TILE_SIZE ** 2 // m)
+    for r0 in range(0, n, step):
+        c[r0:r0 + step] = cost(r0, min(n, r0 + step), 0, m)
+    return c
+
+
+def _n_workers(n_jobs):
+    r"""
+    Number of workers (threads or processes) for n_jobs, 0 meaning the
+    calling thread.
+    """
+    if n_jobs is None or n_jobs == 1:
+        return 0
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError('n_jobs must be None, -1 or a positive integer, '
+                         'not ' + repr(n_jobs))
+    return int(n_jobs)
+
+
+def _dp_strategy(n, m, return_matrix=True, max_memory=None, n_threads=1,
+                 dtype=np.float64):
+    r"""
+    Choose how the wavefront engine fills a (n, m) grid within max_memory.
+
+    'full' computes all of the local costs with _cost_matrix and fills the
+    padded accumulator, which is the fastest, but stores two (n, m) arrays.
+    'tiled' computes the local costs on demand in tiles with _tiled_dp, and
+    only stores the cumulative matrix if it is returned. 'rolling' computes
+    the local costs in tiles with _rolling_dp and keeps two rows. Threads
+    always use the tiles of _tiled_dp. The tiles shrink below _TILE_SIZE if
+    the budget requires it. The arrays have the data type dtype, except for
+    the float64 output of cdist. Without a budget (max_memory=None) the
+    returned matrix is always computed, with 'full' on one thread, and
+    'full' is only used for the distance alone up to _FULL_MEMORY.
+
+    Returns
+    -------
+    strategy : str
+        'full', 'tiled' or 'rolling'.
+    tile : int
+        Number of rows and columns of the tiles.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    matrix = n * m * itemsize if return_matrix else 0
+    full = ((n + 1) * (m + 1) + n * m) * itemsize
+    if itemsize < 8:
+        # a block of rows of cdist's output, see _cost_matrix
+        full += max(_TILE_SIZE ** 2, m) * 8
+    if max_memory is None:
+        if n_threads == 1 and (return_matrix or full <= _FULL_MEMORY):
+            return 'full', _TILE_SIZE
+        if return_matrix or n_threads > 1:
+            return 'tiled', _TILE_SIZE
+        return 'rolling', _TILE_SIZE
+    if n_threads == 1 and full <= max_memory:
+        return 'full', _TILE_SIZE
+    # boundary rows and columns of the tiles, and per thread the output of
+    # cdist for one tile, and the padded accumulator and the local costs of
+    # one tile (or a transposed copy of them)
+    spare = max_memory - matrix - 2 * (n + m + 2) * itemsize
+    tile = int(np.sqrt(max(spare, 0) / ((8 + 2 * itemsize) * n_threads)))
+    tile = min(tile - 1, _TILE_SIZE)
+    if tile < min(_MIN_TILE_SIZE, n, m):
+        if matrix > max_memory:
+            raise ValueError('the cumulative matrix of curves with '
+                             + repr(n) + ' and ' + repr(m) + ' points needs '
+                             + repr(matrix) + ' bytes, more than max_memory='
+                             + repr(max_memory) + ', use return_matrix=False')
+        raise ValueError('max_memory=' + repr(max_memory) + ' is too small '
+                         'for curves with ' + repr(n) + ' and ' + repr(m)
+                         + ' points')
+    if return_matrix or n_threads > 1:
+        return 'tiled', tile
+    return 'rolling', tile
+
+
+def _solve_dp(exp_data, num_data, kind='dtw', metric='euclidean',
+              return_matrix=True, max_memory=None, n_jobs=None, bound=None,
+              dtype=np.float64, **kwargs):
+    r"""
+    Wavefront engine of dtw and frechet_dist, see _dp_strategy.
+
+    Returns
+    -------
+    r : float
+        d[-1, -1], np.inf if it exceeds bound.
+    d : ndarray (2-D) or None
+        Cumulative matrix, None unless return_matrix=True.
+    """
+    n_threads = max(_n_workers(n_jobs), 1)
+    n = len(exp_data)
+    m = len(num_data)
+    strategy, tile = _dp_strategy(n, m, return_matrix=return_matrix,
+                                  max_memory=max_memory, n_threads=n_threads,
+                                  dtype=dtype)
+    d = None
+    if strategy == 'full':
+        cost = _tile_costs(exp_data, num_data, metric=metric, dtype=dtype,
+                           **kwargs)
+        c = _cost_matrix(cost, n, m, dtype=dtype)
+        D = _init_accumulator(n, m, kind=kind, dtype=dtype)
+        if bound is None:
+            _fill(D, c, kind=kind)
+        else:
+            _pruned_wavefront_fill(D, c, bound, kind=kind)
+        del c
+        r = D[-1, -1]
+        if return_matrix:
+            d = D[1:, 1:]
+    elif strategy == 'tiled':
+        if return_matrix:
+            d = np.empty((n, m), dtype=dtype)
+        r = _tiled_dp(exp_data, num_data, kind=kind, metric=metric,
+                      n_jobs=n_threads, tile=tile, out=d, bound=bound,
+                      dtype=dtype, **kwargs)
+    else:
+        r = _rolling_dp(exp_data, num_data, kind=kind, metric=metric,
+                        tile=tile, bound=bound, dtype=dtype, **kwargs)
+    if bound is not None and r > bound:
+        r = np.inf
+    return r, d
+
+
+def _rolling_dp(exp_data, num_data, kind='dtw', metric='euclidean',
+                tile=_TILE_SIZE, bound=None, dtype=np.float64, **kwargs):
+    r"""
+    DTW or discrete Frechet distance with O(min(M, P)) memory.
+
+    The grid is processed with _block_dp along the longer curve, so the
+    two rolling rows follow the shorter curve. Every cell is computed with
+    exactly the same floating point operations as the full matrix engine.
+    With an upper bound, see _block_dp, r is np.inf if it exceeds bound.
+
+    Returns
+    -------
+    r : float
+        d[-1, -1] of the full cumulative matrix.
+    """
+    exp_data = np.asarray(exp_data)
+    num_data = np.asarray(num_data)
+    cost = _tile_costs(exp_data, num_data, metric=metric, dtype=dtype,
+                       **kwargs)
+    if len(exp_data) < len(num_data):
+        costs = cost
+
+        def cost(r0, r1, c0, c1):
+            return costs(c0, c1, r0, r1).T
+        n, m = len(num_data), len(exp_data)
+    else:
+        n, m = len(exp_data), len(num_data)
+    top = np.full(m + 1, np.inf, dtype=dtype)
+    top[0] = -np.inf if kind == 'frechet' else 0.0
+    bottom, _ = _block_dp(cost, n, top, kind=kind, tile=tile, bound=bound)
+    if bound is not None and bottom[-1] > bound:
+        return np.inf
+    return bottom[-1]
+
+
+def _tiled_dp(exp_data, num_data, kind='dtw', metric='euclidean', n_jobs=-1,
+              tile=_TILE_SIZE, out=None, bound=None, dtype=np.float64,
+              steps=None, **kwargs):
+    r"""
+    DTW or discrete Frechet distance with the tiles filled on several threads.
+
+    The grid is split into (tile, tile) tiles. A tile only depends on the
+    tile above it, the tile to its left, and the corner between them, so all
+    of the tiles on an anti-diagonal of tiles are independent. The
+    anti-diagonals of tiles are processed one after another, and the tiles
+    of each anti-diagonal are filled concurrently on a thread pool. Every
+    tile computes its local costs on demand and is filled with the kernel of
+    the backend in use, which releases the GIL (NumPy's ufuncs, or the
+    compiled Numba loops). Only the last row and the last column of the
+    tiles on the latest anti-diagonal are kept, so memory grows with M + P
+    unless out is given. Every cell is computed with exactly the same
+    floating point operations as the serial engines, independent of the
+    number of threads and the order in which the tiles finish.
+
+    Parameters
+    ----------
+    n_jobs : int
+        Number of threads, -1 for one per CPU.
+    tile : int
+        Number of rows and columns of the tiles.
+    out : ndarray (2-D), optional
+        Array of shape (M, P) that receives the complete cumulative matrix.
+        Default is None, which only keeps the boundaries of the tiles.
+    bound : float, optional
+        Upper bound for early abandoning. Cells above the bound are set to
+        np.inf, exactly like _pruned_wavefront_fill, and tiles whose
+        boundary values all exceed the bound are skipped without computing
+        their local costs.
+    steps : ndarray (2-D), optional
+        uint8 array of shape (M, P) that receives the step back of every
+        cell, see _wavefront_fill_steps. Only for kind='dtw' without bound.
+
+    Returns
+    -------
+    r : float
+        d[-1, -1] of the full cumulative matrix, np.inf if it exceeds bound.
+    """
+    exp_data = np.asarray(exp_data)
+    num_data = np.asarray(num_data)
+    cost = _tile_costs(exp_data, num_data, metric=metric, dtype=dtype,
+                       **kwargs)
+    n_threads = max(_n_workers(n_jobs), 1)
+    n = len(exp_data)
+    m = len(num_data)
+    n_rows = -(-n // tile)
+    n_cols = -(-m // tile)
+
+    def fill_tile(ti, tj, top, left):
+        i0 = ti * tile
+        i1 = min(n, i0 + tile)
+        j0 = tj * tile
+        j1 = min(m, j0 + tile)
+        D = np.empty((i1 - i0 + 1, j1 - j0 + 1), dtype=dtype)
+        D[0] = top
+        D[1:, 0] = left
+        if bound is not None and top.min() > bound and left.min() > bound:
+            D[1:, 1:] = np.inf
+        elif steps is not None:
+            S = np.empty((i1 - i0, j1 - j0), dtype=np.uint8)
+            _backends.kernel('fill_steps')(D, S, cost(i0, i1, j0, j1))
+            steps[i0:i1, j0:j1] = S
+        else:
+            _fill(D, cost(i0, i1, j0, j1), kind=kind)
+            if bound is not None:
+                D[D > bound] = np.inf
+        if out is not None:
+            out[i0:i1, j0:j1] = D[1:, 1:]
+        return D[-1].copy(), D[1:, -1].copy()
+
+    # the last row (with the cell to its left in front) and the last column
+    # of the tiles that still have a neighbor to fill
+    bottoms = {}
+    rights = {}
+    with ThreadPoolExecutor(max_workers=n_threads) as pool:
+        for k in range(n_rows + n_cols - 1):
+            tiles = range(max(0, k - n_cols + 1), min(n_rows, k + 1))
+            futures = []
+            for ti in tiles:
+                tj = k - ti
+                if ti == 0:
+                    top = np.full(min(m, tj * tile + tile) - tj * tile + 1,
+                                  np.inf, dtype=dtype)
+                    if tj == 0:
+                        top[0] = -np.inf if kind == 'frechet' else 0.0
+                else:
+                    top = bottoms.pop((ti - 1, tj))
+                if tj == 0:
+                    left = np.full(min(n, ti * tile + tile) - ti * tile,
+                                   np.inf, dtype=dtype)
+                else:
+                    left = rights.pop((ti, tj - 1))
+                futures.append(pool.submit(fill_tile, ti, tj, top, left))
+            for ti, future in zip(tiles, futures):
+                bottoms[ti, k - ti], rights[ti, k - ti] = future.result()
+    r = bottoms[n_rows - 1, n_cols - 1][-1]
+    if bound is not None and r > bound:
+        return np.inf
+    return r
+
+
+def _block_dp(cost, h, top, left=None, kind='dtw', tile=_TILE_SIZE,
+              return_right=False, top_labels=None, left_labels=None,
+              bound=None):
+    r"""
+    Fill a rectangular block of the grid from its boundary values.
+
+    The block is processed in strips of tile rows, and each strip in
+    (tile, tile) sub-blocks that are filled with the wavefront engine. Only
+    the last row of the previous strip and the last column of the previous
+    sub-block are kept in memory.
+
+    Parameters
+    ----------
+    cost : callable
+        cost(r0, r1, c0, c1) returns the local costs of the rows r0:r1 and
+        the columns c0:c1 of the block.
+    h : int
+        Number of rows of the block.
+    top : ndarray (1-D)
+        Accumulator values of the row above the block. top[0] is the corner
+        to the upper left of the block, so len(top) is the block width + 1.
+    left : ndarray (1-D), optional
+        Accumulator values of the column left of the block. Default is None,
+        which is np.inf for every row.
+    kind : str
+        'dtw' or 'frechet'.
+    tile : int
+        Number of rows and columns of the sub-blocks.
+    return_right : boolean
+        Whether to also return the last column of the block.
+    top_labels, left_labels : ndarray (1-D), optional
+        Integer labels of the boundary cells (DTW only). If given, every cell
+        inherits the label of the predecessor that dtw_path would step to,
+        and the labels of the last row are returned as well.
+    bound : float, optional
+        Upper bound for early abandoning. Sub-blocks whose boundary values
+        all exceed the bound are skipped without computing their local
+        costs, because the accumulator never decreases along a warping path.
+        Once a whole row exceeds the bound, the remaining strips are skipped
+        and bottom is np.inf.
+
+    Returns
+    -------
+    bottom : ndarray (1-D)
+        Last row of the block, with the last value of left in front.
+    right : ndarray (1-D) or None
+        Last column of the block, None unless return_right=True.
+    bottom_labels : ndarray (1-D)
+        Labels of bottom, only returned if top_labels is given.
+    """
+    w = len(top) - 1
+    dtype = top.dtype
+    if left is None:
+        left = np.full(h, np.inf, dtype=dtype)
+    labels = top_labels is not None
+    if labels and left_labels is None:
+        left_labels = np.full(h, -1, dtype=np.intp)
+    right = np.empty(h, dtype=dtype) if return_right else None
+    prev = top
+    prev_labels = top_labels
+    for r0 in range(0, h, tile):
+        r1 = min(h, r0 + tile)
+        cur = np.empty(w + 1, dtype=dtype)
+        cur[0] = left[r1 - 1]
+        col = left[r0:r1]
+        if labels:
+            cur_labels = np.empty(w + 1, dtype=np.intp)
+            cur_labels[0] = left_labels[r1 - 1]
+            col_labels = left_labels[r0:r1]
+        for c0 in range(0, w, tile):
+            c1 = min(w, c0 + tile)
+            D = np.empty((r1 - r0 + 1, c1 - c0 + 1), dtype=dtype)
+            D[0] = prev[c0:c1 + 1]
+            D[1:, 0] = col
+            if bound is not None and D[0].min() > bound and \
+                    col.min() > bound:
+                cur[c0 + 1:c1 + 1] = np.inf
+                col = np.full(r1 - r0, np.inf, dtype=dtype)
+                continue
+            if labels:
+                L = np.empty(D.shape, dtype=np.intp)
+                L[0] = prev_labels[c0:c1 + 1]
+                L[1:, 0] = col_labels
+                _wavefront_fill_labels(D, L, cost(r0, r1, c0, c1))
+                cur_labels[c0 + 1:c1 + 1] = L[-1, 1:]
+                col_labels = L[1:, -1].copy()
+            else:
+                _fill(D, cost(r0, r1, c0, c1), kind=kind)
+            cur[c0 + 1:c1 + 1] = D[-1, 1:]
+            # copies, so that the previous sub-block can be freed
+            col = D[1:, -1].copy()
+        if return_right:
+            right[r0:r1] = col
+        if bound is not None and cur[1:].min() > bound:
+            # every warping path crosses this row
+            cur[:] = np.inf
+            if return_right:
+                right[r1:] = np.inf
+            return (cur, right, cur_labels) if labels else (cur, right)
+        prev = cur
+        if labels:
+            prev_labels = cur_labels
+    if labels:
+        return prev, right, prev_labels
+    return prev, right
+
+
+def _wavefront_fill_labels(D, L, c):
+    r"""
+    DTW wavefront fill that also propagates predecessor labels.
+
+    D and c are as in _wavefront_fill, and L is an integer array with the
+    shape of D whose first row and column hold the labels of the boundary.
+    Every cell copies the label of the predecessor that dtw_path would step
+    back to: the cell above if it is the minimum, else the cell to the left
+    if it is the minimum, else the diagonal cell.
+    """
+    n, m = c.shape
+    w = m + 1
+    Df = D.reshape(-1)
+    Lf = L.reshape(-1)
+    cf = np.ascontiguousarray(c).reshape(-1)
+    cstep = max(m - 1, 1)
+    for s in range(2, n + m + 1):
+        a0 = max(1, s - m)
+        a1 = min(n, s - 1)
+        f0 = a0 * m + s
+        f1 = a1 * m + s + 1
+        c0 = (a0 - 1) * m + s - a0 - 1
+        c1 = c0 + (a1 - a0) * cstep + 1
+        up = Df[f0 - w:f1 - w:m]
+        left = Df[f0 - 1:f1 - 1:m]
+        t = np.minimum(up, left)
+        np.minimum(t, Df[f0 - w - 1:f1 - w - 1:m], out=t)
+        Lf[f0:f1:m] = np.where(up == t, Lf[f0 - w:f1 - w:m],
+                               np.where(left == t, Lf[f0 - 1:f1 - 1:m],
+                                        Lf[f0 - w - 1:f1 - w - 1:m]))
+        Df[f0:f1:m] = cf[c0:c1:cstep] + t
+
+
+def _wavefront_fill_steps(D, S, c):
+    r"""
+    DTW wavefront fill that also records the step back of every cell.
+
+    D and c are as in _wavefront_fill, and S is a uint8 array with the shape
+    of c. S[a - 1, b - 1] receives the predecessor of D[a, b] that dtw_path
+    would step back to: 0 for the cell above if it is the minimum, else 1
+    for the cell to the left if it is the minimum, else 2 for the diagonal
+    cell.
+    """
+    n, m = c.shape
+    w = m + 1
+    Df = D.reshape(-1)
+    Sf = S.reshape(-1)
+    cf = np.ascontiguousarray(c).reshape(-1)
+    cstep = max(m - 1, 1)
+    for s in range(2, n + m + 1):
+        a0 = max(1, s - m)
+        a1 = min(n, s - 1)
+        f0 = a0 * m + s
+        f1 = a1 * m + s + 1
+        c0 = (a0 - 1) * m + s - a0 - 1
+        c1 = c0 + (a1 - a0) * cstep + 1
+        up = Df[f0 - w:f1 - w:m]
+        left = Df[f0 - 1:f1 - 1:m]
+        t = np.minimum(up, left)
+        np.minimum(t, Df[f0 - w - 1:f1 - w - 1:m], out=t)
+        # 0 if up is the minimum, else 1 if left is the minimum, else 2
+        moved = up != t
+        np.add(moved, moved & (left != t), out=Sf[c0:c1:cstep],
+               dtype=np.uint8)
+        Df[f0:f1:m] = cf[c0:c1:cstep] + t
+
+
+def _step_path(S):
+    r"""
+    Follow the steps recorded by _wavefront_fill_steps from the last cell.
+
+    Returns
+    -------
+    path : ndarray (2-D)
+        The same path as dtw_path of the cumulative distance matrix.
+    """
+    n, m = S.shape
+    # a memoryview indexes the codes as Python ints without copying them
+    codes = memoryview(np.ascontiguousarray(S, dtype=np.uint8).reshape(-1))
+    i = n - 1
+    j = m - 1
+    cells = [(i, j)]
+    while i > 0 or j > 0:
+        code = codes[i * m + j]
+        if code != 1:
+            i -= 1
+        if code != 0:
+            j -= 1
+        cells.append((i, j))
+    return np.array(cells[::-1], dtype=np.int64)
+
+
+def _backtrack(D, a, b):
+    r"""
+    Follow dtw_path's steps in a padded accumulator until it leaves it.
+
+    Starting at D[a, b], step to the upper neighbor if it is the minimum of
+    the three predecessors, else to the left neighbor if it is the minimum,
+    else to the diagonal neighbor, until the first row or column of the
+    padded accumulator is reached.
+
+    Returns
+    -------
+    cells : list
+        The visited (a, b) cells in backward order.
+    """
+    cells = []
+    while a > 0 and b > 0:
+        cells.append((a, b))
+        up = D[a - 1, b]
+        left = D[a, b - 1]
+        temp_step = min(up, left, D[a - 1, b - 1])
+        if up == temp_step:
+            a -= 1
+        elif left == temp_step:
+            b -= 1
+        else:
+            a -= 1
+            b -= 1
+    return cells
+
+
+def _linear_path(exp_data, num_data, metric='euclidean', tile=_TILE_SIZE,
+                 base=_TILE_SIZE ** 2, **kwargs):
+    r"""
+    Divide and conquer recovery of dtw_path in linear memory.
+
+    A block of rows with known boundary values is split into an upper and a
+    lower half. A forward pass computes the last row of the upper half, and
+    a second pass over the lower half labels every cell with the column in
+    which dtw_path, started from that cell, would first reach the last row of
+    the upper half. The label of the end cell splits the path into a piece
+    in the lower half and a piece in the upper half, and both halves are
+    solved recursively with their boundary values. Blocks with at most base
+    cells are filled completely and backtracked directly.
+
+    Returns
+    -------
+    r : float
+        DTW distance.
+    path : ndarray (2-D)
+        The same path as dtw_path(dtw(exp_data, num_data)[1]).
+    """
+    costs = _tile_costs(np.asarray(exp_data), np.asarray(num_data),
+                        metric=metric, **kwargs)
+
+    def cost_fun(i0, j0):
+        def cost(r0, r1, c0, c1):
+            return costs(i0 + r0, i0 + r1, j0 + c0, j0 + c1)
+        return cost
+
+    def solve(i0, i1, j0, j1, top, left):
+        # the path from cell (i1 - 1, j1 - 1) backwards until it leaves the
+        # block, given the row above (top) and the column left (left)
+        h = i1 - i0
+        w = j1 - j0
+        if h == 1 or h * w <= base:
+            D = np.empty((h + 1, w + 1))
+            D[0] = top
+            D[1:, 0] = left
+            _fill(D, cost_fun(i0, j0)(0, h, 0, w))
+            cells = _backtrack(D, h, w)
+            return [(i0 + a - 1, j0 + b - 1) for a, b in cells], D[h, w]
+        h_top = h // 2
+        mid = i0 + h_top - 1
+        row_mid, _ = _block_dp(cost_fun(i0, j0), h_top, top,
+                               left=left[:h_top], tile=tile)
+        labels = np.arange(j0 - 1, j1)
+        labels[0] = -1
+        _, _, end_labels = _block_dp(cost_fun(mid + 1, j0), h - h_top,
+                                     row_mid, left=left[h_top:], tile=tile,
+                                     top_labels=labels)
+        jm = end_labels[-1]
+        if jm < 0:
+            # the path leaves the block to the left below the middle row
+            cells, r = solve(mid + 1, i1, j0, j1, row_mid, left[h_top:])
+            return cells, r
+        if jm == j0:
+            left_low = left[h_top:]
+        else:
+            _, left_low = _block_dp(cost_fun(mid + 1, j0), h - h_top,
+                                    row_mid[:jm - j0 + 1],
+                                    left=left[h_top:], tile=tile,
+                                    return_right=True)
+        cells_low, r = solve(mid + 1, i1, jm, j1, row_mid[jm - j0:],
+                             left_low)
+        del row_mid, left_low
+        cells_up, _ = solve(i0, mid + 1, j0, jm + 1, top[:jm - j0 + 2],
+                            left[:h_top])
+        return cells_low + cells_up, r
+
+    n = len(exp_data)
+    m = len(num_data)
+    top = np.full(m + 1, np.inf)
+    top[0] = 0.0
+    cells, r = solve(0, n, 0, m, top, np.full(n, np.inf))
+    return r, np.array(cells[::-1])
+
+
+def dtw_align(exp_data, num_data, metric='euclidean', engine='hirschberg',
+              **kwargs):
+    r"""
+    Compute the DTW distance and the optimal DTW path in linear memory.
+
+    This returns the same distance as dtw, and the same path as dtw_path,
+    without ever storing the cumulative distance matrix. By default the path
+    is found with a divide and conquer strategy in the spirit of Hirschberg's
+    algorithm [17]_, which repeatedly splits the curves in half with forward
+    passes over the cumulative distance matrix.
+
+    Parameters
+    ----------
+    exp_data : array_like
+        Curve from your experimental data. exp_data is of (M, N) shape, where
+        M is the number of data points, and N is the number of dimmensions
+    num_data : array_like
+        Curve from your numerical data. num_data is of (P, N) shape, where P
+        is the number of data points, and N is the number of dimmensions
+    metric : str or callable, optional
+        The distance metric to use. Default='euclidean'. Refer to the
+        documentation for scipy.spatial.distance.cdist.
+    engine : str, optional
+        'hirschberg' for the divide and conquer strategy, or 'steps' for a
+        single forward pass that records the step back of every cell as a
+        uint8 code (up, left or diagonal), followed by a walk along the
+        codes from the last cell. Default is 'hirschberg'.
+    **kwargs : dict, optional
+        Extra arguments to `metric`: refer to each metric documentation in
+        scipy.spatial.distance.
+
+    Returns
+    -------
+    r : float
+        DTW distance.
+    path : ndarray (2-D)
+        The optimal DTW path, identical to dtw_path(d).
+
+    Notes
+    -----
+    With engine='hirschberg', memory grows with M + P, instead of the M * P
+    of the cumulative distance matrix. The run time is a small multiple of
+    dtw, because parts of the cumulative distance matrix are computed more
+    than once. engine='steps' computes every cell once and stores M * P
+    bytes, 8 times less than the float64 cumulative distance matrix.
+
+    Ties between equally good predecessors are broken like dtw_path, so the
+    path is always identical to the one found from the full cumulative
+    distance matrix.
+
+    Examples
+    --------
+    >>> # Generate random experimental data
+    >>> x = np.random.random(100)
+    >>> y = np.random.random(100)
+    >>> exp_data = np.zeros((100, 2))
+    >>> exp_data[:, 0] = x
+    >>> exp_data[:, 1] = y
+    >>> # Generate random numerical data
+    >>> x = np.random.random(100)
+    >>> y = np.random.random(100)
+    >>> num_data = np.zeros((100, 2))
+    >>> num_data[:, 0] = x
+    >>> num_data[:, 1] = y
+    >>> r, path = dtw_align(exp_data, num_data)
+
+    .. [17] Hirschberg, D. S., 1975. A linear space algorithm for computing
+        maximal common subsequences. Communications of the ACM, 18(6),
+        pp.341-343. https://doi.org/10.1145/360825.360861
+    """
+    exp_data = _curve_data(exp_data)
+    num_data = _curve_data(num_data)
+    if engine == 'hirschberg':
+        return _linear_path(exp_data, num_data, metric=metric, **kwargs)
+    if engine != 'steps':
+        raise ValueError("engine must be 'hirschberg' or 'steps', not "
+                         + repr(engine))
+    steps = np.empty((len(exp_data), len(num_data)), dtype=np.uint8)
+    r = _tiled_dp(exp_data, num_data, metric=metric, n_jobs=None,
+                  steps=steps, **kwargs)
+    return r, _backends.kernel('step_path')(steps)
+
+
+def _coarsen(data):
+    r"""
+    Halve the resolution of a curve by averaging pairs of points.
+
+    Point k of the coarse curve is the mean of the points 2k and 2k + 1. The
+    last point is kept as is when the curve has an odd number of points.
+    """
+    n = len(data)
+    half = (data[0:n - 1:2] + data[1:n:2]) / 2.0
+    if n % 2:
+        half = np.vstack([half, data[-1:]])
+    return half
+
+
+def _project_path(path, n, m, radius):
+    r"""
+    Band of a fine grid around a path found at half the resolution.
+
+    Every coarse cell within radius of the coarse path (in both index
+    directions) is projected to the 2 x 2 fine cells it represents.
+
+    Returns
+    -------
+    lo, hi : ndarray (1-D)
+        Band limits of the (n, m) fine grid.
+    """
+    nc = (n + 1) // 2
+    pmin = np.full(nc, np.iinfo(np.intp).max, dtype=np.intp)
+    pmax = np.full(nc, -1, dtype=np.intp)
+    np.minimum.at(pmin, path[:, 0], path[:, 1])
+    np.maximum.at(pmax, path[:, 0], path[:, 1])
+    # the path is monotone, so the smallest column within radius rows is
+    # found radius rows above and the largest radius rows below
+    rows = np.arange(nc)
+    lo_c = pmin[np.maximum(rows - radius, 0)] - radius
+    hi_c = pmax[np.minimum(rows + radius, nc - 1)] + radius
+    fine = np.arange(n) // 2
+    return _fix_band(2 * lo_c[fine], 2 * hi_c[fine] + 2, m)
+
+
+def fastdtw(exp_data, num_data, radius=1, metric='euclidean', **kwargs):
+    r"""
+    Compute an approximate Dynamic Time Warping distance in linear time.
+
+    This implements the multi-resolution FastDTW algorithm of [18]_. Both
+    curves are recursively coarsened by averaging pairs of points, DTW is
+    solved exactly at the coarsest resolution, and the optimal path is then
+    projected to the next finer resolution, where DTW is solved again inside
+    a band of radius cells around the projected path.
+
+    Parameters
+    ----------
+    exp_data : array_like
+        Curve from your experimental data. exp_data is of (M, N) shape, where
+        M is the number of data points, and N is the number of dimmensions
+    num_data : array_like
+        Curve from your numerical data. num_data is of (P, N) shape, where P
+        is the number of data points, and N is the number of dimmensions
+    radius : int, optional
+        Number of cells around the projected path that are searched at every
+        resolution. Larger values are slower but more accurate. Default is 1.
+    metric : str or callable, optional
+        The distance metric to use. Default='euclidean'. Refer to the
+        documentation for scipy.spatial.distance.cdist.
+    **kwargs : dict, optional
+        Extra arguments to `metric`: refer to each metric documentation in
+        scipy.spatial.distance.
+
+    Returns
+    -------
+    r : float
+        Approximate DTW distance, which is never smaller than the exact DTW
+        distance.
+    path : ndarray (2-D)
+        The warping path that gives r, in the same format as dtw_path.
+
+    Notes
+    -----
+    Run time and memory grow linearly with M + P for a fixed radius. The
+    result is exact when the optimal path at full resolution stays within
+    the band around the projected path, and always exact when radius is at
+    least as large as the curves.
+
+    Examples
+    --------
+    >>> # Generate random experimental data
+    >>> x = np.random.random(100)
+    >>> y = np.random.random(100)
+    >>> exp_data = np.zeros((100, 2))
+    >>> exp_data[:, 0] = x
+    >>> exp_data[:, 1] = y
+    >>> # Generate random numerical data
+    >>> x = np.random.random(100)
+    >>> y = np.random.random(100)
+    >>> num_data = np.zeros((100, 2))
+    >>> num_data[:, 0] = x
+    >>> num_data[:, 1] = y
+    >>> r, path = fastdtw(exp_data, num_data, radius=2)
+
+    .. [18] Salvador, S. and Chan, P., 2007. Toward accurate dynamic time
+        warping in linear time and space. Intelligent Data Analysis, 11(5),
+        pp.561-580. https://doi.org/10.3233/IDA-2007-11508
+    """
+    if radius < 0:
+        raise ValueError('radius must be non-negative')
+    exp_data = np.asarray(exp_data, dtype=float)
+    num_data = np.asarray(num_data, dtype=float)
+    kwargs = _cdist_kwargs(exp_data, num_data, metric, kwargs)
+    n = len(exp_data)
+    m = len(num_data)
+    min_size = radius + 2
+    if n <= min_size or m <= min_size:
+        lo = np.zeros(n, dtype=np.intp)
+        hi = np.full(n, m, dtype=np.intp)
+    else:
+        _, coarse_path = fastdtw(_coarsen(exp_data), _coarsen(num_data),
+                                 radius=radius, metric=metric, **kwargs)
+        lo, hi = _project_path(coarse_path, n, m, radius)
+    d = _banded_dp(exp_data, num_data, lo, hi, kind='dtw', metric=metric,
+                   **kwargs)
+    return d[-1, -1], dtw_path(d)
+
+
+def dtw_path(d):
+    r"""
+    Calculates the optimal DTW path from a given DTW cumulative distance
+    matrix.
+
+    This function returns the optimal DTW path using the back propagation
+    algorithm that is defined in [7]_. This path details the index from each
+    curve that is being compared.
+
+    Parameters
+    ----------
+    d : ndarray (2-D) or BandedMatrix
+        Cumulative distance matrix. The BandedMatrix returned by dtw with
+        window or slope constraints is also accepted.
+
+    Returns
+    -------
+    path : ndarray (2-D)
+        The optimal DTW path.
+
+    Notes
+    -----
+    Note that path[:, 0] represents the indices from exp_data, while
+    path[:, 1] represents the indices from the num_data.
+
+    .. [7] Senin, P., 2008. Dynamic time warping algorithm review. Information
+        and Computer Science Department University of Hawaii at Manoa Honolulu,
         USA, 855, pp.1-23.
         http://seninp.github.io/assets/pubs/senin_dtw_litreview_2008.pdf
 
@@ -844,6 +3026,13 @@ def dtw_path(d):
     >>> plt.colorbar()
     >>> plt.show()
 
+    """
+    return _backends.kernel('path')(d)
+
+
+def _dtw_path_loop(d):
+    r"""
+    Backtrack the optimal path of dtw_path one step at a time.
     """
     path = []
     i, j = d.shape
@@ -872,7 +3061,7 @@ def dtw_path(d):
     return path[::-1]
 
 
-def mae(exp_data, num_data):
+def mae(exp_data, num_data, dtype=np.float64):
     """
     Compute the Mean Absolute Error (MAE).
 
@@ -887,17 +3076,22 @@ def mae(exp_data, num_data):
     num_data : array_like
         Curve from your numerical data. num_data is of (M, N) shape, where M
         is the number of data points, and N is the number of dimensions
+    dtype : data-type, optional
+        Floating point type of the computation, e.g. np.float32 for data
+        that is only single precision accurate. Default is np.float64.
 
     Returns
     -------
     r : float
         MAE.
     """
-    c = np.abs(exp_data - num_data)
+    dtype = _float_dtype(dtype)
+    c = np.abs(np.asarray(_curve_data(exp_data), dtype=dtype)
+               - np.asarray(_curve_data(num_data), dtype=dtype))
     return np.mean(c)
 
 
-def mse(exp_data, num_data):
+def mse(exp_data, num_data, dtype=np.float64):
     """
     Compute the Mean Squared Error (MAE).
 
@@ -912,11 +3106,16 @@ def mse(exp_data, num_data):
     num_data : array_like
         Curve from your numerical data. num_data is of (M, N) shape, where M
         is the number of data points, and N is the number of dimensions
+    dtype : data-type, optional
+        Floating point type of the computation, e.g. np.float32 for data
+        that is only single precision accurate. Default is np.float64.
 
     Returns
     -------
     r : float
         MSE.
     """
-    c = np.square(exp_data - num_data)
+    dtype = _float_dtype(dtype)
+    c = np.square(np.asarray(_curve_data(exp_data), dtype=dtype)
+                  - np.asarray(_curve_data(num_data), dtype=dtype))
     return np.mean(c)
@@ -0,0 +1,350 @@
+from __future__ import division
+import os
+import struct
+import numpy as np
+from .batch import CurveBatch
+from .pairwise import _MEASURES, _setup, _evaluate_pairs
+# MIT License
+#
+# Copyright (c) 2018,2019 Charles Jekel
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# names of the files of a store in its directory
+_POINTS = 'points.npy'
+_OFFSETS = 'offsets.npy'
+# size in bytes of the .npy headers of a store, which leaves room for any
+# shape, and keeps the arrays aligned to 64 bytes like NumPy
+_HEADER_SIZE = 128
+
+
+def _header(dtype, shape, size=_HEADER_SIZE):
+    r"""
+    Version 1.0 .npy header of an array, padded with spaces to size bytes.
+    The header of a store is always written with the same size, so it is
+    updated in place when the arrays grow, whatever padding the installed
+    NumPy would choose.
+    """
+    header = repr({'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+                   'fortran_order': False, 'shape': tuple(shape)})
+    prefix = np.lib.format.magic(1, 0)
+    # the length of the header is a little endian uint16 after the magic
+    n = size - len(prefix) - 2
+    if len(header) + 1 > n:
+        raise ValueError('the header of an array of shape ' + repr(shape)
+                         + ' needs more than ' + repr(size) + ' bytes')
+    header = header.ljust(n - 1) + '\n'
+    return prefix + struct.pack('<H', n) + header.encode('latin1')
+
+
+def _read_header(f):
+    r"""
+    Shape, dtype and header size of an open .npy file.
+    """
+    f.seek(0)
+    version = np.lib.format.read_magic(f)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+    if fortran_order:
+        raise ValueError('the arrays of a curve store must be in C order')
+    return shape, dtype, f.tell()
+
+
+class CurveStoreWriter(object):
+    r"""
+    Append curves to an on-disk curve store.
+
+    A curve store is a directory with two .npy files: points.npy holds the
+    points of all curves one after another, and offsets.npy the index of
+    the first point of each curve followed by the number of points, like
+    CurveBatch. Curves are only ever appended. The headers of both files
+    are updated by flush and close, so a reader sees the curves that were
+    appended before the last flush, and a store that was not closed
+    properly is cut back to them when it is opened for writing again. Only
+    one writer may append to a store at a time.
+
+    Parameters
+    ----------
+    path : str
+        Directory of the store. It is created if it doesn't exist, and
+        curves are appended to the store it holds if it does.
+    dim : int, optional
+        Number of dimensions of the curves. Default is None, which takes
+        the number of dimensions of the first curve.
+    dtype : data-type, optional
+        Data type of the points of a new store. Default is float.
+
+    Examples
+    --------
+    >>> with CurveStoreWriter('campaign') as writer:
+    ...     for i in range(1000):
+    ...         writer.append(np.random.random((100, 2)))
+    >>> store = CurveStore('campaign')
+    """
+
+    def __init__(self, path, dim=None, dtype=float):
+        self.path = path
+        self._points = None
+        self._offsets = None
+        if os.path.exists(os.path.join(path, _OFFSETS)):
+            self._open()
+            if dim is not None and dim != self.dim:
+                raise ValueError('the curves of the store have {} '
+                                 'dimensions, not {}'.format(self.dim, dim))
+        else:
+            os.makedirs(path, exist_ok=True)
+            self.dim = dim
+            self.dtype = np.dtype(dtype)
+            if dim is not None:
+                self._create()
+
+    def _create(self):
+        self._points = open(os.path.join(self.path, _POINTS), 'w+b')
+        self._offsets = open(os.path.join(self.path, _OFFSETS), 'w+b')
+        self._n_points = 0
+        self._n_curves = 0
+        self._points_header = _HEADER_SIZE
+        self._offsets_header = _HEADER_SIZE
+        self._points.write(_header(self.dtype, (0, self.dim)))
+        self._offsets.write(_header(np.int64, (1,)))
+        self._offsets.write(np.zeros(1, dtype=np.int64).tobytes())
+        self.flush()
+
+    def _open(self):
+        self._points = open(os.path.join(self.path, _POINTS), 'r+b')
+        self._offsets = open(os.path.join(self.path, _OFFSETS), 'r+b')
+        shape, self.dtype, self._points_header = _read_header(self._points)
+        self.dim = shape[1]
+        shape, dtype, self._offsets_header = _read_header(self._offsets)
+        if dtype != np.int64:
+            raise ValueError('the offsets of a curve store must be int64')
+        self._n_curves = shape[0] - 1
+        self._offsets.seek(self._offsets_header + 8 * self._n_curves)
+        self._n_points = int(np.frombuffer(self._offsets.read(8),
+                                           dtype=np.int64)[0])
+        # drop what was written after the last flush
+        self._offsets.truncate(self._offsets_header + 8 * (self._n_curves
+                                                           + 1))
+        self._points.truncate(self._points_header + self._n_points
+                              * self.dim * self.dtype.itemsize)
+
+    def __len__(self):
+        return self._n_curves
+
+    def append(self, curve):
+        r"""
+        Append a curve of shape (M, dim) to the store.
+        """
+        curve = np.asarray(curve)
+        if curve.ndim != 2:
+            raise ValueError('curve must have shape (M, N)')
+        if self.dim is None:
+            self.dim = curve.shape[1]
+            self._create()
+        if curve.shape[1] != self.dim:
+            raise ValueError('curve must have shape (M, {})'.format(self.dim))
+        self._points.seek(0, os.SEEK_END)
+        self._points.write(np.ascontiguousarray(curve,
+                                                dtype=self.dtype).tobytes())
+        self._n_points += len(curve)
+        self._n_curves += 1
+        self._offsets.seek(0, os.SEEK_END)
+        self._offsets.write(np.int64(self._n_points).tobytes())
+
+    def extend(self, curves):
+        r"""
+        Append every curve of a list of curves or a CurveBatch.
+        """
+        for curve in curves:
+            self.append(curve)
+
+    def flush(self):
+        r"""
+        Make the appended curves visible to readers.
+        """
+        if self._points is None:
+            return
+        # the points are written first, so the offsets never point past them
+        # stores written by NumPy's own headers keep the size they have
+        for f, header in (
+                (self._points, _header(self.dtype, (self._n_points, self.dim),
+                                       size=self._points_header)),
+                (self._offsets, _header(np.int64, (self._n_curves + 1,),
+                                        size=self._offsets_header))):
+            f.flush()
+            f.seek(0)
+            f.write(header)
+            f.flush()
+
+    def close(self):
+        r"""
+        Flush and close the files of the store.
+        """
+        self.flush()
+        for f in (self._points, self._offsets):
+            if f is not None:
+                f.close()
+        self._points = None
+        self._offsets = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class CurveStore(CurveBatch):
+    r"""
+    Read the curves of an on-disk curve store.
+
+    The points and offsets are memory-mapped, so opening a store reads
+    nothing, and indexing or iterating over a store gives views of the
+    mapped points without copying them. A store is a CurveBatch, and is
+    used wherever a CurveBatch is. Use chunks to process a large store
+    with bounded memory.
+
+    Parameters
+    ----------
+    path : str
+        Directory of a store written with CurveStoreWriter.
+
+    Attributes
+    ----------
+    data : ndarray (2-D)
+        The memory-mapped points of all curves.
+    offsets : ndarray (1-D)
+        The memory-mapped offsets, see CurveBatch.
+
+    Examples
+    --------
+    >>> store = CurveStore('campaign')
+    >>> for start, chunk in store.chunks(max_points=10**6):
+    ...     for curve in chunk:
+    ...         pass
+    """
+
+    def __init__(self, path):
+        self.path = path
+        offsets = _load(os.path.join(path, _OFFSETS))
+        data = _load(os.path.join(path, _POINTS))
+        if data.ndim != 2 or offsets.ndim != 1 or len(offsets) == 0 or \
+                offsets[-1] > len(data):
+            raise ValueError(path + ' is not a curve store')
+        self._set(data, offsets)
+
+
+def _load(file):
+    r"""
+    Memory-map a .npy file, or read it when it is empty, which can't be
+    mapped.
+    """
+    array = np.load(file, mmap_mode='r')
+    if array.size == 0:
+        return np.load(file)
+    return array
+
+
+def score_store(reference, store, measure='frechet_dist', out=None,
+                start=0, max_points=2**20, **kwargs):
+    r"""
+    Score every curve of a store against a reference curve, chunk by chunk.
+
+    Only one chunk of curves of the store is read at a time, so memory is
+    bounded by max_points whatever the size of the store. The scores are
+    written to out, which can be a memory-mapped .npy file, and yielded
+    chunk by chunk.
+
+    Parameters
+    ----------
+    reference : array_like or PreparedCurve
+        Curve compared as exp_data with every curve of the store as
+        num_data.
+    store : CurveStore, CurveBatch or str
+        The curves to score, or the directory of a curve store.
+    measure : str or callable, optional
+        The measure, see cdist_curves. Default is 'frechet_dist'.
+    out : str or ndarray (1-D), optional
+        Where to write the scores. A file name creates a memory-mapped .npy
+        file of len(store) scores, or opens it when start > 0. An array
+        must have len(store) items. Default is None, which only yields the
+        scores.
+    start : int, optional
+        Index of the first curve to score, to resume an interrupted run.
+        Default is 0.
+    max_points : int, optional
+        Largest number of points in a chunk, see CurveBatch.chunks. Default
+        is 2**20.
+    **kwargs : dict, optional
+        Extra arguments to the measure.
+
+    Yields
+    ------
+    start : int
+        Index of the first curve of the chunk.
+    scores : ndarray (1-D)
+        Scores of the curves of the chunk, a view of out when out is set.
+
+    Examples
+    --------
+    >>> store = CurveStore('campaign')
+    >>> for start, scores in score_store(exp_data, store, 'dtw',
+    ...                                  out='scores.npy'):
+    ...     print(start, scores.min())
+    >>> scores = np.load('scores.npy', mmap_mode='r')
+    """
+    if not callable(measure) and measure not in _MEASURES:
+        raise ValueError('measure must be a function or one of '
+                         + ', '.join(_MEASURES) + ', not ' + repr(measure))
+    if isinstance(store, str):
+        store = CurveStore(store)
+    elif not isinstance(store, CurveBatch):
+        store = CurveBatch(store)
+    n = len(store)
+    if isinstance(out, str):
+        if start > 0:
+            out = np.load(out, mmap_mode='r+')
+        else:
+            out = np.lib.format.open_memmap(out, mode='w+', dtype=float,
+                                            shape=(n,))
+    if out is not None and len(out) != n:
+        raise ValueError('out must have {} items'.format(n))
+    # set up the reference once, so a PreparedCurve keeps its cache
+    fun, A, _, kwargs = _setup([reference], [], measure, kwargs)
+    return _score_chunks(fun, A, kwargs, store[start:], start, out,
+                         max_points)
+
+
+def _score_chunks(fun, A, kwargs, curves, start, out, max_points):
+    r"""
+    The generator of score_store, after its arguments are checked.
+    """
+    for k, chunk in curves.chunks(max_points):
+        rows = np.zeros(len(chunk), dtype=np.intp)
+        scores = _evaluate_pairs((fun, A, chunk, kwargs), rows,
+                                 np.arange(len(chunk)))
+        k0 = start + k
+        if out is not None:
+            out[k0:k0 + len(chunk)] = scores
+            if isinstance(out, np.memmap):
+                out.flush()
+            scores = out[k0:k0 + len(chunk)]
+        yield k0, scores
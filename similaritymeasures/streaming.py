@@ -0,0 +1,439 @@
+from __future__ import division
+import numpy as np
+from scipy.spatial import distance
+from .similaritymeasures import _TILE_SIZE, _fill, _wavefront_fill_labels
+# MIT License
+#
+# Copyright (c) 2018,2019 Charles Jekel
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+# blocks of fewer samples are filled with a Python loop, which is faster
+# than the anti-diagonal wavefront for short blocks
+_MIN_WAVEFRONT_ROWS = 16
+
+
+def _fill_labels_loop(D, L, c):
+    r"""
+    _wavefront_fill_labels one cell at a time, with the same floating point
+    operations and the same choice of predecessor.
+    """
+    n, m = c.shape
+    D_rows = D.tolist()
+    L_rows = L.tolist()
+    c_rows = c.tolist()
+    for a in range(1, n + 1):
+        prev_d, row_d = D_rows[a - 1], D_rows[a]
+        prev_l, row_l = L_rows[a - 1], L_rows[a]
+        cost = c_rows[a - 1]
+        for b in range(1, m + 1):
+            up = prev_d[b]
+            left = row_d[b - 1]
+            t = min(up, left, prev_d[b - 1])
+            if up == t:
+                row_l[b] = prev_l[b]
+            elif left == t:
+                row_l[b] = row_l[b - 1]
+            else:
+                row_l[b] = prev_l[b - 1]
+            row_d[b] = cost[b - 1] + t
+    D[...] = D_rows
+    L[...] = L_rows
+
+
+def _as_points(points, dim):
+    r"""
+    New points as a (K, dim) array. A single point may be given as a 1-D
+    array, and with dim = 1, as a number, while a 1-D array is K points.
+    """
+    points = np.asarray(points, dtype=float)
+    if points.ndim == 0 and dim == 1:
+        points = points.reshape(1, 1)
+    elif points.ndim == 1:
+        points = points.reshape(-1, 1) if dim == 1 else points[None, :]
+    if points.ndim != 2 or points.shape[1] != dim:
+        raise ValueError('points must have shape (K, {})'.format(dim))
+    return points
+
+
+def _fill_loop(D, c, kind='dtw'):
+    r"""
+    _wavefront_fill one cell at a time, with the same floating point
+    operations.
+    """
+    n, m = c.shape
+    D_rows = D.tolist()
+    c_rows = c.tolist()
+    frechet = kind == 'frechet'
+    for a in range(1, n + 1):
+        prev_d, row_d = D_rows[a - 1], D_rows[a]
+        cost = c_rows[a - 1]
+        for b in range(1, m + 1):
+            t = min(prev_d[b], row_d[b - 1], prev_d[b - 1])
+            if frechet:
+                row_d[b] = max(t, cost[b - 1])
+            else:
+                row_d[b] = cost[b - 1] + t
+    D[...] = D_rows
+
+
+class _IncrementalScorer(object):
+    r"""
+    Last column of the cumulative matrix of dtw or frechet_dist, extended
+    as points are appended to num_data.
+    """
+
+    def __init__(self, exp_data, kind, metric, kwargs):
+        self.exp_data = np.asarray(exp_data, dtype=float)
+        if self.exp_data.ndim != 2 or len(self.exp_data) == 0:
+            raise ValueError('exp_data must have shape (M, N)')
+        if (metric == 'seuclidean' and kwargs.get('V') is None) or \
+                (metric == 'mahalanobis' and kwargs.get('VI') is None):
+            raise ValueError('the ' + metric + ' metric needs V or VI when '
+                             'num_data grows')
+        self.metric = metric
+        self.kwargs = kwargs
+        self.n_points = 0
+        self._kind = kind
+        # column 0 of the padded accumulator, see _init_accumulator
+        self._d = np.full(len(self.exp_data) + 1, np.inf)
+        self._d[0] = -np.inf if kind == 'frechet' else 0.0
+
+    @property
+    def distance(self):
+        return self._d[-1]
+
+    def update(self, points):
+        r"""
+        Append points to num_data.
+
+        Parameters
+        ----------
+        points : array_like
+            New points of (K, N) shape, or a single point of (N,) shape.
+            With N = 1, a 1-D array of K values is K points, and a number is
+            a single point.
+
+        Returns
+        -------
+        r : float
+            The distance of exp_data and all of the points so far.
+        """
+        points = _as_points(points, self.exp_data.shape[1])
+        for b0 in range(0, len(points), _TILE_SIZE):
+            block = points[b0:b0 + _TILE_SIZE]
+            # the columns of the new points, transposed so that each one is
+            # a row, with the same costs as the cdist of the whole curves
+            c = distance.cdist(self.exp_data, block, metric=self.metric,
+                               **self.kwargs).T
+            D = np.empty((len(block) + 1, len(self._d)))
+            D[0] = self._d
+            D[1:, 0] = np.inf
+            if len(block) < _MIN_WAVEFRONT_ROWS:
+                _fill_loop(D, c, kind=self._kind)
+            else:
+                _fill(D, c, kind=self._kind)
+            self._d = D[-1]
+            # the corner only starts the first column
+            self._d[0] = np.inf
+            self.n_points += len(block)
+        return self.distance
+
+
+class IncrementalDTW(_IncrementalScorer):
+    r"""
+    DTW distance of exp_data to a num_data curve that grows point by point.
+
+    Only the last column of the cumulative distance matrix of dtw is kept.
+    Each appended point of num_data computes one new column in O(M) time
+    and memory, and the distance is always identical to calling dtw with
+    all of the points so far.
+
+    Parameters
+    ----------
+    exp_data : array_like
+        Curve from your experimental data. exp_data is of (M, N) shape, where
+        M is the number of data points, and N is the number of dimensions
+    metric : str or callable, optional
+        The distance metric to use. Default='euclidean'. Refer to the
+        documentation for scipy.spatial.distance.cdist. 'seuclidean' and
+        'mahalanobis' need V and VI, since their defaults depend on
+        num_data.
+    **kwargs : dict, optional
+        Extra arguments to `metric`: refer to each metric documentation in
+        scipy.spatial.distance.
+
+    Attributes
+    ----------
+    n_points : int
+        Number of points of num_data so far.
+    distance : float
+        DTW distance of exp_data and the points so far, np.inf before the
+        first point.
+
+    Examples
+    --------
+    >>> scorer = IncrementalDTW(exp_data)
+    >>> for points in solver_steps:
+    ...     r = scorer.update(points)
+    """
+
+    def __init__(self, exp_data, metric='euclidean', **kwargs):
+        _IncrementalScorer.__init__(self, exp_data, 'dtw', metric, kwargs)
+
+
+class IncrementalFrechet(_IncrementalScorer):
+    r"""
+    Discrete Frechet distance of exp_data to a num_data curve that grows
+    point by point.
+
+    Only the last column of the coupling matrix of frechet_dist is kept.
+    Each appended point of num_data computes one new column in O(M) time
+    and memory, and the distance is always identical to calling
+    frechet_dist with all of the points so far.
+
+    Parameters
+    ----------
+    exp_data : array_like
+        Curve from your experimental data. exp_data is of (M, N) shape, where
+        M is the number of data points, and N is the number of dimensions
+    p : float, 1 <= p <= infinity
+        Which Minkowski p-norm to use. Default is p=2 (Eculidean).
+        The manhattan distance is p=1.
+
+    Attributes
+    ----------
+    n_points : int
+        Number of points of num_data so far.
+    distance : float
+        Discrete Frechet distance of exp_data and the points so far, np.inf
+        before the first point.
+
+    Examples
+    --------
+    >>> scorer = IncrementalFrechet(exp_data)
+    >>> for points in solver_steps:
+    ...     df = scorer.update(points)
+    """
+
+    def __init__(self, exp_data, p=2):
+        _IncrementalScorer.__init__(self, exp_data, 'frechet', 'minkowski',
+                                    {'p': p})
+
+
+class StreamingDTW(object):
+    r"""
+    Find the subsequences of a stream that match a reference curve under DTW.
+
+    This is the SPRING algorithm of [1]_. The DTW distance of the reference
+    to the best subsequence ending at the latest sample is one column of a
+    subsequence DTW matrix, in which a match may start at any sample. Each
+    new sample advances this column in O(M) time for a reference of M
+    points, and only the last column is kept, together with the sample at
+    which the best subsequence through each of its cells starts. The
+    memory does not grow with the length of the stream.
+
+    A match is reported once it can't be improved by later samples: its
+    distance is at most the threshold, and every subsequence that overlaps
+    it has a larger distance. The reported matches don't overlap.
+
+    Parameters
+    ----------
+    reference : array_like
+        The pattern to find, of (M, N) shape, where M is the number of data
+        points, and N is the number of dimensions.
+    threshold : float
+        Largest DTW distance of a match.
+    metric : str or callable, optional
+        The distance metric to use. Default='euclidean'. Refer to the
+        documentation for scipy.spatial.distance.cdist. 'seuclidean' and
+        'mahalanobis' need V and VI, since the stream isn't known in
+        advance.
+    **kwargs : dict, optional
+        Extra arguments to `metric`: refer to each metric documentation in
+        scipy.spatial.distance.
+
+    Attributes
+    ----------
+    n_samples : int
+        Number of samples of the stream seen so far.
+    distance : float
+        DTW distance of the reference to the best subsequence ending at the
+        latest sample, np.inf before the first sample.
+
+    Notes
+    -----
+    The cells of a batch of samples are computed with the anti-diagonal
+    wavefront of dtw, and every cell with exactly the same floating point
+    operations as one sample at a time, so the matches don't depend on how
+    the stream is split into updates. The distance of the first match is
+    the dtw distance of the reference and the matched samples. As in [1]_,
+    the cells whose best subsequence overlaps a reported match are
+    discarded, so a later match can have a larger distance than the dtw
+    distance of its samples.
+
+    Examples
+    --------
+    >>> spring = StreamingDTW(exp_data, threshold=5.0)
+    >>> for points in stream:
+    ...     for start, stop, d in spring.update(points):
+    ...         print('match of samples', start, 'to', stop - 1, d)
+    >>> matches = spring.flush()
+
+    .. [1] Sakurai, Y., Faloutsos, C. and Yamamuro, M., 2007. Stream
+        monitoring under the time warping distance. In 2007 IEEE 23rd
+        International Conference on Data Engineering, pp.1046-1055.
+        https://doi.org/10.1109/ICDE.2007.368963
+    """
+
+    def __init__(self, reference, threshold, metric='euclidean', **kwargs):
+        self.reference = np.asarray(reference, dtype=float)
+        if self.reference.ndim != 2 or len(self.reference) == 0:
+            raise ValueError('reference must have shape (M, N)')
+        if (metric == 'seuclidean' and kwargs.get('V') is None) or \
+                (metric == 'mahalanobis' and kwargs.get('VI') is None):
+            raise ValueError('the ' + metric + ' metric needs V or VI with '
+                             'a stream')
+        self.threshold = threshold
+        self.metric = metric
+        self.kwargs = kwargs
+        self.n_samples = 0
+        m = len(self.reference)
+        # the last column, with d(t, 0) = 0 so that a match can start at any
+        # sample, and the start of the best subsequence through each cell
+        self._d = np.full(m + 1, np.inf)
+        self._d[0] = 0.0
+        self._s = np.zeros(m + 1, dtype=np.int64)
+        # the best match that hasn't been reported yet
+        self._best = np.inf
+        self._start = 0
+        self._end = 0
+
+    @property
+    def distance(self):
+        return self._d[-1]
+
+    def update(self, points):
+        r"""
+        Advance the stream by one or more samples.
+
+        Parameters
+        ----------
+        points : array_like
+            New samples of (K, N) shape, or a single sample of (N,) shape.
+            With N = 1, a 1-D array of K values is K samples, and a number
+            is a single sample.
+
+        Returns
+        -------
+        matches : list of tuple
+            The matches that were completed by these samples, as (start,
+            stop, distance), where the samples start to stop - 1 of the
+            stream match the reference with the DTW distance distance.
+        """
+        points = _as_points(points, self.reference.shape[1])
+        matches = []
+        for b0 in range(0, len(points), _TILE_SIZE):
+            c = distance.cdist(points[b0:b0 + _TILE_SIZE], self.reference,
+                               metric=self.metric, **self.kwargs)
+            k = 0
+            while k < len(c):
+                k += self._advance(c[k:], matches)
+        return matches
+
+    def flush(self):
+        r"""
+        Report the best match found so far even though later samples could
+        still improve it, for example at the end of the stream.
+
+        Returns
+        -------
+        matches : list of tuple
+            The pending match as (start, stop, distance), if there is one.
+        """
+        if self._best > self.threshold:
+            return []
+        matches = [(self._start, self._end + 1, self._best)]
+        # later matches must not overlap the reported one
+        self._d[self._s <= self._end] = np.inf
+        self._d[0] = 0.0
+        self._best = np.inf
+        return matches
+
+    def _advance(self, c, matches):
+        r"""
+        Compute the columns of the samples with the local costs c, up to the
+        first sample that completes a match, and append the match.
+
+        Returns
+        -------
+        k : int
+            Number of samples that were consumed.
+        """
+        n, m = c.shape
+        t0 = self.n_samples
+        D = np.empty((n + 1, m + 1))
+        D[0] = self._d
+        D[1:, 0] = 0.0
+        L = np.empty((n + 1, m + 1), dtype=np.int64)
+        L[0] = self._s
+        L[1:, 0] = t0 + np.arange(n)
+        if n < _MIN_WAVEFRONT_ROWS:
+            _fill_labels_loop(D, L, c)
+        else:
+            _wavefront_fill_labels(D, L, c)
+        # the best candidate before each sample, assuming no match is
+        # reported in between
+        last = D[1:, m]
+        candidate = np.where(last <= self.threshold, last, np.inf)
+        best = np.minimum.accumulate(np.concatenate([[self._best],
+                                                     candidate]))
+        improved = candidate < best[:-1]
+        latest = np.maximum.accumulate(np.where(improved, np.arange(n), -1))
+        before = np.concatenate([[-1], latest[:-1]])
+        end = np.where(before >= 0, t0 + before, self._end)
+        start = np.where(before >= 0, L[before + 1, m], self._start)
+        # a candidate is reported when no cell can lead to a better match
+        # that overlaps it
+        done = (best[:-1] <= self.threshold) & np.all(
+            (D[1:, 1:] >= best[:-1, None]) | (L[1:, 1:] > end[:, None]),
+            axis=1)
+        if not done.any():
+            self._d = D[n]
+            self._s = L[n]
+            self._best = best[n]
+            if latest[-1] >= 0:
+                self._end = t0 + int(latest[-1])
+                self._start = int(L[latest[-1] + 1, m])
+            self.n_samples += n
+            return n
+        r = int(np.argmax(done))
+        matches.append((int(start[r]), int(end[r]) + 1, best[r]))
+        d = D[r + 1]
+        s = L[r + 1]
+        d[s <= end[r]] = np.inf
+        self._d = d
+        self._s = s
+        self._best = np.inf
+        if d[m] <= self.threshold:
+            self._best = d[m]
+            self._start = int(s[m])
+            self._end = t0 + r
+        self.n_samples += r + 1
+        return r + 1
@@ -1,5 +1,12 @@
+import io
+import os
+import tempfile
+import tracemalloc
 import numpy as np
 import unittest
+from unittest import mock
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.reduction import ForkingPickler
 import similaritymeasures
 from scipy.spatial.distance import cdist
 
@@ -39,6 +46,10 @@ curve5 = np.array((x1, y1)).T
 curve6 = np.array((x2, y2)).T
 
 
+def _failing_measure(exp_data, num_data):
+    return 1 / 0
+
+
 class TestEverything(unittest.TestCase):
 
     def test_c1_c2_area(self):
@@ -266,6 +277,901 @@ class TestEverything(unittest.TestCase):
         area = similaritymeasures.area_between_two_curves(q, p)
         self.assertTrue(np.isclose(area, 1.0))
 
+    def test_dtw_wavefront_matches_loop(self):
+        for a, b in [(curve_a_rand, curve_b_rand), (curve5, curve6),
+                     (P, Q), (P[:1], Q), (P, Q[:1]), (P[:1], Q[:1])]:
+            r1, d1 = similaritymeasures.dtw(a, b)
+            r2, d2 = similaritymeasures.dtw(a, b, engine='loop')
+            self.assertEqual(r1, r2)
+            self.assertTrue(np.array_equal(d1, d2))
+            path1 = similaritymeasures.dtw_path(d1)
+            path2 = similaritymeasures.dtw_path(d2)
+            self.assertTrue(np.array_equal(path1, path2))
+
+    def test_dtw_bad_engine(self):
+        with self.assertRaises(ValueError):
+            similaritymeasures.dtw(P, Q, engine='recursive')
+
+    def test_frechet_wavefront_matches_loop(self):
+        for a, b in [(curve_a_rand, curve_b_rand), (curve5, curve6),
+                     (P, Q), (P[:1], Q), (P, Q[:1]), (P[:1], Q[:1])]:
+            for p in [1, 2, np.inf]:
+                df1 = similaritymeasures.frechet_dist(a, b, p)
+                df2 = similaritymeasures.frechet_dist(a, b, p, engine='loop')
+                self.assertEqual(df1, df2)
+
+    def test_dtw_window_matches_masked_loop(self):
+        from similaritymeasures.similaritymeasures import _band_limits
+        c = cdist(curve_a_rand, curve_b_rand)
+        n, m = c.shape
+        for window, slope in [(0, None), (5, None), (None, 1.5), (3, 2.0)]:
+            lo, hi = _band_limits(n, m, window=window, slope=slope)
+            masked = np.full((n, m), np.inf)
+            for i in range(n):
+                masked[i, lo[i]:hi[i]] = c[i, lo[i]:hi[i]]
+            d_ref = similaritymeasures.similaritymeasures._dtw_loop(masked)
+            r, d = similaritymeasures.dtw(curve_a_rand, curve_b_rand,
+                                          window=window, slope=slope)
+            self.assertIsInstance(d, similaritymeasures.BandedMatrix)
+            self.assertEqual(r, d_ref[-1, -1])
+            self.assertTrue(np.array_equal(d.toarray(), d_ref))
+            path = similaritymeasures.dtw_path(d)
+            self.assertTrue(np.array_equal(path,
+                                           similaritymeasures.dtw_path(d_ref)))
+            self.assertTrue(np.isclose(r, np.sum(c[path[:, 0], path[:, 1]])))
+            df = similaritymeasures.frechet_dist(curve_a_rand, curve_b_rand,
+                                                 window=window, slope=slope)
+            df_ref = similaritymeasures.similaritymeasures._frechet_loop(
+                masked)[-1, -1]
+            self.assertEqual(df, df_ref)
+
+    def test_dtw_wide_window_is_unconstrained(self):
+        r1, _ = similaritymeasures.dtw(curve5, curve6)
+        r2, _ = similaritymeasures.dtw(curve5, curve6, window=1000)
+        self.assertEqual(r1, r2)
+        df1 = similaritymeasures.frechet_dist(curve1, curve2)
+        df2 = similaritymeasures.frechet_dist(curve1, curve2, window=1000)
+        self.assertEqual(df1, df2)
+
+    def test_dtw_bad_band(self):
+        with self.assertRaises(ValueError):
+            similaritymeasures.dtw(P, Q, slope=0.5)
+        with self.assertRaises(ValueError):
+            similaritymeasures.dtw(P, Q, window=-1)
+
+    def test_distance_only_matches_matrix(self):
+        from similaritymeasures.similaritymeasures import _rolling_dp
+        np.random.seed(123)
+        a = np.random.random((600, 3))
+        b = np.random.random((70, 3))
+        for x, y in [(a, b), (b, a), (curve_a_rand, curve_b_rand), (P, Q)]:
+            r, d = similaritymeasures.dtw(x, y)
+            self.assertEqual(similaritymeasures.dtw(x, y, return_matrix=False),
+                             d[-1, -1])
+            df, ca = similaritymeasures.frechet_dist(x, y, return_matrix=True)
+            self.assertEqual(similaritymeasures.frechet_dist(x, y),
+                             ca[-1, -1])
+            # small tiles exercise the boundaries between blocks
+            self.assertEqual(_rolling_dp(x, y, tile=7), r)
+            self.assertEqual(_rolling_dp(x, y, kind='frechet',
+                                         metric='minkowski', p=2, tile=7), df)
+
+    def test_distance_only_data_dependent_metric(self):
+        for metric in ['seuclidean', 'mahalanobis']:
+            r, _ = similaritymeasures.dtw(curve_a_rand, curve_b_rand,
+                                          metric=metric)
+            r2 = similaritymeasures.dtw(curve_a_rand, curve_b_rand,
+                                        metric=metric, return_matrix=False)
+            self.assertTrue(np.isclose(r, r2))
+
+    def test_dtw_align_matches_dtw_path(self):
+        from similaritymeasures.similaritymeasures import _linear_path
+        np.random.seed(5)
+        ties_a = np.random.randint(0, 3, (60, 1)).astype(float)
+        ties_b = np.random.randint(0, 3, (50, 1)).astype(float)
+        for a, b in [(curve_a_rand, curve_b_rand), (curve1, curve2),
+                     (curve5, curve6), (P, Q), (ties_a, ties_b),
+                     (np.zeros((30, 2)), np.zeros((40, 2)))]:
+            r, d = similaritymeasures.dtw(a, b)
+            path = similaritymeasures.dtw_path(d)
+            r2, path2 = similaritymeasures.dtw_align(a, b)
+            self.assertEqual(r, r2)
+            self.assertTrue(np.array_equal(path, path2))
+            # tiny blocks force several levels of recursion
+            r3, path3 = _linear_path(a, b, tile=3, base=8)
+            self.assertEqual(r, r3)
+            self.assertTrue(np.array_equal(path, path3))
+            r4, path4 = similaritymeasures.dtw_align(a, b, engine='steps')
+            self.assertEqual(r, r4)
+            self.assertTrue(np.array_equal(path, path4))
+
+    def test_dtw_align_steps(self):
+        from similaritymeasures.similaritymeasures import (_tiled_dp,
+                                                           _step_path)
+        sm = similaritymeasures
+        np.random.seed(25)
+        for n, m in [(1, 1), (1, 7), (7, 1), (41, 37)]:
+            a = np.random.randint(0, 3, (n, 1)).astype(float)
+            b = np.random.randint(0, 3, (m, 1)).astype(float)
+            r, d = sm.dtw(a, b, metric='cityblock')
+            path = sm.dtw_path(d)
+            # the step codes cross the boundaries of several small tiles
+            steps = np.empty((n, m), dtype=np.uint8)
+            r2 = _tiled_dp(a, b, metric='cityblock', n_jobs=2, tile=5,
+                           steps=steps)
+            self.assertEqual(r, r2)
+            self.assertTrue(np.all(steps <= 2))
+            self.assertTrue(np.array_equal(path, _step_path(steps)))
+        with self.assertRaises(ValueError):
+            sm.dtw_align(curve1, curve2, engine='full')
+        # the codes take a byte per cell, and the cumulative distances are
+        # only kept for the tile being filled and the boundaries of the
+        # tiles, which is less than the float64 cumulative distance matrix
+        a = np.random.random((1200, 2))
+        b = np.random.random((800, 2))
+        r, path = sm.dtw_align(a, b)
+        tracemalloc.start()
+        try:
+            r2, path2 = sm.dtw_align(a, b, engine='steps')
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(r, r2)
+        self.assertTrue(np.array_equal(path, path2))
+        self.assertLess(peak, 1200 * 800 * 8)
+
+    def test_fastdtw_error(self):
+        # relative error of fastdtw against exact dtw on the test curves
+        pairs = [(curve1, curve2), (curve3, curve4), (curve5, curve6),
+                 (curve_a_rand, curve_b_rand), (P, Q)]
+        max_error = {0: 0.5, 1: 0.15, 2: 0.05, 5: 0.0}
+        for a, b in pairs:
+            r, _ = similaritymeasures.dtw(a, b)
+            c = cdist(a, b)
+            for radius, tol in max_error.items():
+                r_fast, path = similaritymeasures.fastdtw(a, b, radius=radius)
+                error = (r_fast - r) / r
+                msg = '{} x {} radius {}: relative error {:.4f}'.format(
+                    len(a), len(b), radius, error)
+                self.assertGreaterEqual(error, -1e-12, msg)
+                self.assertLessEqual(error, tol, msg)
+                self.assertTrue(np.isclose(r_fast,
+                                           np.sum(c[path[:, 0], path[:, 1]])))
+                self.assertTrue(np.array_equal(path[0], [0, 0]))
+                self.assertTrue(np.array_equal(path[-1],
+                                               [len(a) - 1, len(b) - 1]))
+            r_fast, path = similaritymeasures.fastdtw(a, b, radius=200)
+            self.assertEqual(r_fast, r)
+
+    def test_dtw_abandon_above(self):
+        np.random.seed(123)
+        for n, m in [(1, 1), (1, 7), (7, 1), (60, 45), (45, 130)]:
+            a = np.random.random((n, 2))
+            b = np.random.random((m, 2))
+            r, d = similaritymeasures.dtw(a, b)
+            r_band, _ = similaritymeasures.dtw(a, b, window=4)
+            for bound in [0.0, 0.5 * r, r, 1.5 * r]:
+                r1, d1 = similaritymeasures.dtw(a, b, abandon_above=bound)
+                r2 = similaritymeasures.dtw(a, b, abandon_above=bound,
+                                            return_matrix=False)
+                r3, _ = similaritymeasures.dtw(a, b, window=4,
+                                               abandon_above=bound)
+                expected = r if r <= bound else np.inf
+                self.assertEqual(r1, expected)
+                self.assertEqual(r2, expected)
+                self.assertEqual(r3, r_band if r_band <= bound else np.inf)
+                # every cell below the bound is exact
+                below = d <= bound
+                self.assertTrue(np.array_equal(d1[below], d[below]))
+
+    def test_dtw_knn_matches_brute_force(self):
+        np.random.seed(42)
+        library = [np.cumsum(np.random.normal(size=(np.random.randint(
+            1, 40), 2)), axis=0) for i in range(120)]
+        query = library[5] + np.random.normal(scale=0.1, size=(len(
+            library[5]), 2))
+        for metric in ['euclidean', 'sqeuclidean', 'cityblock', 'cosine']:
+            for window in [None, 3]:
+                r = np.array([similaritymeasures.dtw(
+                    query, c, metric=metric, window=window,
+                    return_matrix=False) for c in library])
+                expected = np.lexsort((np.arange(len(r)), r))[:4]
+                indices, distances, pruned = similaritymeasures.dtw_knn(
+                    query, library, k=4, window=window, metric=metric)
+                self.assertTrue(np.array_equal(indices, expected))
+                self.assertTrue(np.array_equal(distances, r[expected]))
+                self.assertEqual(pruned['lb_kim'] + pruned['lb_keogh'] +
+                                 pruned['lb_improved'] + pruned['dtw'],
+                                 len(library))
+        lib = similaritymeasures.DTWLibrary(library, window=3)
+        indices, _, pruned = similaritymeasures.dtw_knn(query, lib, k=200)
+        self.assertEqual(len(indices), len(library))
+        self.assertEqual(pruned['dtw'], len(library))
+
+    def test_dtw_lower_bounds(self):
+        np.random.seed(7)
+        for dim in [1, 3]:
+            library = [np.random.random((np.random.randint(1, 25), dim))
+                       for i in range(20)]
+            query = np.random.random((17, dim))
+            for metric in ['euclidean', 'sqeuclidean', 'cityblock']:
+                lib = similaritymeasures.DTWLibrary(library, window=2,
+                                                    metric=metric)
+                kim = lib._lb_kim(query)
+                keogh = lib._lb_keogh(query, np.arange(len(library)))
+                for i, c in enumerate(library):
+                    r = similaritymeasures.dtw(query, c, metric=metric,
+                                               window=2, return_matrix=False)
+                    self.assertLessEqual(kim[i], r + 1e-12)
+                    self.assertLessEqual(keogh[i], r + 1e-12)
+                    if lib._improved:
+                        improved = lib._lb_improved(query, i, keogh[i])
+                        self.assertLessEqual(keogh[i], improved)
+                        self.assertLessEqual(improved, r + 1e-12)
+
+    def test_frechet_leq_and_search(self):
+        np.random.seed(99)
+        for n, m in [(1, 1), (1, 9), (9, 1), (30, 41), (41, 30)]:
+            a = np.round(np.random.random((n, 2)), 1)
+            b = np.random.random((m, 2))
+            for p in [1, 2, np.inf]:
+                for window, slope in [(None, None), (3, None), (None, 1.5)]:
+                    df = similaritymeasures.frechet_dist(
+                        a, b, p, window=window, slope=slope)
+                    df_search = similaritymeasures.frechet_dist(
+                        a, b, p, window=window, slope=slope, engine='search')
+                    self.assertEqual(df, df_search)
+                    self.assertTrue(similaritymeasures.frechet_leq(
+                        a, b, df, p, window=window, slope=slope))
+                    self.assertFalse(similaritymeasures.frechet_leq(
+                        a, b, np.nextafter(df, 0.0), p, window=window,
+                        slope=slope))
+        with self.assertRaises(ValueError):
+            similaritymeasures.frechet_dist(a, b, engine='search',
+                                            return_matrix=True)
+
+    def test_frechet_index_matches_brute_force(self):
+        np.random.seed(2024)
+        curves = [np.cumsum(np.random.normal(size=(np.random.randint(
+            1, 25), 2)), axis=0) for i in range(80)]
+        for p in [1, 2]:
+            index = similaritymeasures.FrechetIndex(curves, p=p, leaf_size=3)
+            buf = io.BytesIO()
+            index.save(buf)
+            buf.seek(0)
+            loaded = similaritymeasures.FrechetIndex.load(buf)
+            for q in [curves[3] + 0.1, np.random.random((12, 2))]:
+                df = np.array([similaritymeasures.frechet_dist(q, c, p)
+                               for c in curves])
+                order = np.lexsort((np.arange(len(df)), df))
+                for tree in [index, loaded]:
+                    indices, distances, counts = tree.knn(q, k=4)
+                    self.assertTrue(np.array_equal(indices, order[:4]))
+                    self.assertTrue(np.array_equal(distances, df[order[:4]]))
+                    radius = df[order[10]]
+                    indices, distances, counts = tree.range_query(q, radius)
+                    self.assertTrue(np.array_equal(indices, order[:11]))
+                    self.assertLessEqual(counts['distance'], len(curves))
+
+    def test_area_heap_matches_loop(self):
+        np.random.seed(11)
+        x = np.linspace(0.0, 1.0, 15)
+        curves = [np.random.random((12, 2)),
+                  np.array((x, np.zeros(15))).T,
+                  np.array((np.zeros(15), x)).T,
+                  np.array((x[::-1], x ** 2)).T,
+                  np.round(np.random.random((9, 2)) * 4) / 4]
+        for num_data in curves:
+            exp_data = np.random.random((len(num_data) + 37, 2))
+            a_loop = similaritymeasures.area_between_two_curves(
+                exp_data, num_data, engine='loop')
+            a_heap = similaritymeasures.area_between_two_curves(
+                exp_data, num_data)
+            self.assertEqual(a_loop, a_heap)
+            refined_loop = similaritymeasures.similaritymeasures._refine_loop(
+                num_data, len(exp_data))
+            refined_heap = similaritymeasures.similaritymeasures._refine_heap(
+                num_data, len(exp_data))
+            self.assertTrue(np.array_equal(refined_loop, refined_heap))
+        with self.assertRaises(ValueError):
+            similaritymeasures.area_between_two_curves(exp_data, num_data,
+                                                       engine='insert')
+
+    def test_quad_areas_match_makeQuad(self):
+        np.random.seed(5)
+        x = np.random.normal(size=(300, 4))
+        y = np.random.normal(size=(300, 4))
+        x[:100] = np.round(x[:100])
+        y[:100] = np.round(y[:100])
+        # complex, simple and both triangle cases of the is_simple_quad tests
+        x[100:104] = [[0, 1, 1, 0], [0, 0, 1, 1], [0, 1, 1, 0], [0, 1, 1, 0]]
+        y[100:104] = [[0, 1, 0, 1], [0, 1, 1, 0], [0, 0, 1, 0], [0, 1, 0, 0]]
+        areas = similaritymeasures.similaritymeasures._quad_areas(x, y)
+        for i in range(len(x)):
+            self.assertEqual(areas[i], similaritymeasures.makeQuad(
+                list(x[i]), list(y[i])))
+
+    def test_pcm_batched_matches_loop(self):
+        np.random.seed(31)
+        for n, m in [(2, 2), (5, 30), (30, 5), (40, 41)]:
+            a = np.cumsum(np.random.random((n, 2)), axis=0)
+            b = np.cumsum(np.random.random((m, 2)), axis=0)
+            for norm_seg_length in [False, True]:
+                p_loop = similaritymeasures.pcm(a, b, norm_seg_length,
+                                                engine='loop')
+                p = similaritymeasures.pcm(a, b, norm_seg_length)
+                self.assertEqual(p, p_loop)
+        with self.assertRaises(ValueError):
+            similaritymeasures.pcm(a, b, engine='vectorized')
+
+    def test_pcm_adaptive(self):
+        x = np.linspace(0.0, 10.0, 500)
+        a = np.array((x, np.sin(x))).T
+        b = np.array((x[:300] * 1.1, np.sin(x[:300]))).T
+        p_fine = similaritymeasures.pcm(a, b, n_offsets=5000)
+        p_adaptive = similaritymeasures.pcm(a, b, tol=1e-4)
+        self.assertTrue(np.isclose(p_adaptive, p_fine, rtol=1e-5))
+        self.assertLessEqual(p_adaptive, similaritymeasures.pcm(a, b))
+        with self.assertRaises(ValueError):
+            similaritymeasures.pcm(a, b, n_offsets=2, tol=1e-3)
+        # the smallest grid still gets finer with every refinement, and
+        # stops even with tol=0 once rounding prevents it
+        for tol in [1e-4, 0.0]:
+            p3 = similaritymeasures.pcm(a, b, n_offsets=3, tol=tol)
+            self.assertLessEqual(p3, similaritymeasures.pcm(a, b,
+                                                            n_offsets=3))
+            self.assertEqual(p3, similaritymeasures.pcm(a, b, n_offsets=3,
+                                                        tol=tol,
+                                                        engine='loop'))
+
+    def test_prepared_curve(self):
+        sm = similaritymeasures
+        measures = [
+            sm.pcm,
+            lambda a, b: sm.pcm(a, b, norm_seg_length=True),
+            lambda a, b: sm.pcm(a, b, tol=1e-3),
+            sm.curve_length_measure,
+            sm.area_between_two_curves,
+            lambda a, b: sm.area_between_two_curves(a, b, engine='loop'),
+            sm.frechet_dist,
+            lambda a, b: sm.frechet_dist(a, b, engine='search'),
+            lambda a, b: sm.frechet_dist(a, b, window=20),
+            lambda a, b: sm.frechet_leq(a, b, 0.5),
+            lambda a, b: sm.dtw(a, b)[0],
+            lambda a, b: sm.dtw(a, b, return_matrix=False),
+            lambda a, b: sm.dtw(a, b, window=20, return_matrix=False),
+            lambda a, b: sm.dtw_align(a, b)[0],
+            lambda a, b: sm.fastdtw(a, b)[0],
+        ]
+        pairs = [(curve_a_rand, curve_b_rand), (curve_b_rand, curve_a_rand),
+                 (curve3, curve4), (curve4, curve3), (curve5, curve6)]
+        for a, b in pairs:
+            exp = sm.PreparedCurve(a)
+            num = sm.PreparedCurve(b)
+            for measure in measures:
+                r = measure(a, b)
+                # twice, so that the second call uses the cached values
+                for i in range(2):
+                    np.testing.assert_array_equal(measure(exp, b), r)
+                    np.testing.assert_array_equal(measure(a, num), r)
+                    np.testing.assert_array_equal(measure(exp, num), r)
+        exp = sm.PreparedCurve(curve_a_rand)
+        self.assertEqual(sm.mae(exp, curve_a_rand[::-1]),
+                         sm.mae(curve_a_rand, curve_a_rand[::-1]))
+        self.assertEqual(sm.mse(exp, curve_a_rand[::-1]),
+                         sm.mse(curve_a_rand, curve_a_rand[::-1]))
+        self.assertEqual(len(exp), 100)
+        self.assertEqual(exp.shape, (100, 2))
+        self.assertTrue(np.array_equal(np.asarray(exp), curve_a_rand))
+
+    def test_cdist_pdist_curves(self):
+        sm = similaritymeasures
+        np.random.seed(1212121)
+        A = [np.random.random((np.random.randint(5, 40), 2))
+             for i in range(9)]
+        B = A[:4]
+        for measure in ['dtw', 'frechet_dist', 'pcm', 'fastdtw']:
+            fun = getattr(sm, measure)
+
+            def direct(a, b):
+                r = fun(a, b)
+                return r[0] if isinstance(r, tuple) else r
+            Y = sm.pdist_curves(A, measure=measure)
+            expected = [direct(A[i], A[j]) for i in range(9)
+                        for j in range(i + 1, 9)]
+            np.testing.assert_array_equal(Y, expected)
+            np.testing.assert_array_equal(
+                sm.pdist_curves(A, measure=measure, n_jobs=2), Y)
+            Y = sm.cdist_curves(A, B, measure=measure)
+            expected = [[direct(a, b) for b in B] for a in A]
+            np.testing.assert_array_equal(Y, expected)
+            np.testing.assert_array_equal(
+                sm.cdist_curves(A, B, measure=measure, n_jobs=3), Y)
+        Y = sm.cdist_curves(A, B, measure=sm.frechet_dist, n_jobs=2, p=1)
+        self.assertEqual(Y[5, 2], sm.frechet_dist(A[5], B[2], p=1))
+        self.assertEqual(sm.pdist_curves(A[:1]).shape, (0,))
+        with self.assertRaises(ValueError):
+            sm.pdist_curves(A, measure='hausdorff')
+        with self.assertRaises(ValueError):
+            sm.pdist_curves(A, n_jobs=0)
+
+    def test_curve_batch(self):
+        sm = similaritymeasures
+        np.random.seed(1212121)
+        curves = [np.random.random((n, 2)) for n in [5, 1, 12, 7]]
+        batch = sm.CurveBatch(curves)
+        self.assertEqual(len(batch), 4)
+        np.testing.assert_array_equal(batch.lengths, [5, 1, 12, 7])
+        np.testing.assert_array_equal(batch.offsets, [0, 5, 6, 18, 25])
+        for a, b in zip(batch, curves):
+            np.testing.assert_array_equal(a, b)
+        self.assertTrue(np.shares_memory(batch[2], batch.data))
+        np.testing.assert_array_equal(batch[-1], curves[-1])
+        part = batch[1:3]
+        self.assertTrue(np.shares_memory(part.data, batch.data))
+        self.assertEqual(len(part), 2)
+        np.testing.assert_array_equal(part[1], curves[2])
+        np.testing.assert_array_equal(batch[::2][1], curves[2])
+        self.assertEqual(sm.frechet_dist(batch[0], batch[2]),
+                         sm.frechet_dist(curves[0], curves[2]))
+        # .npz files saved by the batch or with one array per curve, and
+        # .npy files of curves with the same length
+        for save in [batch.save, lambda f: np.savez(f, *curves)]:
+            f = io.BytesIO()
+            save(f)
+            f.seek(0)
+            loaded = sm.CurveBatch.load(f)
+            np.testing.assert_array_equal(loaded.data, batch.data)
+            np.testing.assert_array_equal(loaded.offsets, batch.offsets)
+        f = io.BytesIO()
+        np.save(f, np.random.random((3, 4, 2)))
+        f.seek(0)
+        self.assertEqual(list(sm.CurveBatch.load(f).lengths), [4, 4, 4])
+        # batch APIs
+        np.testing.assert_array_equal(sm.pdist_curves(batch),
+                                      sm.pdist_curves(curves))
+        np.testing.assert_array_equal(
+            sm.cdist_curves(batch, batch[1:], measure='dtw', n_jobs=2),
+            sm.cdist_curves(curves, curves[1:], measure='dtw'))
+        query = np.random.random((6, 2))
+        indices, distances, _ = sm.dtw_knn(query, batch, k=2)
+        expected = sm.dtw_knn(query, curves, k=2)
+        np.testing.assert_array_equal(indices, expected[0])
+        np.testing.assert_array_equal(distances, expected[1])
+        index = sm.FrechetIndex(batch, leaf_size=1)
+        self.assertEqual(index.knn(query)[0][0],
+                         sm.FrechetIndex(curves, leaf_size=1).knn(query)[0][0])
+        with self.assertRaises(ValueError):
+            sm.CurveBatch([np.zeros((3, 2)), np.zeros((3, 3))])
+        with self.assertRaises(ValueError):
+            sm.CurveBatch.from_buffer(batch.data, [0, 5, 3])
+
+    def test_curve_store(self):
+        sm = similaritymeasures
+        np.random.seed(1212121)
+        curves = [np.random.random((n, 2)) for n in
+                  np.random.randint(1, 30, size=40)]
+        reference = np.random.random((20, 2))
+        expected = [sm.dtw(reference, c)[0] for c in curves]
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'store')
+            with sm.CurveStoreWriter(path) as writer:
+                writer.extend(curves[:15])
+            self.assertEqual(len(sm.CurveStore(path)), 15)
+            with sm.CurveStoreWriter(path) as writer:
+                writer.extend(curves[15:30])
+            # an interrupted append after the last flush is dropped
+            for name in ['points.npy', 'offsets.npy']:
+                with open(os.path.join(path, name), 'ab') as f:
+                    f.write(b'interrupted')
+            self.assertEqual(len(sm.CurveStore(path)), 30)
+            with sm.CurveStoreWriter(path, dim=2) as writer:
+                writer.extend(curves[30:])
+            store = sm.CurveStore(path)
+            self.assertEqual(len(store), 40)
+            self.assertIsInstance(store.data, np.memmap)
+            for a, b in zip(store, curves):
+                np.testing.assert_array_equal(a, b)
+                self.assertTrue(np.shares_memory(a, store.data))
+            sizes = [chunk.offsets[-1] - chunk.offsets[0]
+                     for _, chunk in store.chunks(max_points=50)]
+            self.assertEqual(sum(sizes), len(store.data))
+            self.assertTrue(all(size <= 50 for size in sizes))
+            # scores written to a memory-mapped file, and resumed
+            out = os.path.join(tmp, 'scores.npy')
+            starts = [k for k, _ in sm.score_store(
+                reference, path, 'dtw', out=out, max_points=50)]
+            self.assertEqual(starts[0], 0)
+            self.assertGreater(len(starts), 1)
+            np.testing.assert_array_equal(np.load(out), expected)
+            chunks = list(sm.score_store(reference, store, 'dtw', out=out,
+                                         start=25))
+            self.assertEqual(chunks[0][0], 25)
+            np.testing.assert_array_equal(chunks[0][1], expected[25:])
+            np.testing.assert_array_equal(np.load(out), expected)
+            with self.assertRaises(ValueError):
+                sm.CurveStoreWriter(path, dim=3)
+            with self.assertRaises(ValueError):
+                sm.score_store(reference, store, out=np.zeros(3))
+
+    def test_curve_store_header(self):
+        sm = similaritymeasures
+
+        def write_header(fp, d):
+            # NumPy < 1.23 pads the header to 16 bytes without any room for
+            # the shape to grow
+            header = repr({'descr': d['descr'],
+                           'fortran_order': d['fortran_order'],
+                           'shape': d['shape']})
+            header += ' ' * (-(len(header) + 11) % 16) + '\n'
+            fp.write(b'\x93NUMPY\x01\x00'
+                     + len(header).to_bytes(2, 'little')
+                     + header.encode('latin1'))
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(np.lib.format, 'write_array_header_1_0',
+                                  write_header):
+            path = os.path.join(tmp, 'store')
+            curves = []
+            with sm.CurveStoreWriter(path, dim=2) as writer:
+                # the number of points gains a digit at 10 and 100, and
+                # the number of offsets at 10
+                for n in [4, 5, 1, 89, 1]:
+                    curves.append(np.random.random((n, 2)))
+                    writer.append(curves[-1])
+                    writer.flush()
+                    store = sm.CurveStore(path)
+                    self.assertEqual(len(store), len(curves))
+                    for a, b in zip(store, curves):
+                        np.testing.assert_array_equal(a, b)
+                for i in range(6):
+                    curves.append(np.random.random((1, 2)))
+                    writer.append(curves[-1])
+                    writer.flush()
+            points = np.load(os.path.join(path, 'points.npy'))
+            offsets = np.load(os.path.join(path, 'offsets.npy'))
+            self.assertEqual(points.shape, (106, 2))
+            self.assertEqual(len(offsets), 12)
+            np.testing.assert_array_equal(points, np.concatenate(curves))
+            # the headers have a fixed size, independent of NumPy's padding
+            for name, array in [('points.npy', points),
+                                ('offsets.npy', offsets)]:
+                size = os.path.getsize(os.path.join(path, name))
+                self.assertEqual(size - array.nbytes, 128)
+
+    def test_shared_memory_transport(self):
+        sm = similaritymeasures
+        np.random.seed(1212121)
+        A = [np.random.random((20000, 2)) for i in range(6)]
+        sizes = []
+        dumps = ForkingPickler.dumps
+
+        def record(obj, *args, **kwargs):
+            data = dumps(obj, *args, **kwargs)
+            sizes.append(len(data))
+            return data
+        segments = set(os.listdir('/dev/shm')) if os.path.isdir(
+            '/dev/shm') else set()
+        with mock.patch.object(ForkingPickler, 'dumps', record):
+            Y = sm.pdist_curves(A, measure='mae', n_jobs=2)
+        np.testing.assert_array_equal(Y, sm.pdist_curves(A, measure='mae'))
+        # each task and result is far smaller than a single curve
+        self.assertGreater(len(sizes), 0)
+        self.assertLess(max(sizes), A[0].nbytes / 10)
+        # the segments are removed after an error in a worker, and the
+        # pending tasks are cancelled without the cancel_futures argument
+        # of Python 3.9
+        shutdown = ProcessPoolExecutor.shutdown
+        shutdown_kwargs = []
+
+        def record_shutdown(pool, *args, **kwargs):
+            shutdown_kwargs.append(kwargs)
+            return shutdown(pool, *args, **kwargs)
+        with mock.patch.object(ProcessPoolExecutor, 'shutdown',
+                               record_shutdown), \
+                self.assertRaises(ZeroDivisionError):
+            sm.cdist_curves(A, A[:2], measure=_failing_measure, n_jobs=2)
+        self.assertTrue(shutdown_kwargs)
+        for kwargs in shutdown_kwargs:
+            self.assertNotIn('cancel_futures', kwargs)
+        if os.path.isdir('/dev/shm'):
+            self.assertEqual(set(os.listdir('/dev/shm')), segments)
+
+    def test_streaming_dtw(self):
+        sm = similaritymeasures
+        np.random.seed(1212121)
+        reference = np.sin(np.linspace(0.0, 2.0 * np.pi, 30))[:, None]
+        stream = np.random.normal(scale=0.3, size=(1000, 1)) + 2.0
+        for p in [100, 500, 800]:
+            stream[p:p + 40, 0] = np.sin(np.linspace(0.0, 2.0 * np.pi, 40))
+        spring = sm.StreamingDTW(reference, threshold=5.0)
+        matches = spring.update(stream) + spring.flush()
+        self.assertEqual(len(matches), 3)
+        for (start, stop, d), p in zip(matches, [100, 500, 800]):
+            self.assertLessEqual(abs(start - p), 2)
+            self.assertLessEqual(abs(stop - p - 40), 2)
+            self.assertLessEqual(d, 5.0)
+        start, stop, d = matches[0]
+        self.assertEqual(d, sm.dtw(reference, stream[start:stop])[0])
+        # the same matches one sample at a time, or in uneven chunks
+        for sizes in [[1] * 1000, [3, 250, 1, 17, 600, 129]]:
+            spring = sm.StreamingDTW(reference, threshold=5.0)
+            found = []
+            for k0, k1 in zip(np.cumsum([0] + sizes[:-1]), np.cumsum(sizes)):
+                found += spring.update(stream[k0:k1, 0])
+            self.assertEqual(found + spring.flush(), matches)
+            self.assertEqual(spring.n_samples, 1000)
+        with self.assertRaises(ValueError):
+            spring.update(np.zeros((2, 2)))
+        with self.assertRaises(ValueError):
+            sm.StreamingDTW(reference, 1.0, metric='seuclidean')
+
+    def test_incremental_scorers(self):
+        sm = similaritymeasures
+        np.random.seed(1212121)
+        exp_data = np.random.random((40, 2))
+        num_data = np.random.random((300, 2))
+        dtw_scorer = sm.IncrementalDTW(exp_data)
+        manhattan = sm.IncrementalDTW(exp_data, metric='cityblock')
+        frechet_scorer = sm.IncrementalFrechet(exp_data)
+        self.assertEqual(dtw_scorer.distance, np.inf)
+        k = 0
+        for size in [1, 1, 3, 20, 1, 100, 174]:
+            points = num_data[k:k + size]
+            k += size
+            self.assertEqual(dtw_scorer.update(points),
+                             sm.dtw(exp_data, num_data[:k])[0])
+            self.assertEqual(manhattan.update(points),
+                             sm.dtw(exp_data, num_data[:k],
+                                    metric='cityblock')[0])
+            self.assertEqual(frechet_scorer.update(points),
+                             sm.frechet_dist(exp_data, num_data[:k]))
+        self.assertEqual(dtw_scorer.n_points, 300)
+        # one dimensional curves, one point at a time
+        frechet_scorer = sm.IncrementalFrechet(exp_data[:, :1], p=1)
+        for k in range(1, 20):
+            frechet_scorer.update(num_data[k - 1, 0])
+        self.assertEqual(frechet_scorer.distance,
+                         sm.frechet_dist(exp_data[:, :1], num_data[:19, :1],
+                                         p=1))
+        with self.assertRaises(ValueError):
+            dtw_scorer.update(np.zeros((2, 3)))
+
+    def test_backends(self):
+        sm = similaritymeasures
+        np.random.seed(1212121)
+        a = np.random.random((60, 2))
+        b = np.random.random((45, 2))
+        calls = []
+
+        def counting_kernels():
+            kernels = sm.backends._numpy_kernels()
+
+            def counted(name):
+                def kernel(*args, **kwargs):
+                    calls.append(name)
+                    return kernels[name](*args, **kwargs)
+                return kernel
+            return {name: counted(name) for name in kernels}
+
+        def results():
+            r, d = sm.dtw(a, b)
+            return [sm.area_between_two_curves(a, b), sm.pcm(a, b),
+                    sm.pcm(a, b, norm_seg_length=True),
+                    sm.curve_length_measure(a, b), sm.get_length(*a.T),
+                    sm.frechet_dist(a, b),
+                    sm.frechet_dist(a, b, return_matrix=True),
+                    sm.frechet_dist(a, b, window=5),
+                    sm.frechet_dist(a, b, engine='search'),
+                    r, d, sm.dtw_path(d), sm.dtw(a, b, return_matrix=False),
+                    sm.dtw(a, b, window=5)[0], sm.dtw(a, b, n_jobs=2),
+                    sm.dtw(a, b, dtype=np.float32),
+                    sm.dtw_align(a, b), sm.dtw_align(a, b, engine='steps'),
+                    sm.fastdtw(a, b), sm.mae(a, b[:1]), sm.mse(a, b[:1]),
+                    sm.IncrementalDTW(a).update(b)]
+        # the registrations and the selected backend are undone afterwards
+        backends = sm.backends
+        with mock.patch.dict(backends._loaders), \
+                mock.patch.dict(backends._requires), \
+                mock.patch.dict(backends._kernels), \
+                mock.patch.object(backends, '_active', backends._active):
+            sm.register_backend('counting', counting_kernels)
+            sm.set_backend('numpy')
+            expected = results()
+            self.assertIn('counting', sm.available_backends())
+            for name in sm.available_backends():
+                sm.set_backend(name)
+                self.assertEqual(sm.get_backend(), name)
+                for r, e in zip(results(), expected):
+                    if isinstance(e, tuple):
+                        for u, v in zip(r, e):
+                            np.testing.assert_array_equal(u, v)
+                    else:
+                        np.testing.assert_array_equal(r, e)
+            self.assertEqual(set(calls), {'fill', 'path', 'segment_lengths',
+                                          'fill_steps', 'step_path'})
+            sm.register_backend('missing', counting_kernels,
+                                requires='a_module_that_does_not_exist')
+            with self.assertRaises(ImportError):
+                sm.set_backend('missing')
+        self.assertNotIn('counting', sm.available_backends())
+        self.assertNotIn('missing', backends._loaders)
+        self.assertNotIn('missing', backends._requires)
+        with mock.patch.object(backends, '_active', None), \
+                mock.patch.dict(os.environ, {backends.ENV_VAR: 'numpy'}):
+            self.assertEqual(sm.get_backend(), 'numpy')
+        with self.assertRaises(ValueError):
+            sm.set_backend('fortran')
+
+    def test_parallel_tiles(self):
+        sm = similaritymeasures
+        tiled_dp = sm.similaritymeasures._tiled_dp
+        np.random.seed(1212121)
+        for n, m in [(1, 1), (1, 9), (9, 1), (23, 17), (40, 41)]:
+            a = np.random.random((n, 3))
+            b = np.random.random((m, 3))
+            r, d = sm.dtw(a, b)
+            df, ca = sm.frechet_dist(a, b, return_matrix=True)
+            r_pruned, d_pruned = sm.dtw(a, b, abandon_above=0.9 * r)
+            for tile in [1, 3, 7, 64]:
+                out = np.empty((n, m))
+                self.assertEqual(tiled_dp(a, b, n_jobs=3, tile=tile,
+                                          out=out), r)
+                np.testing.assert_array_equal(out, d)
+                self.assertEqual(tiled_dp(a, b, kind='frechet',
+                                          metric='minkowski', n_jobs=3,
+                                          tile=tile, out=out, p=2), df)
+                np.testing.assert_array_equal(out, ca)
+                self.assertEqual(tiled_dp(a, b, n_jobs=3, tile=tile,
+                                          out=out, bound=0.9 * r),
+                                 r_pruned)
+                np.testing.assert_array_equal(out, d_pruned)
+        a = np.random.random((700, 2))
+        b = np.random.random((1100, 2))
+        r, d = sm.dtw(a, b, metric='seuclidean')
+        r_par, d_par = sm.dtw(a, b, metric='seuclidean', n_jobs=4)
+        self.assertEqual(r_par, r)
+        np.testing.assert_array_equal(d_par, d)
+        self.assertEqual(sm.dtw(a, b, return_matrix=False, n_jobs=-1),
+                         sm.dtw(a, b, return_matrix=False))
+        self.assertEqual(sm.frechet_dist(a, b, n_jobs=2),
+                         sm.frechet_dist(a, b))
+        self.assertEqual(sm.dtw(a, b, return_matrix=False, n_jobs=2,
+                                abandon_above=1.0), np.inf)
+        with self.assertRaises(ValueError):
+            sm.dtw(a, b, n_jobs=0)
+
+    def test_public_names(self):
+        sm = similaritymeasures
+        for name in sm.similaritymeasures.__all__:
+            self.assertIs(getattr(sm, name),
+                          getattr(sm.similaritymeasures, name))
+        # the modules imported by the measures stay out of the package
+        for name in ['np', 'distance', 'heapq', 'os', 'Fraction',
+                     'ThreadPoolExecutor', 'division']:
+            self.assertFalse(hasattr(sm, name), name)
+
+    def test_memory_budget(self):
+        sm = similaritymeasures
+        strategy = sm.similaritymeasures._dp_strategy
+        self.assertEqual(strategy(300, 257), ('full', 512))
+        self.assertEqual(strategy(300, 257, max_memory=2**20)[0], 'tiled')
+        self.assertEqual(strategy(300, 257, return_matrix=False,
+                                  max_memory=2**20)[0], 'rolling')
+        self.assertEqual(strategy(300, 257, n_threads=2)[0], 'tiled')
+        with self.assertRaises(ValueError):
+            strategy(300, 257, max_memory=2**19)
+        with self.assertRaises(ValueError):
+            strategy(300, 257, return_matrix=False, max_memory=1000)
+        np.random.seed(1212121)
+        a = np.random.random((300, 3))
+        b = np.random.random((257, 3))
+        for metric, kwargs in [('euclidean', {}), ('minkowski', {'p': 3}),
+                               ('seuclidean', {})]:
+            r, d = sm.dtw(a, b, metric=metric, **kwargs)
+            r_swapped = sm.dtw(b, a, metric=metric, **kwargs)[0]
+            for max_memory in [2**20, 2**22]:
+                r_tiled, d_tiled = sm.dtw(a, b, metric=metric,
+                                          max_memory=max_memory, **kwargs)
+                self.assertEqual(r_tiled, r)
+                np.testing.assert_array_equal(d_tiled, d)
+                self.assertEqual(sm.dtw(b, a, metric=metric,
+                                        return_matrix=False,
+                                        max_memory=max_memory, **kwargs),
+                                 r_swapped)
+        df, ca = sm.frechet_dist(a, b, p=1.5, return_matrix=True)
+        df_tiled, ca_tiled = sm.frechet_dist(a, b, p=1.5, return_matrix=True,
+                                             max_memory=2**20)
+        self.assertEqual(df_tiled, df)
+        np.testing.assert_array_equal(ca_tiled, ca)
+        self.assertEqual(sm.frechet_dist(a, b, p=1.5, max_memory=2**18), df)
+        with self.assertRaises(ValueError):
+            sm.dtw(a, b, max_memory=2**19)
+        # without a budget, the matrix is returned however large it is, and
+        # the distance alone is computed in rows beyond _FULL_MEMORY
+        self.assertEqual(strategy(12000, 12000), ('full', 512))
+        self.assertEqual(strategy(12000, 12000, return_matrix=False),
+                         ('rolling', 512))
+        r, d = sm.dtw(a, b, max_memory=2**22)
+        r_swapped = sm.dtw(b, a, return_matrix=False, max_memory=2**22)
+        with mock.patch.object(sm.similaritymeasures, '_FULL_MEMORY', 1000):
+            r_small, d_small = sm.dtw(a, b)
+            self.assertEqual(r_small, r)
+            np.testing.assert_array_equal(d_small, d)
+            self.assertEqual(sm.dtw(b, a, return_matrix=False), r_swapped)
+            self.assertEqual(sm.frechet_dist(a, b, p=1.5), df)
+        # the budget bounds the memory of the engine
+        a = np.random.random((1200, 2))
+        b = np.random.random((800, 2))
+        for x, y in [(a, b), (b, a)]:
+            r = sm.dtw(x, y, return_matrix=False)
+            tracemalloc.start()
+            try:
+                self.assertEqual(sm.dtw(x, y, return_matrix=False,
+                                        max_memory=2**19), r)
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            self.assertLess(peak, 2**19)
+
+    def test_float32(self):
+        sm = similaritymeasures
+        f32 = np.float32
+        # relative tolerance of single versus double precision for these
+        # curves, about 100 times the largest difference observed
+        rtol = {'dtw': 1e-5, 'frechet_dist': 1e-6, 'pcm': 1e-4,
+                'curve_length_measure': 1e-4,
+                'area_between_two_curves': 1e-5, 'mae': 1e-5, 'mse': 1e-6}
+        pairs = [(curve_a_rand, curve_b_rand), (curve5, curve6),
+                 (curve_b_rand, curve5)]
+        for name, tol in rtol.items():
+            measure = getattr(sm, name)
+            for a, b in pairs:
+                if name in ('mae', 'mse'):
+                    a = a[:90]
+                    b = b[:90]
+                r = measure(a, b, dtype=f32)
+                if name == 'dtw':
+                    r, d = r
+                    self.assertEqual(d.dtype, f32)
+                self.assertEqual(np.asarray(r).dtype, f32)
+                expected = measure(a, b)
+                if name == 'dtw':
+                    expected = expected[0]
+                np.testing.assert_allclose(r, expected, rtol=tol)
+        # every engine gives the same single precision result
+        a, b = curve_a_rand, curve_b_rand
+        r, d = sm.dtw(a, b, dtype=f32)
+        r_tiled, d_tiled = sm.dtw(a, b, dtype=f32, n_jobs=2)
+        np.testing.assert_array_equal(d_tiled, d)
+        self.assertEqual(r_tiled, r)
+        self.assertEqual(sm.dtw(a, b, dtype=f32, engine='loop')[0], r)
+        self.assertEqual(sm.dtw(a, b, dtype=f32, return_matrix=False), r)
+        self.assertEqual(sm.dtw(a, b, dtype=f32, return_matrix=False,
+                                max_memory=2**15), r)
+        self.assertEqual(sm.dtw(a, b, dtype=f32, window=5)[1].toarray().dtype,
+                         f32)
+        df = sm.frechet_dist(a, b, dtype=f32)
+        for engine in ['loop', 'search']:
+            self.assertEqual(sm.frechet_dist(a, b, dtype=f32, engine=engine),
+                             df)
+        self.assertEqual(sm.frechet_dist(a, b, dtype=f32, max_memory=2**15),
+                         df)
+        self.assertEqual(sm.area_between_two_curves(a, b, dtype=f32,
+                                                    engine='loop'),
+                         sm.area_between_two_curves(a, b, dtype=f32))
+        self.assertEqual(sm.pcm(a, b, dtype=f32, engine='loop'),
+                         sm.pcm(a, b, dtype=f32))
+        exp = sm.PreparedCurve(a, dtype=f32)
+        self.assertEqual(exp.data.dtype, f32)
+        self.assertEqual(sm.pcm(exp, b, dtype=f32), sm.pcm(a, b, dtype=f32))
+        self.assertEqual(sm.curve_length_measure(exp, b, dtype=f32),
+                         sm.curve_length_measure(a, b, dtype=f32))
+        self.assertEqual(sm.pcm(exp, b), sm.pcm(a.astype(f32), b))
+        with self.assertRaises(ValueError):
+            sm.dtw(a, b, dtype=int)
+        with self.assertRaises(ValueError):
+            sm.mae(a, a, dtype='int32')
+
 
 if __name__ == '__main__':
 